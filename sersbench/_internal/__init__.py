@@ -8,15 +8,42 @@ from ._bqskit_circs import (
   dtc_unitary,
   multi_control_circuit
 )
-from ._bqskit_comp_bqskitTests import optimizationAnalysis
-from ._bqskit_comp_partitoner import analyzePartitions, presetPartitions
-from ._bqskit_comp_sort_files import optimizeBQSkitFromDirectory, optimizeBQSkitFromFile
+from ._bqskit_comp_bqskitTests import optimizationAnalysis, bqskitInfoDict
+from ._bqskit_comp_partitoner import (analyzePartitions, presetPartitions, partitionBlocks, partitionerName,
+                                      iter_block_results)
+from ._loaded_circuit import LoadedCircuit
+from ._optimization_config import OptimizationConfig
+from ._basis_translation import translateToBasis
+from ._circuit_metrics import CircuitMetrics, circuitMetrics
+from ._baseline_metrics import BaselineCache, BaselineMetrics, baselineMetrics
+from ._qiskit_baseline import baselineSweepRows, transpileGrid
+from ._block_cache import BlockCache
+from ._memory_profile import MemoryProfiler, StageMemory, memoryFields, memorySummary
+from ._partition_cache import PartitionCache, circuitContentHash, processPartitionCache
+from ._unitary_store import UnitaryStore, processUnitaryStore
+from ._compilation_session import CompilationSession, _session_scope, parseRuntimeAddress
+from ._runtime_server import startRuntimeServer
+from ._parallel_compile import chooseConcurrency, compileFilesInParallel, iterFilesInParallel
+from ._parameter_sweep import expandGrid, sweepCircuit, sweepFiles
+from ._results_log import LoggedResults, ResultsLog, configHash, fileContentHash
+from ._bqskit_comp_sort_files import (
+  optimizeBQSkitFromDirectory,
+  optimizeBQSkitFromFile,
+  iterOptimizeBQSkitFromDirectory
+)
 from ._partition_helper_func import (
   _analyzeDistances,
   _chi2_distance,
+  _chi2_matrix,
+  _cnot_distribution,
   _count_large_gates,
+  _hs_distance_matrix,
   _kl_divergence,
-  _padded_prob_dist
+  _kl_matrix,
+  _padded_distributions,
+  _padded_prob_dist,
+  _partition_unitaries,
+  _partitioned
 )
 from ._predetermined_optim_setup import (
   presetBqskitOptimizationAnalysis,
@@ -43,15 +70,61 @@ __all__ = [
     "dtc_unitary",
     "multi_control_circuit",
     "optimizationAnalysis",
+    "bqskitInfoDict",
     "analyzePartitions",
     "presetPartitions",
+    "partitionBlocks",
+    "partitionerName",
+    "iter_block_results",
+    "LoadedCircuit",
+    "OptimizationConfig",
+    "translateToBasis",
+    "CircuitMetrics",
+    "circuitMetrics",
+    "BaselineCache",
+    "BaselineMetrics",
+    "baselineMetrics",
+    "baselineSweepRows",
+    "transpileGrid",
     "optimizeBQSkitFromDirectory",
     "optimizeBQSkitFromFile",
+    "iterOptimizeBQSkitFromDirectory",
+    "CompilationSession",
+    "BlockCache",
+    "MemoryProfiler",
+    "StageMemory",
+    "memoryFields",
+    "memorySummary",
+    "PartitionCache",
+    "circuitContentHash",
+    "processPartitionCache",
+    "UnitaryStore",
+    "processUnitaryStore",
+    "_session_scope",
+    "parseRuntimeAddress",
+    "startRuntimeServer",
+    "chooseConcurrency",
+    "compileFilesInParallel",
+    "iterFilesInParallel",
+    "expandGrid",
+    "sweepCircuit",
+    "sweepFiles",
+    "ResultsLog",
+    "LoggedResults",
+    "configHash",
+    "fileContentHash",
     "_analyzeDistances",
     "_chi2_distance",
+    "_chi2_matrix",
+    "_cnot_distribution",
     "_count_large_gates",
+    "_hs_distance_matrix",
     "_kl_divergence",
+    "_kl_matrix",
+    "_padded_distributions",
     "_padded_prob_dist",
+    "_partition_unitaries",
+    "_partitioned",
     "presetBqskitOptimizationAnalysis",
     "presetQiskitOptimizationAnalysis",
     "optimizations",
@@ -0,0 +1,61 @@
+from ._circuit_metrics import circuitMetrics
+
+# Block sizes the adaptive mode chooses from
+candidateBlockSizes = (2, 3, 4)
+
+# CNOTs a generic unitary on 2, 3 and 4 qubits needs; synthesis of a block with more two-qubit gates is expected to
+# bring it down to this count
+genericCnotCounts = {2: 3, 3: 14, 4: 61}
+
+# Fraction of the remaining two-qubit gates that synthesis is expected to remove from a structured block. Larger blocks
+# give synthesis more context to find cancellations
+reductionRates = {2: 0.1, 3: 0.25, 4: 0.35}
+
+# Synthesis time model: base seconds and growth factor per layer of a QSearch/LEAP search on 2, 3 and 4 qubits.
+# Measured on single-core runs (3 qubits: ~0.4 s for blocks of 2-3 CNOTs, ~640 s for a generic block); 4-qubit blocks
+# have twice the CNOT placements per layer and are orders of magnitude slower
+baseSeconds = {2: 0.07, 3: 0.08, 4: 1.0}
+layerGrowth = {2: 1.5, 3: 1.9, 4: 2.5}
+
+# Two-qubit gates one second of synthesis time is worth, i.e. one gate is worth ten seconds. Higher values trade quality
+# for throughput
+timeWeight = 0.1
+
+
+def expectedReduction(num_qudits: int, two_qubit_gates: int) -> float:
+    """
+    Two-qubit gates synthesis is expected to remove from a block: everything above the generic CNOT count of its size,
+    plus a size-dependent fraction of the rest.
+    """
+    generic = genericCnotCounts.get(num_qudits, two_qubit_gates)
+    remaining = min(two_qubit_gates, generic)
+    return two_qubit_gates - remaining + reductionRates.get(num_qudits, 0.0) * remaining
+
+def expectedSynthesisTime(num_qudits: int, two_qubit_gates: int) -> float:
+    """
+    Seconds synthesis of a block is expected to take. The search goes one layer per CNOT of the result, which is at most
+    the block's two-qubit gate count or the generic count, and its time grows exponentially with the layers.
+    """
+    if num_qudits < 2 or two_qubit_gates == 0:
+        return 0.0
+    size = min(num_qudits, max(baseSeconds))
+    layers = min(two_qubit_gates, genericCnotCounts[size])
+    return baseSeconds[size] * layerGrowth[size] ** layers
+
+def splitScore(blocks: list, time_weight: float = timeWeight) -> float:
+    """
+    Expected gate reduction of a list of (location, block) pairs minus its expected synthesis time weighted by time_weight.
+    """
+    score = 0.0
+    for _, block in blocks:
+        twoQubitGates = circuitMetrics(block).multi_qudit_gates
+        score += expectedReduction(block.num_qudits, twoQubitGates)
+        score -= time_weight * expectedSynthesisTime(block.num_qudits, twoQubitGates)
+    return score
+
+def chooseSplit(options: list, time_weight: float = timeWeight) -> list:
+    """
+    Returns the candidate split of a circuit region with the best splitScore. options holds the splits as lists of
+    (location, block) pairs; on a tie the earlier (coarser) split is kept.
+    """
+    return max(options, key=lambda blocks: splitScore(blocks, time_weight))
@@ -0,0 +1,201 @@
+from bqskit.ir import Circuit
+from bqskit.ext import bqskit_to_qiskit, qiskit_to_bqskit
+from qiskit import QuantumCircuit
+from qiskit.compiler import transpile
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+import hashlib
+import json
+import os
+import tempfile
+from ._basis_translation import translateToBasis
+from ._circuit_metrics import circuitMetrics
+from ._loaded_circuit import LoadedCircuit
+from ._results_log import fileContentHash
+
+# Baselines the analysis rows compare against. 'basis': the BQSKit parse translated to CX, RZ, SX, X (optimizeBQSkit and
+# sweep rows). 'cx': the BQSKit parse with its multi-qubit gates transpiled to CX by Qiskit (predeterminedCompilation's
+# BQSKit rows). 'qiskit': the Qiskit parse and its CX, X, RZ, SX transpilation (the Qiskit baseline row)
+baselineKinds = ('basis', 'cx', 'qiskit')
+
+
+@dataclass(frozen=True)
+class BaselineMetrics:
+    """
+    Before-optimization metrics of one input circuit, as reported in the analysis rows.
+
+    Parameters:
+        gate_set (str): Gate set of the circuit as parsed.
+
+        num_gates (int): Number of gates of the baseline.
+
+        multi_qudit_gates (int): Number of multi-qubit gates of the baseline.
+
+        multi_qudit_depth (int): Multi-qubit gate depth of the baseline.
+    """
+
+    gate_set: str
+    num_gates: int
+    multi_qudit_gates: int
+    multi_qudit_depth: int
+
+
+class BaselineCache:
+    """
+    Cache of BaselineMetrics keyed by the content hash of the input file and the kind of baseline, so that the
+    baseline transpilation of a file is done once for every analysis row and every later run that compiles it.
+
+    Entries are kept in a bounded in-memory tier. If a path is given they are also written to disk as small JSON files,
+    each written to a temporary name and atomically renamed into place, so several processes can share the directory.
+
+    Parameters:
+        path (str): Directory for the on-disk tier. Created if it does not exist. If None, only memory is used. (Default: None)
+
+        max_memory_entries (int): Number of entries kept in the in-memory tier. (Default: 4096)
+    """
+
+    def __init__(self, path: str = None, max_memory_entries: int = 4096):
+        self.path = path
+        self.max_memory_entries = max_memory_entries
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+
+    def key(self, content_hash: str, kind: str) -> str:
+        """
+        Returns the cache key of the given kind of baseline of a file with content_hash.
+        """
+        return hashlib.sha256(f'{kind}:{content_hash}'.encode()).hexdigest()
+
+    def get(self, key: str) -> BaselineMetrics | None:
+        """
+        Returns the metrics stored under key, or None on a miss.
+        """
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return self._memory[key]
+
+        if self.path is not None:
+            try:
+                with open(self._file_path(key)) as f:
+                    metrics = BaselineMetrics(**json.load(f))
+            except (FileNotFoundError, json.JSONDecodeError, TypeError):
+                metrics = None
+            if metrics is not None:
+                self._remember(key, metrics)
+                self.hits += 1
+                return metrics
+
+        self.misses += 1
+        return None
+
+    def put(self, key: str, metrics: BaselineMetrics):
+        """
+        Stores metrics under key.
+        """
+        self._remember(key, metrics)
+
+        if self.path is not None:
+            fd, temp_path = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(asdict(metrics), f)
+                os.replace(temp_path, self._file_path(key))
+            except BaseException:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+
+    def _remember(self, key: str, metrics: BaselineMetrics):
+        self._memory[key] = metrics
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _file_path(self, key: str) -> str:
+        return os.path.join(self.path, f'{key}.json')
+
+
+# Cache used when no other one is given, shared by every run in this process
+processBaselineCache = BaselineCache()
+
+
+def _measureBaseline(kind: str, bqskit_source, qiskit_source) -> BaselineMetrics:
+    """
+    Computes the given kind of baseline. bqskit_source and qiskit_source are called to get the parsed circuit, so only
+    the parse the baseline needs is done.
+    """
+    if kind == 'basis':
+        source = bqskit_source()
+        baseline = circuitMetrics(translateToBasis(source))
+        return BaselineMetrics(gate_set=circuitMetrics(source).gate_set_string, num_gates=baseline.num_gates,
+                               multi_qudit_gates=baseline.multi_qudit_gates,
+                               multi_qudit_depth=baseline.multi_qudit_depth)
+
+    if kind == 'cx':
+        source = bqskit_source()
+        # Transpile so that there is only cx gates as the 2q gate type
+        quantumCircuit = bqskit_to_qiskit(source)
+        multi_qubit_gates = set(instr.operation.name for instr in quantumCircuit.data
+                                if len(instr.qubits) > 1 and instr.operation.name != 'cx')
+        basis_gates = list(set(quantumCircuit.count_ops()) - multi_qubit_gates)
+        if 'cx' not in basis_gates:
+            basis_gates.append('cx')
+        quantumCircuit = transpile(quantumCircuit, basis_gates=basis_gates, optimization_level=0)
+        baseline = circuitMetrics(qiskit_to_bqskit(quantumCircuit))
+        return BaselineMetrics(gate_set=circuitMetrics(source).gate_set_string, num_gates=baseline.num_gates,
+                               multi_qudit_gates=baseline.multi_qudit_gates,
+                               multi_qudit_depth=baseline.multi_qudit_depth)
+
+    if kind == 'qiskit':
+        source = qiskit_source()
+        gate_counts = source.count_ops()
+        quantumCircuit = transpile(source, basis_gates=['cx', 'x', 'rz', 'sx'], optimization_level=0)
+        return BaselineMetrics(gate_set=', '.join(gate_counts), num_gates=sum(gate_counts.values()),
+                               multi_qudit_gates=sum(1 for instr in quantumCircuit.data if len(instr.qubits) > 1),
+                               multi_qudit_depth=circuitMetrics(qiskit_to_bqskit(quantumCircuit)).multi_qudit_depth)
+
+    raise ValueError(f'Unknown baseline kind {kind!r}. Supported kinds are {", ".join(baselineKinds)}.')
+
+def baselineMetrics(qc: str|LoadedCircuit, kind: str, cache: BaselineCache = None) -> BaselineMetrics:
+    """
+    Returns the before-optimization metrics of a circuit, computing its baseline at most once per file contents.
+
+    Parameters:
+        qc (str|LoadedCircuit): Path to a QASM file, or a loaded circuit. A LoadedCircuit keeps its baselines, so the
+        rows of one run share them even for generated circuits, which have no file to hash.
+
+        kind (str): 'basis', 'cx' or 'qiskit', see baselineKinds.
+
+        cache (BaselineCache): Cache consulted for files. If None, processBaselineCache is used. (Default: None)
+    """
+    if isinstance(qc, LoadedCircuit):
+        if kind in qc.baselines:
+            return qc.baselines[kind]
+        path = qc.path
+        bqskit_source = lambda: qc.bqskit_source
+        qiskit_source = lambda: qc.qiskit_source
+    else:
+        path = qc
+        bqskit_source = lambda: Circuit.from_file(path)
+        qiskit_source = lambda: QuantumCircuit.from_qasm_file(path)
+
+    key = None
+    metrics = None
+    if path is not None:
+        cache = processBaselineCache if cache is None else cache
+        content_hash = qc.content_hash if isinstance(qc, LoadedCircuit) else fileContentHash(path)
+        key = cache.key(content_hash, kind)
+        metrics = cache.get(key)
+
+    if metrics is None:
+        metrics = _measureBaseline(kind, bqskit_source, qiskit_source)
+        if key is not None:
+            cache.put(key, metrics)
+
+    if isinstance(qc, LoadedCircuit):
+        qc.baselines[kind] = metrics
+    return metrics
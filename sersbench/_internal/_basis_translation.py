@@ -0,0 +1,134 @@
+from bqskit.ir import Circuit
+from bqskit.ext import bqskit_to_qiskit, qiskit_to_bqskit
+from qiskit import QuantumCircuit
+from qiskit.circuit import Gate, Parameter, ParameterExpression
+from qiskit.compiler import transpile
+import threading
+
+# Basis the compiled circuits are translated to
+defaultBasisGates = ('x', 'sx', 'rz', 'cx')
+
+# (gate, basis) -> list of (bqskit gate, qubit indices, parameter functions), or None if the gate has no template
+_templates = {}
+
+# Qiskit gate name -> BQSKit gate, as produced by qiskit_to_bqskit
+_bqskitGates = {}
+
+_templatesLock = threading.Lock()
+
+
+def _roundTrip(circuit: Circuit, basis_gates: tuple) -> Circuit:
+    """
+    Translates circuit to basis_gates through Qiskit: converts it, transpiles it with optimization level 0 and converts it
+    back.
+    """
+    qiskitCircuit = transpile(bqskit_to_qiskit(circuit), optimization_level=0, basis_gates=list(basis_gates))
+    translated = qiskit_to_bqskit(qiskitCircuit)
+    translated.unfold_all()
+    return translated
+
+def _bqskitGate(instruction):
+    """
+    Returns the BQSKit gate that qiskit_to_bqskit produces for a Qiskit instruction of a translated template.
+    """
+    name = instruction.operation.name
+    if name not in _bqskitGates:
+        operation = instruction.operation
+        numeric = operation
+        if operation.params:
+            numeric = operation.to_mutable()
+            numeric.params = [0.0 if isinstance(p, ParameterExpression) else p for p in operation.params]
+        single = QuantumCircuit(operation.num_qubits)
+        single.append(numeric, range(operation.num_qubits))
+        _bqskitGates[name] = next(iter(qiskit_to_bqskit(single))).gate
+    return _bqskitGates[name]
+
+def _buildTemplate(operation, basis_gates: tuple):
+    """
+    Translates one BQSKit operation to basis_gates with Qiskit, keeping its parameters symbolic so that the result holds
+    for every operation with the same gate. Returns None if the gate cannot be expressed this way, or if sympy, which
+    evaluates the symbolic parameters, is not installed.
+    """
+    try:
+        import sympy
+    except ImportError:  # Optional; without it every circuit is translated through Qiskit
+        return None
+
+    gate, params = operation.gate, list(operation.params)
+    single = Circuit(gate.num_qudits, gate.radixes)
+    single.append_gate(gate, list(range(gate.num_qudits)), params)
+    try:
+        converted = bqskit_to_qiskit(single)
+    except Exception:
+        return None
+    if len(converted.data) != 1 or len(converted.data[0].operation.params) != len(params):
+        return None
+    qiskitOperation = converted.data[0].operation
+    # Only unitary gates taking the BQSKit parameters in the same order are templated; measurements are not
+    if not isinstance(qiskitOperation, Gate) or any(abs(float(a) - b) > 1e-6 for a, b in zip(qiskitOperation.params, params)):
+        return None
+
+    symbols = [Parameter(f'p{i}') for i in range(len(params))]
+    try:
+        symbolic = type(qiskitOperation)(*symbols) if symbols else qiskitOperation
+    except TypeError:
+        return None
+    symbolicCircuit = QuantumCircuit(gate.num_qudits)
+    symbolicCircuit.append(symbolic, range(gate.num_qudits))
+    translated = transpile(symbolicCircuit, optimization_level=0, basis_gates=list(basis_gates))
+
+    sympySymbols = [sympy.Symbol(symbol.name) for symbol in symbols]
+    template = []
+    for instruction in translated.data:
+        functions = []
+        for param in instruction.operation.params:
+            if isinstance(param, ParameterExpression):
+                expression = sympy.sympify(str(param.sympify()))
+                functions.append(sympy.lambdify(sympySymbols, expression, 'math'))
+            else:
+                functions.append(float(param))
+        qubits = [translated.find_bit(qubit).index for qubit in instruction.qubits]
+        template.append((_bqskitGate(instruction), qubits, functions))
+    return template
+
+def _template(operation, basis_gates: tuple):
+    key = (operation.gate, basis_gates)
+    if key not in _templates:
+        with _templatesLock:
+            if key not in _templates:
+                _templates[key] = _buildTemplate(operation, basis_gates)
+    return _templates[key]
+
+def translateToBasis(circuit: Circuit, basis_gates: tuple = defaultBasisGates) -> Circuit:
+    """
+    Rewrites a BQSKit circuit in basis_gates without leaving BQSKit.
+
+    Gives the same gates as converting the circuit to Qiskit, transpiling it with optimization level 0 and converting it
+    back, which only translates each gate on its own. The Qiskit translation of each gate type is computed once with
+    symbolic parameters and then reused with the parameters of every operation. Circuits containing a gate that has no
+    such template, and every circuit if sympy is not installed, are translated through Qiskit as before.
+
+    Parameters:
+        circuit (Circuit): Unfolded circuit to translate. Not modified.
+
+        basis_gates (tuple): Qiskit names of the target gates. (Default: ('x', 'sx', 'rz', 'cx'))
+
+    Returns:
+        New circuit containing only basis gates.
+    """
+    basis_gates = tuple(basis_gates)
+    operations = list(circuit)
+    templates = []
+    for operation in operations:
+        template = _template(operation, basis_gates)
+        if template is None:
+            return _roundTrip(circuit, basis_gates)
+        templates.append(template)
+
+    translated = Circuit(circuit.num_qudits, circuit.radixes)
+    for operation, template in zip(operations, templates):
+        location, params = operation.location, operation.params
+        for gate, qubits, functions in template:
+            gateParams = [f(*params) if callable(f) else f for f in functions]
+            translated.append_gate(gate, [location[q] for q in qubits], gateParams)
+    return translated
@@ -0,0 +1,200 @@
+from bqskit.ir import Circuit
+from collections import OrderedDict
+import hashlib
+import numpy as np
+import os
+import pickle
+import tempfile
+
+
+class BlockCache:
+    """
+    Content-addressed cache of synthesized partition blocks.
+
+    Blocks are keyed by a canonical hash of their unitary (global phase removed, rounded to `decimals` places) together
+    with the synthesis settings (pass type, success threshold and multistart), so identical blocks found in different
+    partitions, circuits or runs are only synthesized once. Results are always kept in a bounded in-memory tier. If a
+    path is given they are also written to disk, one pickle file per block.
+
+    The disk tier is safe to share between processes: every file is written to a temporary name and atomically renamed
+    into place, so readers never see a partial entry, and reads or evictions racing with another process' eviction are
+    treated as misses. When the directory grows past max_bytes, the least recently used files are removed. Each process
+    only sees its own writes, so the size of the directory is scanned again before evicting and after every
+    max_bytes / 16 bytes written, which keeps the limit close when several workers share the directory.
+
+    Parameters:
+        path (str): Directory for the on-disk tier. Created if it does not exist. If None, only memory is used. (Default: None)
+
+        max_bytes (int): Size limit of the on-disk tier in bytes. (Default: 1 GiB)
+
+        decimals (int): Number of decimal places the unitary is rounded to before hashing. (Default: 10)
+
+        max_memory_entries (int): Number of blocks kept in the in-memory tier. (Default: 4096)
+    """
+
+    def __init__(self, path: str = None, max_bytes: int = 2 ** 30, decimals: int = 10, max_memory_entries: int = 4096):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.decimals = decimals
+        self.max_memory_entries = max_memory_entries
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._disk_bytes = 0
+        # Bytes this process has written since the directory size was last scanned
+        self._unscanned_bytes = 0
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+            self._disk_bytes = self._scan_bytes()
+
+    def key(self, block: Circuit, pass_type: str, success_threshold: float, multistart: int = None) -> str:
+        """
+        Returns the canonical hash of block for the given synthesis settings.
+        """
+        unitary = np.asarray(block.get_unitary().numpy, dtype=np.complex128)
+
+        # Removes the global phase using the first non-negligible entry so that equivalent blocks share a key
+        flat = unitary.ravel()
+        pivot = flat[np.argmax(np.abs(flat) > 1e-6)]
+        unitary = unitary * (np.conj(pivot) / abs(pivot))
+
+        # Rounds to the tolerance; adding 0.0 turns -0.0 into 0.0 so both hash the same
+        rounded = np.round(unitary, self.decimals) + 0.0
+
+        digest = hashlib.sha256()
+        digest.update(repr((tuple(block.radixes), pass_type, float(success_threshold), multistart)).encode())
+        digest.update(np.ascontiguousarray(rounded.real).tobytes())
+        digest.update(np.ascontiguousarray(rounded.imag).tobytes())
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Circuit | None:
+        """
+        Returns a copy of the synthesized block stored under key, or None on a miss.
+        """
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return self._memory[key].copy()
+
+        if self.path is not None:
+            file_path = self._file_path(key)
+            try:
+                with open(file_path, 'rb') as f:
+                    circuit = pickle.load(f)
+                # Refreshes the access time used for eviction
+                os.utime(file_path)
+            except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+                circuit = None
+            if circuit is not None:
+                self._remember(key, circuit)
+                self.hits += 1
+                return circuit.copy()
+
+        self.misses += 1
+        return None
+
+    def put(self, key: str, circuit: Circuit):
+        """
+        Stores a synthesized block under key.
+        """
+        self._remember(key, circuit.copy())
+
+        if self.path is not None:
+            file_path = self._file_path(key)
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            # Writes to a temporary file first, then atomically moves it into place
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(file_path), suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    pickle.dump(circuit, f, protocol=pickle.HIGHEST_PROTOCOL)
+                size = os.path.getsize(temp_path)
+                # An existing entry for the key is replaced, so only the difference in size is added
+                try:
+                    old_size = os.path.getsize(file_path)
+                except FileNotFoundError:
+                    old_size = 0
+                os.replace(temp_path, file_path)
+            except BaseException:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+            self._disk_bytes += size - old_size
+            self._unscanned_bytes += size
+
+            # Other processes write to and evict from the same directory, so the counter is refreshed from disk
+            # before it is trusted
+            if self._disk_bytes > self.max_bytes or self._unscanned_bytes > self.max_bytes / 16:
+                self._disk_bytes = self._scan_bytes()
+                if self._disk_bytes > self.max_bytes:
+                    self._evict()
+
+    def clear(self):
+        """
+        Removes every entry from both tiers.
+        """
+        self._memory.clear()
+        if self.path is not None:
+            for file_path, _, _ in self._disk_entries():
+                try:
+                    os.remove(file_path)
+                except FileNotFoundError:
+                    pass
+            self._disk_bytes = 0
+            self._unscanned_bytes = 0
+
+    def _remember(self, key: str, circuit: Circuit):
+        self._memory[key] = circuit
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _file_path(self, key: str) -> str:
+        return os.path.join(self.path, key[:2], f'{key}.pkl')
+
+    def _disk_entries(self):
+        """
+        Returns (path, size, last access) for every block file on disk. Files removed by another process are skipped.
+        """
+        entries = []
+        with os.scandir(self.path) as subdirectories:
+            for subdirectory in subdirectories:
+                if not subdirectory.is_dir():
+                    continue
+                try:
+                    with os.scandir(subdirectory.path) as files:
+                        for file in files:
+                            if not file.name.endswith('.pkl'):
+                                continue
+                            try:
+                                stat = file.stat()
+                            except FileNotFoundError:
+                                continue
+                            entries.append((file.path, stat.st_size, stat.st_mtime))
+                except FileNotFoundError:
+                    continue
+        return entries
+
+    def _scan_bytes(self) -> int:
+        """
+        Returns the current size of the block files on disk, including those written by other processes.
+        """
+        self._unscanned_bytes = 0
+        return sum(size for _, size, _ in self._disk_entries())
+
+    def _evict(self):
+        """
+        Removes the least recently used files until the disk tier is below 90% of max_bytes.
+        """
+        entries = sorted(self._disk_entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        self._unscanned_bytes = 0
+        target = 0.9 * self.max_bytes
+        for file_path, size, _ in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(file_path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        self._disk_bytes = total
@@ -0,0 +1,70 @@
+from bqskit.ir import Circuit
+import math
+import numpy as np
+from ._circuit_metrics import circuitMetrics
+
+
+def _factorsOut(unitary: np.ndarray, radixes: tuple, qudit: int, tolerance: float) -> bool:
+    """
+    True if unitary is (up to tolerance) a tensor product of an operator on qudit and an operator on the other qudits,
+    i.e. its operator Schmidt rank across that cut is 1.
+    """
+    n = len(radixes)
+    tensor = unitary.reshape(tuple(radixes) * 2)
+    rest = [q for q in range(n) if q != qudit]
+    # Rows index the (output, input) pair of qudit, columns the (outputs, inputs) of the remaining qudits
+    realigned = tensor.transpose([qudit, n + qudit] + rest + [n + q for q in rest])
+    realigned = realigned.reshape(radixes[qudit] ** 2, -1)
+    singular = np.linalg.svd(realigned, compute_uv=False)
+    return singular[1] <= tolerance * singular[0]
+
+def entanglingLowerBound(circuit: Circuit, tolerance: float = 1e-6) -> int:
+    """
+    Cheap lower bound on the number of multi-qudit gates any circuit implementing the unitary of circuit needs.
+
+    A qudit that no multi-qudit gate touches only receives local gates, so it factors out of the unitary. Every qudit that
+    does not factor out must therefore be touched by a multi-qudit gate, and each two-qudit gate touches two of them.
+
+    Parameters:
+        circuit (Circuit): Block to bound.
+
+        tolerance (float): Relative size of the second operator Schmidt coefficient below which a qudit counts as
+        factoring out. Larger values give smaller (safer) bounds for approximate synthesis. (Default: 1e-6)
+
+    Returns:
+        ceil(m / 2), where m is the number of qudits that do not factor out of the unitary (0 for a product of local
+        unitaries).
+    """
+    if circuit.num_qudits < 2:
+        return 0
+    unitary = circuit.get_unitary().numpy
+    entangled = sum(1 for q in range(circuit.num_qudits) if not _factorsOut(unitary, circuit.radixes, q, tolerance))
+    return math.ceil(entangled / 2)
+
+def canImprove(circuit: Circuit, replace_filter: str, success_threshold: float) -> bool:
+    """
+    Decides before synthesis whether a synthesized block could ever replace circuit.
+
+    Only 'less-than-multi' is triaged: it keeps the original block unless synthesis lowers its multi-qudit gate count, so
+    a block whose count is already at the lower bound of entanglingLowerBound is kept whatever synthesis returns. Blocks
+    without multi-qudit gates are rejected without computing their unitary. Every block is a candidate under 'always'
+    and 'less-than'.
+
+    Parameters:
+        circuit (Circuit): Unfolded block.
+
+        replace_filter (str): Replace filter of the compilation.
+
+        success_threshold (float): Synthesis success threshold. Sets how close to a product a block may be and still
+        count as one, since approximate synthesis can drop an almost local entangling gate.
+    """
+    if replace_filter != 'less-than-multi':
+        return True
+    multiQuditGates = circuitMetrics(circuit).multi_qudit_gates
+    if multiQuditGates == 0:
+        return False
+    # No bound above ceil(n / 2) exists, so larger blocks always go to synthesis
+    if multiQuditGates > math.ceil(circuit.num_qudits / 2):
+        return True
+    tolerance = max(1e-6, 10 * math.sqrt(success_threshold))
+    return multiQuditGates > entanglingLowerBound(circuit, tolerance)
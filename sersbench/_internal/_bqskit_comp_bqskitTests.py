@@ -2,20 +2,16 @@ from bqskit.passes import (
     ScanPartitioner,
     QuickPartitioner,
 )
-from bqskit.ir import Circuit
+import os
 import time
-from ._bqskit_comp_partitoner import analyzePartitions, countNumGates
-from qiskit import transpile
-from bqskit.ext import qiskit_to_bqskit, bqskit_to_qiskit
+from ._bqskit_comp_partitoner import analyzePartitions, blockSize, partitionerName
+from ._circuit_metrics import circuitMetrics
+from ._compilation_session import CompilationSession
+from ._baseline_metrics import BaselineMetrics, baselineMetrics
 
 # NEED TO TRY CATCH FOR JSON SAVING.
 
-# List of partitioners and partition size. Dictionary of partitioners to help with file nomenclature.
-blockSize = 3
-partitionerDict = {
-        0: f'ScanPartitioner{blockSize}',
-        1: f'QuckPartitioner{blockSize}'
-    }
+# List of partitioners with the default partition size. Dictionary of passes to help with file nomenclature.
 passDict = {
     0: 'QSearch',
     1: 'LEAP'
@@ -23,8 +19,70 @@ passDict = {
 partitionerList = [ScanPartitioner(block_size=blockSize), QuickPartitioner(block_size=blockSize)]
 
 
+def bqskitInfoDict(baseline: BaselineMetrics, data: list, circuit_name: str, compilation_time: float,
+    replace_filter: str, success_threshold: float, partitioner: int, pass_type: int, multistart: int = None,
+    block_size: int|str = blockSize) -> dict:
+    """
+    Builds the dictionary describing one BQSKit compilation, without its per-stage timings.
+
+    Parameters:
+        baseline (BaselineMetrics): Metrics of the circuit before optimization, usually its 'basis' baseline.
+
+        data (list): List returned by analyzePartitions or presetPartitions.
+
+        circuit_name (str): Name of the circuit before optimization, without the .qasm extension.
+
+        compilation_time (float): Compilation time to report, in seconds.
+
+        multistart (int): Number of starting points of each instantiation, reported as 'Multistart Value'. None for the
+        instantiater default, which analyzePartitions uses. (Default: None)
+
+    The remaining parameters are the settings of the compilation and are reported as given.
+    """
+    circuit = data[0]
+
+    # Gate counts, depths and gate set of the compiled circuit in one traversal
+    compiledMetrics = circuitMetrics(circuit)
+
+    # Circuit name after optimization 
+    compiled_name = data[1].replace('.qasm', '')
+
+    # Number of qubits in the circuit
+    qc_qubit_count = circuit.num_qudits
+    
+    infoDict = {
+        'Circuit QASM File Name Before Optimization': circuit_name,
+        'Circuit QASM File Name After Optimization': compiled_name,
+        'Circuit Qubit Count': qc_qubit_count,
+        'Compilation Time (seconds)': compilation_time,
+        'Two-Qubit Gate Count Before Optimization': baseline.multi_qudit_gates,
+        'Two-Qubit Gate Count After Optimization': compiledMetrics.multi_qudit_gates,
+        'Two-Qubit Gate Depth Before Optimization': baseline.multi_qudit_depth,
+        'Two-Qubit Gate Depth After Optimization': compiledMetrics.multi_qudit_depth,
+        'Gate Count Before Optimization': baseline.num_gates,
+        'Gate Count After Optimization': compiledMetrics.num_gates,
+        'Gate Set Before Optimization': baseline.gate_set,
+        'Gate Set After Optimization': compiledMetrics.gate_set_string,
+        'Partitioner': partitionerName(partitioner, block_size),
+        'Optimization Algorithm': passDict[pass_type],
+        'Optimization Algorithm Success Threshold': success_threshold,
+        'Optimization Algorithm Replace Filter': replace_filter,
+        'Partitioner Block Size': block_size,
+        'Multistart Value': multistart,
+        'Average Number of Gates in Each Partition Before Optimization': data[2],
+        'Average Number of Gates in Each Partition After Optimization':data[3],
+        'Average Number of Two-Qubit Gates in Each Partition Before Optimization': data[4],
+        'Average Number of Two-Qubit Gates in Each Partition After Optimization': data[5],
+        'Optimization Level': None,
+        'Randomly Generated Circuit': False,
+        'Framework': 'BQSkit'
+        }
+
+    return infoDict
+
 def optimizationAnalysis(qc: str, replace_filter: str = 'always', save_path: str = None, success_threshold: float = 1e-8, 
-    partitioner: int = 0, pass_type: int = 0):
+    partitioner: int = 0, pass_type: int = 0, session: CompilationSession = None, block_size: int|str = blockSize,
+    block_budget: float = None, circuit_budget: float = None):
     """
     Optimizes a function using either LEAP or QSearch and returns the optimized circuit.
 
@@ -43,18 +101,27 @@ def optimizationAnalysis(qc: str, replace_filter: str = 'always', save_path: str
 
         pass_type (int): Optimization algorithm to use. Supports QSearch and LEAP. 0 for QSearch, 1 for LEAP. (Default: 0).
 
+        session (CompilationSession): Session whose Compiler is reused for the compilation. If None, a temporary one is used.
+        (Default: None).
+
+        block_size (int|str): Largest number of qubits per partition, or 'adaptive' to choose 2, 3 or 4 per circuit
+        region. (Default: 3).
+
+        block_budget (float): Wall-clock seconds a partition block may spend in synthesis before it is cancelled and its
+        original sub-circuit kept. If None, blocks have no limit. (Default: None).
+
+        circuit_budget (float): Wall-clock seconds the block synthesis of one circuit may take in total; unfinished
+        blocks are then cancelled and keep their original sub-circuit. If None, there is no limit. (Default: None).
+
     Returns:
         Optimized circuit saved to the save_path (if one exists) and a dictionary containing information about the optimization process.
     """
 
-    #try to construct circuit for pre-optimization evaluation
-    try:
-        quantumCircuit = Circuit.from_file(qc)
-    except:
+    if not os.path.isfile(qc):
         raise FileNotFoundError('Path is invalid.')
     
     # Time before compiling circuit
-    sTime = time.time()
+    sTime = time.perf_counter()
 
     # Compile circuit, with unfolded partitions to be able to see the compsition of each partition
     data = analyzePartitions(qc=qc, 
@@ -62,96 +129,31 @@ def optimizationAnalysis(qc: str, replace_filter: str = 'always', save_path: str
                                 pass_type=pass_type, 
                                 save_path=save_path, 
                                 success_threshold=success_threshold,
-                                replace_filter=replace_filter)
-    circuit = data[0]
+                                replace_filter=replace_filter,
+                                session=session,
+                                block_size=block_size,
+                                block_budget=block_budget,
+                                circuit_budget=circuit_budget)
         
     # Time after compiling circuit
-    eTime = time.time() 
-    
-    # Gate set before compilation
-    gates = list(quantumCircuit.gate_set)
-    before_qc_gate_set = ''
-    for i in range(len(gates)- 1):
-        before_qc_gate_set += str(gates[i]) + ', '
-    before_qc_gate_set += str(gates[len(gates)-1])
-
-    # Gate set after compilation
-    gates = list(circuit.gate_set)
-    after_qc_gate_set = ''
-    for j in range(len(gates)- 1):
-        after_qc_gate_set += str(gates[j]) + ', '
-    after_qc_gate_set += ' ' + str(gates[len(gates)-1])
-        
-    compiled_two_q_gates = 0
-    original_two_q_gates = 0
+    eTime = time.perf_counter() 
     
-     # Transpile so that there is only cx gates as the 2q gate type
-    quantumCircuit = bqskit_to_qiskit(quantumCircuit)
-    multi_qubit_gates = [gate.name for gate, qubits, _ in quantumCircuit.data if len(qubits) > 1 and gate.name != 'cx']
-    basis_gates = list(set(before_qc_gate_set) - set(multi_qubit_gates))
-    if 'cx' not in basis_gates:
-        basis_gates.append('cx')
-    quantumCircuit = transpile(quantumCircuit, basis_gates=['x','sx','rz','cx'], optimization_level=0)
-    quantumCircuit = qiskit_to_bqskit(quantumCircuit)
-
-    # Number of 2-qubit gates before compilation
-    for gate in quantumCircuit.gate_counts:
-        if gate.num_qudits == 1:
-            continue
-        original_two_q_gates += int(quantumCircuit.count(gate))
-
-    # Number of 2-qubit gates after compilation
-    for gate in circuit.gate_counts:
-        if gate.num_qudits == 1:
-            continue
-        compiled_two_q_gates += int(circuit.count(gate))
-
-    # 2-qubit depth after compilation
-    compiled_two_q_depth = circuit.multi_qudit_depth
-
-    # 2-qubit depth before compilation
-    original_two_q_depth = quantumCircuit.multi_qudit_depth
-        
-    # time taken to compile
-    elapsedTime = eTime - sTime
+    # Metrics of the circuit translated so that there is only cx gates as the 2q gate type, computed once per file
+    # contents
+    baseline = baselineMetrics(qc, 'basis', None if session is None else session.baseline_cache)
 
     # Circuit name before optimization
     index = qc.rfind('/')
     quantumCircuit_name = qc[index+1:len(qc)-5]
 
-    # Circuit name after optimization 
-    circuit_name = data[1].replace('.qasm', '')
+    infoDict = bqskitInfoDict(baseline=baseline, data=data, circuit_name=quantumCircuit_name,
+                              compilation_time=eTime - sTime - data[6], replace_filter=replace_filter,
+                              success_threshold=success_threshold, partitioner=partitioner, pass_type=pass_type,
+                              block_size=block_size)
 
-    # Number of qubits in the circuit
-    qc_qubit_count = circuit.num_qudits
-    
-    infoDict = {
-        'Circuit QASM File Name Before Optimization': quantumCircuit_name,
-        'Circuit QASM File Name After Optimization': circuit_name,
-        'Circuit Qubit Count': qc_qubit_count,
-        'Compilation Time (seconds)': elapsedTime - data[6],
-        'Two-Qubit Gate Count Before Optimization': original_two_q_gates,
-        'Two-Qubit Gate Count After Optimization': compiled_two_q_gates,
-        'Two-Qubit Gate Depth Before Optimization': original_two_q_depth,
-        'Two-Qubit Gate Depth After Optimization': compiled_two_q_depth,
-        'Gate Count Before Optimization': countNumGates(quantumCircuit),
-        'Gate Count After Optimization': countNumGates(circuit),
-        'Gate Set Before Optimization': before_qc_gate_set,
-        'Gate Set After Optimization': after_qc_gate_set,
-        'Partitioner': partitionerDict[partitioner],
-        'Optimization Algorithm': passDict[pass_type],
-        'Optimization Algorithm Success Threshold': success_threshold,
-        'Optimization Algorithm Replace Filter': replace_filter,
-        'Partitioner Block Size': blockSize,
-        'Multistart Value': '2^3',
-        'Average Number of Gates in Each Partition Before Optimization': data[2],
-        'Average Number of Gates in Each Partition After Optimization':data[3],
-        'Average Number of Two-Qubit Gates in Each Partition Before Optimization': data[4],
-        'Average Number of Two-Qubit Gates in Each Partition After Optimization': data[5],
-        'Optimization Level': None,
-        'Randomly Generated Circuit': False,
-        'Framework': 'BQSkit'
-        }
+    # Per-stage timings of the compilation and the time spent computing the metrics above
+    infoDict.update(data[7])
+    infoDict['Metrics Time (seconds)'] = time.perf_counter() - eTime
         
     return infoDict 
 
@@ -1,5 +1,6 @@
-from bqskit.compiler import Compiler
 from bqskit.ir import Circuit
+from bqskit.compiler import CompilationStatus
+from bqskit.compiler.basepass import BasePass
 
 from bqskit.passes import (QSearchSynthesisPass, 
                            QuickPartitioner,
@@ -8,143 +9,406 @@ from bqskit.passes import (QSearchSynthesisPass,
                            ScanPartitioner, 
                            )
 import os
+import statistics
 import time
-from qiskit import transpile
-from bqskit.ext import qiskit_to_bqskit, bqskit_to_qiskit
+import uuid
+from ._basis_translation import translateToBasis
+from ._adaptive_blocks import candidateBlockSizes, chooseSplit
+from ._block_triage import canImprove
+from ._circuit_metrics import circuitMetrics
+from ._compilation_session import CompilationSession, _session_scope
+from ._loaded_circuit import LoadedCircuit
+from ._memory_profile import StageMemory
 
 
 
+# Default block size, and the block size value that lets the cost model choose it per region
 blockSize = 3
+adaptiveBlockSize = 'adaptive'
+
+# Default number of starting points of each instantiation of presetPartitions
+defaultMultistart = 2 ** 3
 partitionerDict = {
         0: f'ScanPartitioner{blockSize}',
         1: f'QuckPartitioner{blockSize}'
     }
+partitionerNames = {
+    0: 'ScanPartitioner',
+    1: 'QuckPartitioner'
+}
 passDict = {
     0: 'QSearch',
     1: 'LEAP'
 }
 
 
-def countNumGates(circuit):
-    num = 0
-    for gate in circuit.gate_counts:
-        num += int(circuit.count(gate))
-    return num
+# Pass data key under which _TimedPass stores the synthesis time of a block
+synthesisTimeKey = 'sersbench_synthesis_time'
 
-def countTwoQGates(circuit):
-    num = 0
-    for gate in circuit.gate_counts:
-        if gate.num_qudits == 1:
-            continue
-        num += int(circuit.count(gate))
-    return num
+class _TimedPass(BasePass):
+    """
+    Runs another pass and stores its wall time on the worker in the pass data under synthesisTimeKey.
+    """
 
-def analyzePartitions(qc: str, pass_type: int, partitioner: int, success_threshold: float, save_path: str, replace_filter: str):
+    def __init__(self, inner: BasePass):
+        self.inner = inner
+
+    async def run(self, circuit: Circuit, data) -> None:
+        start = time.perf_counter()
+        await self.inner.run(circuit, data)
+        data[synthesisTimeKey] = time.perf_counter() - start
+
+# infoDict fields holding the per-stage timings of a BQSKit compilation, in the order _timingFields returns them
+stageTimingFields = [
+    'Parse Time (seconds)',
+    'Unfold Time (seconds)',
+    'Partition Time (seconds)',
+    'Triage Time (seconds)',
+    'Skipped Block Count',
+    'Synthesized Block Count',
+    'Timed Out Block Count',
+    'Block Synthesis Time Min (seconds)',
+    'Block Synthesis Time Median (seconds)',
+    'Block Synthesis Time Max (seconds)',
+    'Block Synthesis Time Total (seconds)',
+    'Reassembly Time (seconds)',
+    'Basis Translation Time (seconds)',
+    'Save Time (seconds)',
+]
+
+def _timingFields(parse: float, unfold: float, partition: float, triage: float, skipped: int, synthesisTimes: list,
+                  timed_out: int, reassembly: float, basis_translation: float, save: float) -> dict:
     """
-    Replicates ForEachBlockPass 
+    Per-stage perf_counter timings of one compilation, keyed by their infoDict field names. skipped is the number of
+    blocks triage kept without synthesis and timed_out the number cancelled for exceeding a budget. synthesisTimes holds
+    the synthesis time of each block synthesized by the compiler; skipped, cached, repeated and timed-out blocks have none.
+    """
+    synthesisTimes = [t for t in synthesisTimes if t is not None]
+    values = [parse, unfold, partition, triage, skipped, len(synthesisTimes), timed_out,
+              min(synthesisTimes) if synthesisTimes else None,
+              statistics.median(synthesisTimes) if synthesisTimes else None,
+              max(synthesisTimes) if synthesisTimes else None,
+              float(sum(synthesisTimes)), reassembly, basis_translation, save]
+    return dict(zip(stageTimingFields, values))
+
+def partitionerName(partitioner: int, block_size: int|str = blockSize) -> str:
+    """
+    Name of a partitioner and block size used in file names and infoDicts, e.g. 'ScanPartitioner3' or
+    'ScanPartitionerAdaptive'.
+    """
+    if block_size == adaptiveBlockSize:
+        return f'{partitionerNames[partitioner]}Adaptive'
+    return f'{partitionerNames[partitioner]}{block_size}'
 
-    Parameters:
-        qc (str): Quantum circuit to be optimized. Path directory to QASM file.
+def _partitionerPass(partitioner: int, block_size: int) -> BasePass:
+    partitioners = [ScanPartitioner, QuickPartitioner]
+    return partitioners[partitioner](block_size=block_size)
 
-        pass_type (int): Optimization algorithm to use. Supports QSearch and LEAP. 0 for QSearch, 1 for LEAP. (Default: 0).
+def _blocksOf(partitioned: Circuit) -> list:
+    """
+    Returns the (location, unfolded sub-circuit) pair of every partition of a partitioned circuit, in circuit order.
+    """
+    blocks = []
+    for partition in partitioned:
+        # Creates a sub_circuit from the partition and unfolds its gates
+        sub_circ = Circuit.from_operation(partition)
+        sub_circ.unfold_all()
+        blocks.append((tuple(partition.location), sub_circ))
+    return blocks
 
-        partitioner (int): Partitions circuit into blocks of 3 qubits. Supports ScanPartitioner and QuickPartitioner. 0 for
-        ScanPartitioner and 1 for QuickPartitioner. (Default: 0).
+def partitionBlocks(circuit: Circuit, partitioner: int, compiler, block_size: int|str = blockSize) -> list:
+    """
+    Partitions circuit with the selected partitioner and returns a list of (location, unfolded sub-circuit) pairs, one per
+    partition, in circuit order. block_size is the largest number of qubits per partition, or 'adaptive' to choose it
+    per region with _adaptivePartitionBlocks.
+    """
+    if block_size == adaptiveBlockSize:
+        return _adaptivePartitionBlocks(circuit, partitioner, compiler)
+    if isinstance(block_size, bool) or not isinstance(block_size, int) or block_size < 2:
+        raise ValueError(f"block_size must be an integer of at least 2 or '{adaptiveBlockSize}', got {block_size!r}.")
 
-        success_threshold (float): The distance threshold that determines successful termintation. (Default: 1e-8).
+    # Compiles using the partitioner selected
+    return _blocksOf(compiler.compile(circuit, _partitionerPass(partitioner, block_size)))
 
-        save_path (str): The fie path to save the string to. (Default: None).
+def _adaptivePartitionBlocks(circuit: Circuit, partitioner: int, compiler) -> list:
+    """
+    Partitions circuit into regions of the largest candidate block size, partitions each region again at every smaller
+    candidate size and keeps, per region, the split that the cost model of chooseSplit rates best. The re-partitioning
+    of all regions is submitted to the compiler at once.
+    """
+    regions = partitionBlocks(circuit, partitioner, compiler, max(candidateBlockSizes))
 
-        replace_filter (str): A predicate that determines if the resulting circuit, after calling loop_body on a block, 
-        should replace the original operation. (Default: 'always'). Support for 'less-than', 'always', and 'less-than-multi'. 
+    # (region index, block size) of every split and its compiler task
+    splitKeys = []
+    ids = []
+    for index, (_, region) in enumerate(regions):
+        for size in candidateBlockSizes:
+            if size < region.num_qudits:
+                splitKeys.append((index, size))
+                ids.append(compiler.submit(region, [_partitionerPass(partitioner, size)]))
+    splits = {}
+    for i, partitioned in iter_block_results(compiler, ids):
+        splits[splitKeys[i]] = _blocksOf(partitioned)
+
+    blocks = []
+    for index, (location, region) in enumerate(regions):
+        # Candidate splits of the region, from the whole region down to the smallest blocks
+        options = [[(tuple(range(region.num_qudits)), region)]]
+        options += [splits[(index, size)] for size in sorted(candidateBlockSizes, reverse=True) if (index, size) in splits]
+        for subLocation, block in chooseSplit(options):
+            # Sub-block locations are relative to the region
+            blocks.append((tuple(location[q] for q in subLocation), block))
+    return blocks
+
+def iter_block_results(compiler, task_ids: list, poll_interval: float = 0.005, max_poll_interval: float = 0.1):
+    """
+    Yields (index, result) for each compiler task as soon as it finishes, in completion order rather than submission
+    order, so one slow block does not hold back the blocks that finished after it. Each poll requests the status of the
+    tasks still in flight only. result is what compiler.result returns: the synthesized circuit, or (circuit, pass data)
+    for tasks submitted with request_data=True.
 
+    Parameters:
+        compiler (Compiler): Compiler the tasks were submitted to.
 
-    Returns:
-        Optimized circuit, the name of the circuit, the number of gates in each partition before optimization, the number of gates
-        in each partition after optimization, the number of 2-qubit gates in each partition before optimization, and the number of 
-        two-qubit gates in each partition after optimization. If there is a valid save_path, saves compiled circuit to save_path.
-        Sets basis gates to CX, RZ, SX, X, and Measure
+        task_ids (list): Task IDs in submission order. Entries that are not task IDs (e.g. None) are skipped.
+
+        poll_interval (float): Seconds to wait before polling again when no task has finished. Doubles while nothing
+        finishes, up to max_poll_interval. (Default: 0.005)
+
+        max_poll_interval (float): Longest wait between two polls, in seconds. (Default: 0.1)
     """
+    pending = {index: id for index, id in enumerate(task_ids) if isinstance(id, uuid.UUID)}
+    wait = poll_interval
+    while pending:
+        finished = [index for index, id in pending.items() if compiler.status(id) == CompilationStatus.DONE]
+        if not finished:
+            time.sleep(wait)
+            wait = min(2 * wait, max_poll_interval)
+            continue
+        wait = poll_interval
+        for index in finished:
+            yield index, compiler.result(pending.pop(index))
 
-    # Instantiate compiler and get the file
-    compiler = Compiler()
-    circuit = Circuit.from_file(filename=qc)
-    
-    passes = [QSearchSynthesisPass(success_threshold=success_threshold), 
-            LEAPSynthesisPass(success_threshold=success_threshold)]
+def _resultOrCancel(compiler, id):
+    """
+    Returns the result of a task whose budget ran out if it finished since the last poll, and otherwise cancels it and
+    returns None.
+    """
+    if compiler.status(id) == CompilationStatus.DONE:
+        return compiler.result(id)
+    compiler.cancel(id)
+    return None
 
-    partitioners = [ScanPartitioner(block_size=blockSize), 
-                    QuickPartitioner(block_size=blockSize)]
+def _iterBudgetedBlocks(compiler, blocks: dict, workflow: list, block_budget: float = None, circuit_budget: float = None,
+                        max_running: int = None, poll_interval: float = 0.005, max_poll_interval: float = 0.1):
+    """
+    Submits blocks (index -> circuit) to compiler in index order and yields (index, (circuit, pass data)) for each block
+    as soon as it finishes, or (index, None) for a block cancelled because it ran out of budget.
+
+    At most max_running blocks are in flight at once (all of them if None), and each poll requests the status of those
+    blocks only, so polls stay bounded however many blocks the circuit has and a worker's next block is submitted as
+    soon as it is free. A block is cancelled once block_budget seconds have passed since its submission; once
+    circuit_budget seconds have passed since the first submission, every block still running or waiting is cancelled.
+    A block's status is checked before it is cancelled, so one that finished since the last poll keeps its result.
+    Polling backs off like iter_block_results.
+    """
+    queue = sorted(blocks.items(), reverse=True)
+    # index -> (task ID, submission time)
+    running = {}
+    start = time.perf_counter()
+    wait = poll_interval
+    while queue or running:
+        if circuit_budget is not None and time.perf_counter() - start > circuit_budget:
+            for index, (id, _) in running.items():
+                yield index, _resultOrCancel(compiler, id)
+            running.clear()
+            while queue:
+                yield queue.pop()[0], None
+            return
+
+        while queue and (max_running is None or len(running) < max_running):
+            index, circuit = queue.pop()
+            running[index] = (compiler.submit(circuit, workflow, request_data=True), time.perf_counter())
+
+        finished = [index for index, (id, _) in running.items() if compiler.status(id) == CompilationStatus.DONE]
+        for index in finished:
+            yield index, compiler.result(running.pop(index)[0])
+
+        expired = []
+        if block_budget is not None:
+            now = time.perf_counter()
+            expired = [index for index, (_, submitted) in running.items() if now - submitted > block_budget]
+        for index in expired:
+            yield index, _resultOrCancel(compiler, running.pop(index)[0])
+
+        if finished or expired:
+            wait = poll_interval
+        elif running:
+            time.sleep(wait)
+            wait = min(2 * wait, max_poll_interval)
+
+def _workerCount(session: CompilationSession) -> int | None:
+    if session.num_workers > 0:
+        return session.num_workers
+    # The worker count of an external runtime is not known here, so its blocks are not held back
+    return None if session.is_external else (os.cpu_count() or 1)
+
+def _collectBlockResults(compiler, block_cache, ids: list, cacheKeys: list, pending: dict, workflow: list,
+                         block_budget: float = None, circuit_budget: float = None, max_running: int = None) -> tuple:
+    """
+    Synthesizes the partitions in pending (index -> sub-circuit) with workflow and returns the synthesized circuit of
+    every partition, the synthesis time of every partition synthesized by the compiler (None for the others) and the
+    number of timed-out partitions. Each entry of ids is either None for a pending partition, a circuit taken from the
+    block cache or kept by triage, or the index of an earlier identical partition. Results are collected with
+    _iterBudgetedBlocks and freshly synthesized blocks are added to the block cache. Partitions cancelled for exceeding
+    a budget keep their original sub-circuit and are not cached.
+    """
+    synthesizedBlocks = [id if isinstance(id, Circuit) else None for id in ids]
+    synthesisTimes = [None] * len(ids)
+    timedOut = 0
+    for index, result in _iterBudgetedBlocks(compiler, pending, workflow, block_budget, circuit_budget, max_running):
+        if result is None:
+            synthesizedBlocks[index] = pending[index].copy()
+            timedOut += 1
+            continue
+        sub_circ, passData = result
+        synthesizedBlocks[index] = sub_circ
+        synthesisTimes[index] = passData.get(synthesisTimeKey)
+        if block_cache is not None:
+            block_cache.put(cacheKeys[index], sub_circ)
+
+    # Repeated partitions get a copy of the first identical partition's result
+    for index, id in enumerate(ids):
+        if isinstance(id, int):
+            synthesizedBlocks[index] = synthesizedBlocks[id].copy()
+    return synthesizedBlocks, synthesisTimes, timedOut
+
+def _optimizeBlocks(blocks: list, num_qudits: int, pass_type: int, success_threshold: float, replace_filter: str,
+                    session: CompilationSession, memory: StageMemory, triage: bool = False, multistart: int = None,
+                    block_budget: float = None, circuit_budget: float = None) -> tuple:
+    """
+    Synthesizes the partitions of blocks ((location, sub-circuit) pairs as returned by partitionBlocks) with pass_type,
+    reassembles a circuit on num_qudits qudits from the synthesized or original partitions as replace_filter decides and
+    translates it to the CX, RZ, SX, X basis. This is everything analyzePartitions and presetPartitions do after
+    partitioning; they only differ in how they obtain blocks.
 
-    # Unfolds all gates
-    circuit.unfold_all()
-    circuit.remove_all_measurements()
+    Partitions kept by triage, found in the session's block cache or identical to an earlier partition of the circuit
+    are not submitted. The Block Synthesis, Reassembly and Basis Translation stages are measured with memory.
+
+    Returns:
+        The translated circuit, the average number of gates and of two-qubit gates per partition before and after
+        optimization as a list, and the stage results as keyword arguments of _timingFields (all but parse, unfold,
+        partition and save).
+    """
+    compiler = session.compiler
+    instantiate_options = {} if multistart is None else {'multistart': multistart}
+    passes = [QSearchSynthesisPass(success_threshold=success_threshold, instantiate_options=instantiate_options),
+            LEAPSynthesisPass(success_threshold=success_threshold, instantiate_options=instantiate_options)]
 
-    # Compiles using the partitioner selected
-    out = compiler.compile(circuit, partitioners[partitioner])
-    
     # Workflow
-    optimization_workflow = [passes[pass_type], UnfoldPass()]
+    optimization_workflow = [_TimedPass(passes[pass_type]), UnfoldPass()]
 
-    # Ids of submitted sub-circuits
+    # Ids of submitted sub-circuits. Cached blocks hold the cached circuit instead, and repeated blocks hold the index of
+    # the first identical block
     ids = []
 
+    # Block cache of the session, the cache key of each partition and the first partition with each key
+    block_cache = session.block_cache
+    cacheKeys = []
+    firstIndexByKey = {}
+
+    # Number of blocks kept by triage and the time spent deciding
+    skipped = 0
+    triageTime = 0.0
+
+    # Partitions to synthesize, by index
+    pending = {}
+
     # Respective locations in the original circuit
     locations = []
 
+    # Iterates over each partition of the circuit
     partitionList = []
-    # Iterates over each partition of the compiled circuit (out)
-    for partition in out:
+    
+    # for clifford_10_98001 there is 183 partitions
+    memory.start('Block Synthesis')
+    for location, sub_circ in blocks:
         # Appends the location of the partition in the original circuit to the locations list
-        locations.append(partition.location)
-
-        # Creates a sub_circuit from the partition
-        sub_circ = Circuit.from_operation(partition)
-
-        # Unfolds gates in sub_circ
-        sub_circ.unfold_all()
+        locations.append(location)
         partitionList.append(sub_circ)
 
-        # Submits a compilation task using the workflow above to the compiler. Returns an ID that represents the completed task
-        id = compiler.submit(sub_circ, optimization_workflow)
-
-        # appends the ID of the compilation task to the ID list, allowing for the tracking of the partition optimizations 
-        ids.append(id)
-
-
-    # Checks the status of all submitted circuits, waiting until they are all compiled (status 2)
-    #while all(compiler.status(id) != 2 for id in ids):
-    #    continue
+        # Keeps the original block if synthesis cannot make it replace the original under replace_filter
+        if triage:
+            triageStart = time.perf_counter()
+            improvable = canImprove(sub_circ, replace_filter, success_threshold)
+            triageTime += time.perf_counter() - triageStart
+            if not improvable:
+                ids.append(sub_circ.copy())
+                if block_cache is not None:
+                    cacheKeys.append(None)
+                skipped += 1
+                continue
+
+        # Skips the compiler if the block is cached or an identical block of this circuit was already submitted
+        if block_cache is not None:
+            key = block_cache.key(sub_circ, passDict[pass_type], success_threshold, multistart)
+            cacheKeys.append(key)
+            if key in firstIndexByKey:
+                ids.append(firstIndexByKey[key])
+                continue
+            cached = block_cache.get(key)
+            if cached is not None:
+                ids.append(cached)
+                continue
+            firstIndexByKey[key] = len(ids)
+
+        # Queues the partition for synthesis; it is submitted to the compiler with the workflow above while the results
+        # are collected
+        pending[len(ids)] = sub_circ
+        ids.append(None)
+
+
+    # Collects the synthesized partitions as they finish; they are reassembled below in partition order. Blocks in
+    # flight are bounded so that every poll is. Without a block budget each worker also has its next block
+    # queued; with one, a block's budget starts at submission, so it is only submitted once a worker is free
+    workers = _workerCount(session)
+    max_running = None if workers is None else (workers if block_budget is not None else 2 * workers)
+    synthesizedBlocks, synthesisTimes, timedOut = _collectBlockResults(compiler, block_cache, ids, cacheKeys, pending,
+                                                                       optimization_workflow, block_budget,
+                                                                       circuit_budget, max_running)
+    memory.stop()
+
+    memory.start('Reassembly')
+    reassemblyStart = time.perf_counter()
 
     # New circuit is instantiated to hold the final optimized circuits, initialized with the same amount of qudits as the original circuit
-    final_circuit = Circuit(num_qudits=circuit.num_qudits)
+    final_circuit = Circuit(num_qudits=num_qudits)
 
     # List of the optimized subcircuits
     optimized_subcircuit = []
-    
+
     numGatesBeforeOptimization = []
     numGatesAfterOptimization = []
     numTwoQGatesBeforeOptimizatoon = []
     numTwoQGatesAfterOptimization = []
 
-    
-    for id, loc, originalSubcirc in zip(ids, locations, partitionList):
-        
-        if (replace_filter == 'always'):
-            replace_filter_condition_met = True
-        # retrieves the result by calling the compiled partition's ID
-        sub_circ = compiler.result(id)
-        numGatesBeforeOptimization.append(countNumGates(originalSubcirc))
-        numGatesAfterOptimization.append(countNumGates(sub_circ))
-        numTwoQGatesBeforeOptimizatoon.append(countTwoQGates(originalSubcirc))
-        numTwoQGatesAfterOptimization.append(countTwoQGates(sub_circ))
+    for sub_circ, loc, originalSubcirc in zip(synthesizedBlocks, locations, partitionList):
+        replace_filter_condition_met = True
 
+        before = circuitMetrics(originalSubcirc)
+        after = circuitMetrics(sub_circ)
+        numGatesBeforeOptimization.append(before.num_gates)
+        numGatesAfterOptimization.append(after.num_gates)
+        numTwoQGatesBeforeOptimizatoon.append(before.multi_qudit_gates)
+        numTwoQGatesAfterOptimization.append(after.multi_qudit_gates)
+        
+        
         if replace_filter == 'less-than':
-            replace_filter_condition_met = countNumGates(originalSubcirc) > countNumGates(sub_circ)
+            replace_filter_condition_met = before.num_gates > after.num_gates
         if replace_filter == 'less-than-multi':
-            replace_filter_condition_met = countTwoQGates(originalSubcirc) > countTwoQGates(sub_circ)
-    
-    
+            replace_filter_condition_met = before.multi_qudit_gates > after.multi_qudit_gates
+        
+        
         if replace_filter_condition_met:
             # adds the unfolded optimized partition to the optimized_subcircuit list 
             optimized_subcircuit.append(sub_circ.unfold_all())
@@ -157,48 +421,166 @@ def analyzePartitions(qc: str, pass_type: int, partitioner: int, success_thresho
             final_circuit.append_circuit(originalSubcirc, loc)
 
     final_circuit.unfold_all() # unfold any circuit gates
+    reassemblyTime = time.perf_counter() - reassemblyStart
+    memory.stop()
     
-    final_circuit = bqskit_to_qiskit(final_circuit)
-    
-    final_circuit = transpile(final_circuit, optimization_level=0, basis_gates=['x','sx','rz','cx'])
-    final_circuit = qiskit_to_bqskit(final_circuit)
-    final_circuit.unfold_all()
+    # Translates to the CX, RZ, SX, X basis in BQSKit, giving the same gates as a level 0 Qiskit transpile
+    memory.start('Basis Translation')
+    basisStart = time.perf_counter()
+    final_circuit = translateToBasis(final_circuit)
+    basisTime = time.perf_counter() - basisStart
+    memory.stop()
+
+    averages = [sum(numGatesBeforeOptimization)/len(numGatesBeforeOptimization),
+                sum(numGatesAfterOptimization)/len(numGatesAfterOptimization),
+                sum(numTwoQGatesBeforeOptimizatoon)/len(numTwoQGatesBeforeOptimizatoon),
+                sum(numTwoQGatesAfterOptimization)/len(numTwoQGatesAfterOptimization)]
+    timings = {'triage': triageTime, 'skipped': skipped, 'synthesisTimes': synthesisTimes, 'timed_out': timedOut,
+               'reassembly': reassemblyTime, 'basis_translation': basisTime}
+    return final_circuit, averages, timings
+
+def analyzePartitions(qc: str, pass_type: int, partitioner: int, success_threshold: float, save_path: str, replace_filter: str,
+                      session: CompilationSession = None, triage: bool = False, block_size: int|str = blockSize,
+                      block_budget: float = None, circuit_budget: float = None):
+    """
+    Replicates ForEachBlockPass 
+
+    Parameters:
+        qc (str): Quantum circuit to be optimized. Path directory to QASM file.
+
+        pass_type (int): Optimization algorithm to use. Supports QSearch and LEAP. 0 for QSearch, 1 for LEAP. (Default: 0).
+
+        partitioner (int): Partitions circuit into blocks of block_size qubits. Supports ScanPartitioner and QuickPartitioner. 0 for
+        ScanPartitioner and 1 for QuickPartitioner. (Default: 0).
+
+        success_threshold (float): The distance threshold that determines successful termintation. (Default: 1e-8).
+
+        save_path (str): The fie path to save the string to. (Default: None).
+
+        replace_filter (str): A predicate that determines if the resulting circuit, after calling loop_body on a block, 
+        should replace the original operation. (Default: 'always'). Support for 'less-than', 'always', and 'less-than-multi'. 
+
+        session (CompilationSession): Session whose warm Compiler is used for partitioning and block synthesis. If None, a
+        temporary session is started and closed before returning. (Default: None).
+
+        triage (bool): Keeps blocks that synthesis provably cannot improve under replace_filter without synthesizing
+        them. Only 'less-than-multi' has such blocks: ones without multi-qubit gates, or whose multi-qubit gate count is
+        already at a structural lower bound (e.g. a single CX that is not a local product). The optimized circuit is the
+        same, but skipped blocks count with their original gate counts in the averages after optimization, where an
+        untriaged run counts the synthesized block even if it is then rejected, so the averages differ. Their number is
+        reported as 'Skipped Block Count'. (Default: False).
+
+        block_size (int|str): Largest number of qubits per partition, or 'adaptive' to choose 2, 3 or 4 per circuit
+        region from expected synthesis time against expected gate reduction. (Default: 3).
+
+        block_budget (float): Wall-clock seconds a block may spend in synthesis. A block that runs longer is cancelled
+        and its original sub-circuit is kept. While a block budget is set, at most one block per worker is in flight,
+        so a block's clock starts when it is handed to the workers rather than while it waits behind other blocks.
+        If None, blocks have no limit. (Default: None).
+
+        circuit_budget (float): Wall-clock seconds the synthesis of all blocks of the circuit may take. When it runs
+        out, every unfinished block is cancelled and keeps its original sub-circuit. If None, there is no limit.
+        (Default: None).
+
+
+    Returns:
+        Optimized circuit, the name of the circuit, the number of gates in each partition before optimization, the number of gates
+        in each partition after optimization, the number of 2-qubit gates in each partition before optimization, and the number of 
+        two-qubit gates in each partition after optimization, the time taken to save the circuit and a dictionary of per-stage
+        timings (and memory peaks, if the session profiles memory) keyed by their infoDict field names. If there is a
+        valid save_path, saves compiled circuit to save_path.
+        Sets basis gates to CX, RZ, SX, X, and Measure
+    """
+
+    # Get the compiler from the session and get the file. A temporary session is started if none was given and shut
+    # down when leaving the with block, also if partitioning or synthesis raises
+    with _session_scope(session) as session:
+        compiler = session.compiler
+        memory = StageMemory(session.memory_profiler)
+        memory.start('Parse')
+        parseStart = time.perf_counter()
+        circuit = Circuit.from_file(filename=qc)
+        parseTime = time.perf_counter() - parseStart
+        memory.stop()
+
+        # Multistart is left at the instantiater default
+        multistart = None
+
+        # Unfolds all gates
+        memory.start('Unfold')
+        unfoldStart = time.perf_counter()
+        circuit.unfold_all()
+        circuit.remove_all_measurements()
+        unfoldTime = time.perf_counter() - unfoldStart
+        memory.stop()
+
+        # Partitions using the partitioner selected
+        memory.start('Partition')
+        partitionStart = time.perf_counter()
+        blocks = partitionBlocks(circuit, partitioner, compiler, block_size)
+        partitionTime = time.perf_counter() - partitionStart
+        memory.stop()
+
+        final_circuit, averages, timings = _optimizeBlocks(blocks, circuit.num_qudits, pass_type, success_threshold,
+                                                           replace_filter, session, memory, triage, multistart,
+                                                           block_budget, circuit_budget)
 
-    compiler.close()
     # Start time of the stuff after compilation
-    sTime = time.time()
+    memory.start('Save')
+    sTime = time.perf_counter()
     # get the name of the QASM file without the .qasm
     index = qc.rfind('/')
     file_name = qc[index+1:len(qc)-5]
 
     # Save circuit
     if isinstance(save_path,str):
-        final_circuit.save(f'{save_path}/{file_name}_{success_threshold}_{partitionerDict[partitioner]}_{passDict[pass_type]}.qasm')
+        final_circuit.save(f'{save_path}/{file_name}_{success_threshold}_{partitionerName(partitioner, block_size)}_{passDict[pass_type]}.qasm')
         
     # End time of the stuff after compilation
-    eTime = time.time()
+    eTime = time.perf_counter()
+    memory.stop()
     
     # Return optimized circuit, the name of the circuit, the number of gates in each partition before optimization, the number of gates
     # in each partition after optimization, the number of 2-qubit gates in each partition before optimization, the extra time taken
-    # to save the circuit and the number of two-qubit gates in each partition after optimization.
+    # to save the circuit, the number of two-qubit gates in each partition after optimization and the per-stage timings
+    # (with the per-stage memory peaks if the session profiles memory).
     return [final_circuit, 
-            f'{file_name}_{success_threshold}_{partitionerDict[partitioner]}_{passDict[pass_type]}.qasm', 
-            sum(numGatesBeforeOptimization)/len(numGatesBeforeOptimization),
-            sum(numGatesAfterOptimization)/len(numGatesAfterOptimization),
-            sum(numTwoQGatesBeforeOptimizatoon)/len(numTwoQGatesBeforeOptimizatoon),
-            sum(numTwoQGatesAfterOptimization)/len(numTwoQGatesAfterOptimization),
-            eTime-sTime]
-
-def presetPartitions(qc: str|Circuit, pass_type: int, partitioner: int, success_threshold: float, save_path: str, replace_filter: str, circuit_name: str = None):
+            f'{file_name}_{success_threshold}_{partitionerName(partitioner, block_size)}_{passDict[pass_type]}.qasm', 
+            *averages,
+            eTime-sTime,
+            {**_timingFields(parse=parseTime, unfold=unfoldTime, partition=partitionTime, save=eTime-sTime, **timings),
+             **memory.fields()}]
+
+def preparePartitions(qc: LoadedCircuit, partitioner: int, block_size: int|str, session: CompilationSession) -> list:
+    """
+    Returns the partition blocks of qc for partitioner and block_size. The first time, they are computed on the session's
+    runtime and stored in qc with their time and memory peaks, so later passes share them. Calling it before timing the
+    passes keeps the shared partitioning out of every pass's time; it is reported in the Partition stage field instead.
+    """
+    partitionKey = (partitioner, block_size)
+    if partitionKey not in qc.partitions:
+        memory = StageMemory(session.memory_profiler)
+        memory.start('Partition')
+        partitionStart = time.perf_counter()
+        qc.partitions[partitionKey] = partitionBlocks(qc.circuit, partitioner, session.compiler, block_size)
+        qc.partition_times[partitionKey] = time.perf_counter() - partitionStart
+        memory.stop()
+        qc.partition_memory[partitionKey] = memory.peaks.get('Partition')
+    return qc.partitions[partitionKey]
+
+def presetPartitions(qc: str|Circuit|LoadedCircuit, pass_type: int, partitioner: int, success_threshold: float, save_path: str, replace_filter: str, circuit_name: str = None,
+                     session: CompilationSession = None, triage: bool = False, multistart: int = defaultMultistart,
+                     block_size: int|str = blockSize, block_budget: float = None, circuit_budget: float = None):
     """
     Replicates ForEachBlockPass with preset partitions
 
     Parameters:
-        qc (str): Quantum circuit to be optimized. Path directory to QASM file.
+        qc (str|Circuit|LoadedCircuit): Quantum circuit to be optimized. Path directory to QASM file, a Circuit, or a
+        LoadedCircuit whose prepared circuit and partitions are reused across calls.
 
         pass_type (int): Optimization algorithm to use. Supports QSearch and LEAP. 0 for QSearch, 1 for LEAP. (Default: 0).
 
-        partitioner (int): Partitions circuit into blocks of 3 qubits. Supports ScanPartitioner and QuickPartitioner. 0 for
+        partitioner (int): Partitions circuit into blocks of block_size qubits. Supports ScanPartitioner and QuickPartitioner. 0 for
         ScanPartitioner and 1 for QuickPartitioner. (Default: 0).
 
         success_threshold (float): The distance threshold that determines successful termintation. (Default: 1e-8).
@@ -208,134 +590,101 @@ def presetPartitions(qc: str|Circuit, pass_type: int, partitioner: int, success_
         replace_filter (str): A predicate that determines if the resulting circuit, after calling loop_body on a block, 
         should replace the original operation. (Default: 'always'). Support for 'less-than', 'always', and 'less-than-multi'. 
 
+        session (CompilationSession): Session whose warm Compiler is used for partitioning and block synthesis. If None, a
+        temporary session is started and closed before returning. (Default: None).
 
-    Returns:
-        Optimized circuit saved to the save_path and a dictionary containing information about the optimization process.
-    """    
-    
-    # Instantiate compiler and get the file
-    compiler = Compiler()
-    if isinstance(qc,str):
-        circuit = Circuit.from_file(filename=qc)
-    else:
-        circuit = qc
-
-    # Unfolds all gates
-    circuit.unfold_all()
-    circuit.remove_all_measurements()
-
-    # Gate set to use
-
-    passes = [QSearchSynthesisPass(success_threshold=success_threshold, instantiate_options={'multistart': 2 ** 3}), 
-            LEAPSynthesisPass(success_threshold=success_threshold, instantiate_options={'multistart': 2 ** 3})]
-
-    partitioners = [ScanPartitioner(block_size=blockSize), 
-                    QuickPartitioner(block_size=blockSize)]
-    
-    # Compiles using the partitioner selected
-    
-    out = compiler.compile(circuit, partitioners[partitioner])
-    
-    # Workflow
-    optimization_workflow = [passes[pass_type], UnfoldPass()]
-
-    # Ids of submitted sub-circuits
-    ids = []
-
-    # Respective locations in the original circuit
-    locations = []
-
-    # Iterates over each partition of the compiled circuit (out)
-    partitionList = []
-    
-    # for clifford_10_98001 there is 183 partitions
-    for partition in out:
-        # Appends the location of the partition in the original circuit to the locations list
-        locations.append(partition.location)
-
-        # Creates a sub_circuit from the partition
-        sub_circ = Circuit.from_operation(partition)
+        triage (bool): Keeps blocks that synthesis provably cannot improve under replace_filter without synthesizing
+        them. Only 'less-than-multi' has such blocks: ones without multi-qubit gates, or whose multi-qubit gate count is
+        already at a structural lower bound (e.g. a single CX that is not a local product). The optimized circuit is the
+        same, but skipped blocks count with their original gate counts in the averages after optimization, where an
+        untriaged run counts the synthesized block even if it is then rejected, so the averages differ. Their number is
+        reported as 'Skipped Block Count'. (Default: False).
 
-        # Unfolds gates in sub_circ
-        sub_circ.unfold_all()
-        partitionList.append(sub_circ)
+        multistart (int): Number of starting points of each instantiation. If None, the instantiater default is used.
+        (Default: 8).
 
-        # Submits a compilation task using the workflow above to the compiler. Returns an ID that represents the completed task
-        id = compiler.submit(sub_circ, optimization_workflow)
+        block_size (int|str): Largest number of qubits per partition, or 'adaptive' to choose 2, 3 or 4 per circuit
+        region from expected synthesis time against expected gate reduction. (Default: 3).
 
-        # appends the ID of the compilation task to the ID list, allowing for the tracking of the partition optimizations 
-        ids.append(id)
+        block_budget (float): Wall-clock seconds a block may spend in synthesis. A block that runs longer is cancelled
+        and its original sub-circuit is kept. While a block budget is set, at most one block per worker is in flight,
+        so a block's clock starts when it is handed to the workers rather than while it waits behind other blocks.
+        If None, blocks have no limit. (Default: None).
 
+        circuit_budget (float): Wall-clock seconds the synthesis of all blocks of the circuit may take. When it runs
+        out, every unfinished block is cancelled and keeps its original sub-circuit. If None, there is no limit.
+        (Default: None).
 
-    # Checks the status of all submitted circuits, waiting until they are all compiled (status 2)
-    #while all(compiler.status(id) != 2 for id in ids):
-    #    continue
-
-    # New circuit is instantiated to hold the final optimized circuits, initialized with the same amount of qudits as the original circuit
-    final_circuit = Circuit(num_qudits=circuit.num_qudits)
 
-    # List of the optimized subcircuits
-    optimized_subcircuit = []
+    Returns:
+        Optimized circuit saved to the save_path and a dictionary containing information about the optimization process.
+        The last element is a dictionary of per-stage timings (and memory peaks, if the session profiles memory), keyed
+        by their infoDict field names.
+    """    
     
-    numGatesBeforeOptimization = []
-    numGatesAfterOptimization = []
-    numTwoQGatesBeforeOptimizatoon = []
-    numTwoQGatesAfterOptimization = []
-
-    for id, loc, originalSubcirc in zip(ids, locations, partitionList):
-        replace_filter_condition_met = True
-        # retrieves the result by calling the compiled partition's ID
-        sub_circ = compiler.result(id)
-
-        numGatesBeforeOptimization.append(countNumGates(originalSubcirc))
-        numGatesAfterOptimization.append(countNumGates(sub_circ))
-        numTwoQGatesBeforeOptimizatoon.append(countTwoQGates(originalSubcirc))
-        numTwoQGatesAfterOptimization.append(countTwoQGates(sub_circ))
-        
-        
-        if replace_filter == 'less-than':
-            replace_filter_condition_met = countNumGates(originalSubcirc) > countNumGates(sub_circ)
-        if replace_filter == 'less-than-multi':
-            replace_filter_condition_met = countTwoQGates(originalSubcirc) > countTwoQGates(sub_circ)
-        
-        
-        if replace_filter_condition_met:
-            # adds the unfolded optimized partition to the optimized_subcircuit list 
-            optimized_subcircuit.append(sub_circ.unfold_all())
-            # Merge sub_circ (the optimized partition) into the finalized circuit. Loc specifies where to append sub_circ to (which qubits)
-            final_circuit.append_circuit(sub_circ, loc)
+    # Get the compiler from the session and get the file. A temporary session is started if none was given and shut
+    # down when leaving the with block, also if partitioning or synthesis raises
+    with _session_scope(session) as session:
+        compiler = session.compiler
+        memory = StageMemory(session.memory_profiler)
+        if isinstance(qc, LoadedCircuit):
+            # Already parsed and prepared; partitions are computed once per partitioner and reused, and so are the memory
+            # peaks measured while doing so
+            circuit = qc.circuit
+            partitionKey = (partitioner, block_size)
+            memory.peaks.update(qc.memory_peaks)
+            blocks = preparePartitions(qc, partitioner, block_size, session)
+            if qc.partition_memory.get(partitionKey) is not None:
+                memory.peaks['Partition'] = qc.partition_memory[partitionKey]
+            parseTime, unfoldTime, partitionTime = qc.parse_time, qc.unfold_time, qc.partition_times[partitionKey]
         else:
-            # adds the unfolded original partition to the optimized_subcircuit list 
-            optimized_subcircuit.append(originalSubcirc.unfold_all())
-            # Merge originalSubCirq (the original partition) into the finalized circuit. Loc specifies where to append sub_circ to (which qubits)
-            final_circuit.append_circuit(originalSubcirc, loc)
-
-    final_circuit.unfold_all() # unfold any circuit gates
-    
-    final_circuit = bqskit_to_qiskit(final_circuit)
-    
-    final_circuit = transpile(final_circuit, optimization_level=0, basis_gates=['x','sx','rz','cx'])
-    final_circuit = qiskit_to_bqskit(final_circuit)
-    final_circuit.unfold_all()
+            memory.start('Parse')
+            parseStart = time.perf_counter()
+            if isinstance(qc,str):
+                circuit = Circuit.from_file(filename=qc)
+            else:
+                circuit = qc
+            parseTime = time.perf_counter() - parseStart
+            memory.stop()
+
+            # Unfolds all gates
+            memory.start('Unfold')
+            unfoldStart = time.perf_counter()
+            circuit.unfold_all()
+            circuit.remove_all_measurements()
+            unfoldTime = time.perf_counter() - unfoldStart
+            memory.stop()
+
+            # Partitions using the partitioner selected
+            memory.start('Partition')
+            partitionStart = time.perf_counter()
+            blocks = partitionBlocks(circuit, partitioner, compiler, block_size)
+            partitionTime = time.perf_counter() - partitionStart
+            memory.stop()
+
+        final_circuit, averages, timings = _optimizeBlocks(blocks, circuit.num_qudits, pass_type, success_threshold,
+                                                           replace_filter, session, memory, triage, multistart,
+                                                           block_budget, circuit_budget)
 
-    compiler.close()
     # Start time of the stuff after compilation
-    sTime = time.time()
+    memory.start('Save')
+    sTime = time.perf_counter()
     
     # Save circuit
 
     if isinstance(save_path,str) and os.path.isdir(save_path):
-        final_circuit.save(f'{save_path}/{circuit_name}_{success_threshold}_{partitionerDict[partitioner]}_{passDict[pass_type]}.qasm')
+        final_circuit.save(f'{save_path}/{circuit_name}_{success_threshold}_{partitionerName(partitioner, block_size)}_{passDict[pass_type]}.qasm')
 
     # End time of the stuff after Compilation
-    eTime = time.time()
+    eTime = time.perf_counter()
+    memory.stop()
     # Return optimized circuit, the name of the circuit, the number of gates in each partition before optimization, the number of gates
     # in each partition after optimization, the number of 2-qubit gates in each partition before optimization, the extra time taken
-    # to save the circuit and the number of two-qubit gates in each partition after optimization.
+    # to save the circuit, the number of two-qubit gates in each partition after optimization and the per-stage timings
+    # (with the per-stage memory peaks if the session profiles memory).
     return [final_circuit, 
-            f'{circuit_name}_{success_threshold}_{partitionerDict[partitioner]}_{passDict[pass_type]}.qasm', 
-            sum(numGatesBeforeOptimization)/len(numGatesBeforeOptimization),
-            sum(numGatesAfterOptimization)/len(numGatesAfterOptimization),
-            sum(numTwoQGatesBeforeOptimizatoon)/len(numTwoQGatesBeforeOptimizatoon),
-            sum(numTwoQGatesAfterOptimization)/len(numTwoQGatesAfterOptimization),
-            eTime-sTime]
\ No newline at end of file
+            f'{circuit_name}_{success_threshold}_{partitionerName(partitioner, block_size)}_{passDict[pass_type]}.qasm', 
+            *averages,
+            eTime-sTime,
+            {**_timingFields(parse=parseTime, unfold=unfoldTime, partition=partitionTime, save=eTime-sTime, **timings),
+             **memory.fields()}]
\ No newline at end of file
@@ -1,8 +1,22 @@
 from ._bqskit_comp_bqskitTests import optimizationAnalysis
+from ._bqskit_comp_partitoner import blockSize
 from pathlib import Path
+from ._compilation_session import CompilationSession, _session_scope
+from ._parallel_compile import iterFilesInParallel
+from ._results_log import ResultsLog
+
+def _resultsLogConfig(replace_filter: str, success_threshold: float, partitioner: int, pass_type: int,
+                      block_size: int|str, block_budget: float, circuit_budget: float) -> dict:
+    """
+    Settings that identify a BQSKit compilation in a results log.
+    """
+    return {'function': 'optimizeBQSkit', 'replace_filter': replace_filter, 'success_threshold': success_threshold,
+            'partitioner': partitioner, 'pass_type': pass_type, 'block_size': block_size, 'block_budget': block_budget,
+            'circuit_budget': circuit_budget}
 
 def optimizeBQSkitFromFile(qc: str, replace_filter: str = 'always', save_path: str = None, success_threshold: float = 1e-8, 
-    partitioner: int = 0, pass_type: int = 0):
+    partitioner: int = 0, pass_type: int = 0, session: CompilationSession = None, jsonl_path: str = None,
+    block_size: int|str = blockSize, block_budget: float = None, circuit_budget: float = None):
     """
     Optimize a circuit using BQSkit from a QASM file 
 
@@ -24,24 +38,54 @@ def optimizeBQSkitFromFile(qc: str, replace_filter: str = 'always', save_path: s
 
         pass_type (int): Optimization algorithm to use. Supports QSearch and LEAP. 0 for QSearch, 1 for LEAP. (Default: 0).
 
+        session (CompilationSession): Session whose Compiler is reused for the compilation. If None, a temporary one is used.
+        (Default: None).
+
+        jsonl_path (str): Path of a JSON-Lines results log. The result is appended to it, and if the log already holds a
+        result for this file's contents and settings, that result is returned without compiling. (Default: None).
+
+        block_size (int|str): Largest number of qubits per partition, or 'adaptive' to choose 2, 3 or 4 per circuit
+        region. (Default: 3).
+
+        block_budget (float): Wall-clock seconds a partition block may spend in synthesis before it is cancelled and its
+        original sub-circuit kept. If None, blocks have no limit. (Default: None).
+
+        circuit_budget (float): Wall-clock seconds the block synthesis of one circuit may take in total; unfinished
+        blocks are then cancelled and keep their original sub-circuit. If None, there is no limit. (Default: None).
+
     Returns:
     
         Dictionary contianing information about the circuit before/after optimization inside a list.
     """
 
+    # Returns the recorded result if this file was already compiled with these settings
+    results_log = None
+    if jsonl_path is not None:
+        results_log = ResultsLog(jsonl_path, _resultsLogConfig(replace_filter, success_threshold, partitioner, pass_type,
+                                                                block_size, block_budget, circuit_budget))
+        if results_log.completed(qc):
+            return results_log.results([qc])[0]
+
     infoDict = optimizationAnalysis(qc=qc, 
                    save_path=save_path, 
                    success_threshold=success_threshold, 
                    partitioner=partitioner, 
                    pass_type=pass_type,
-                   replace_filter=replace_filter)
+                   replace_filter=replace_filter,
+                   session=session,
+                   block_size=block_size,
+                   block_budget=block_budget,
+                   circuit_budget=circuit_budget)
     
     circuit_list = [infoDict]
+    if results_log is not None:
+        results_log.append(qc, circuit_list)
 
     return circuit_list
 
 def optimizeBQSkitFromDirectory(qc: str, replace_filter: str = 'always', save_path: str = None, success_threshold: float = 1e-8, 
-    partitioner: int = 0, pass_type: int = 0):
+    partitioner: int = 0, pass_type: int = 0, session: CompilationSession = None, max_concurrent: int = 1, max_workers: int = None,
+    jsonl_path: str = None, block_size: int|str = blockSize, block_budget: float = None, circuit_budget: float = None):
     """
     Optimize a circuit using BQSkit from a QASM file.
 
@@ -63,31 +107,128 @@ def optimizeBQSkitFromDirectory(qc: str, replace_filter: str = 'always', save_pa
 
         pass_type (int): Optimization algorithm to use. Supports QSearch and LEAP. 0 for QSearch, 1 for LEAP. (Default: 0).
 
+        session (CompilationSession): Session whose Compiler is reused for every file. If None, one session is started for
+        the whole directory and closed afterwards. In parallel mode only its on-disk block cache is shared. (Default: None).
+
+        max_concurrent (int): Number of files compiled at once in separate processes. 1 compiles the files one after
+        another; None chooses the number from the CPU count and available memory. (Default: 1).
+
+        max_workers (int): Cap on the total number of BQSKit worker processes in parallel mode, split evenly between the
+        concurrent compilations. If None, the CPU count is used. (Default: None).
+
+        jsonl_path (str): Path of a JSON-Lines results log. Each circuit's result is appended as soon as it finishes, and
+        files whose contents and settings are already recorded are skipped, so an interrupted run can be resumed by
+        calling again with the same log. The results are then returned as a LoggedResults that reads them back from the
+        log when iterated, rather than as a list, so the directory is never held in memory. (Default: None).
+
+        block_size (int|str): Largest number of qubits per partition, or 'adaptive' to choose 2, 3 or 4 per circuit
+        region. (Default: 3).
+
+        block_budget (float): Wall-clock seconds a partition block may spend in synthesis before it is cancelled and its
+        original sub-circuit kept. If None, blocks have no limit. (Default: None).
+
+        circuit_budget (float): Wall-clock seconds the block synthesis of one circuit may take in total; unfinished
+        blocks are then cancelled and keep their original sub-circuit. If None, there is no limit. (Default: None).
+
     Returns:
 
-        List of dictionaries that each contain information about circuit before/after optimization.
+        List of dictionaries that each contain information about circuit before/after optimization, in the order of the
+        files. In parallel mode each dictionary also holds the wall and CPU time spent on its circuit. With jsonl_path,
+        a LoggedResults yielding those dictionaries instead.
     """
 
-    # Creates list of paths to files. 
+    # Each circuit's infoDict, collected as the files finish. With a log, the results are read back from it below
+    infoDictByFile = {}
+    for file, infoDict in iterOptimizeBQSkitFromDirectory(qc, replace_filter=replace_filter, save_path=save_path,
+                                                          success_threshold=success_threshold, partitioner=partitioner,
+                                                          pass_type=pass_type, session=session,
+                                                          max_concurrent=max_concurrent, max_workers=max_workers,
+                                                          jsonl_path=jsonl_path, include_logged=False,
+                                                          block_size=block_size, block_budget=block_budget,
+                                                          circuit_budget=circuit_budget):
+        if jsonl_path is None:
+            infoDictByFile[file] = infoDict
+
+    qasm_files = _qasmFiles(qc)
+
+    # Every result of the directory (including ones from earlier runs) is read back from the log when iterated
+    if jsonl_path is not None:
+        results_log = ResultsLog(jsonl_path, _resultsLogConfig(replace_filter, success_threshold, partitioner, pass_type,
+                                                                block_size, block_budget, circuit_budget))
+        return results_log.view(qasm_files, flat=True)
+
+    # List of dictionaries that each cotain information about a circuits before/after optimization, in file order
+    return [infoDictByFile[file] for file in qasm_files]
+
+def _qasmFiles(qc: str) -> list:
+    """
+    Paths of the QASM files directly inside the directory qc.
+    """
     folder = Path(qc)
     files = [str(file) for file in folder.iterdir() if file.is_file()]
+    return [file for file in files if file.endswith('.qasm')]
 
-    # List of dictionaries that each cotain information about a circuits before/after optimization
-    circuits_info = []
-
-    # Optimizes each file if it is a QASM file
-    for file in files:
-        if file.endswith('.qasm'):
-            # Assigns the dictionary to infoDict
-            infoDict = optimizationAnalysis(qc=file, 
-                           success_threshold=success_threshold,
-                           partitioner=partitioner, 
-                           pass_type=pass_type, 
-                           save_path=save_path,
-                           replace_filter=replace_filter)
-            
-            # Adds the infoDict to the list of circuits 
-            circuits_info.append(infoDict)
-    
-    return circuits_info
+def iterOptimizeBQSkitFromDirectory(qc: str, replace_filter: str = 'always', save_path: str = None,
+    success_threshold: float = 1e-8, partitioner: int = 0, pass_type: int = 0, session: CompilationSession = None,
+    max_concurrent: int = 1, max_workers: int = None, jsonl_path: str = None, include_logged: bool = True,
+    block_size: int|str = blockSize, block_budget: float = None, circuit_budget: float = None):
+    """
+    Optimizes every QASM file of a directory like optimizeBQSkitFromDirectory, but yields (file, infoDict) as soon as
+    each circuit finishes instead of returning a list at the end. In parallel mode circuits are yielded in completion
+    order. The parameters are the same as optimizeBQSkitFromDirectory's.
+
+    Parameters:
+        include_logged (bool): With jsonl_path, first yields the recorded results of files that are skipped because
+        they are already in the log. (Default: True).
+    """
 
+    qasm_files = _qasmFiles(qc)
+
+    # Skips files whose results are already in the log
+    results_log = None
+    pending_files = qasm_files
+    if jsonl_path is not None:
+        results_log = ResultsLog(jsonl_path, _resultsLogConfig(replace_filter, success_threshold, partitioner, pass_type,
+                                                                block_size, block_budget, circuit_budget))
+        pending_files = [file for file in qasm_files if not results_log.completed(file)]
+        if include_logged:
+            logged_files = [file for file in qasm_files if results_log.completed(file)]
+            for file, results in zip(logged_files, results_log.iterResults(logged_files)):
+                for infoDict in results:
+                    yield file, infoDict
+
+    # Compiles several files at once, each in its own process and session
+    if max_concurrent != 1:
+        kwargs = {'success_threshold': success_threshold, 'partitioner': partitioner, 'pass_type': pass_type,
+                  'save_path': save_path, 'replace_filter': replace_filter, 'block_size': block_size,
+                  'block_budget': block_budget, 'circuit_budget': circuit_budget}
+
+        for file, infoDict, wallTime, cpuTime in iterFilesInParallel(optimizationAnalysis, pending_files, kwargs,
+                                                                     max_concurrent=max_concurrent,
+                                                                     max_workers=max_workers, session=session):
+            infoDict['Wall Time (seconds)'] = wallTime
+            infoDict['CPU Time (seconds)'] = cpuTime
+            # Logs each circuit as soon as it finishes
+            if results_log is not None:
+                results_log.append(file, [infoDict])
+            yield file, infoDict
+
+    # Optimizes each file if it is a QASM file. One session (and its worker pool) is shared by every file
+    else:
+        with _session_scope(session) as active_session:
+            for file in pending_files:
+                # Assigns the dictionary to infoDict
+                infoDict = optimizationAnalysis(qc=file, 
+                               success_threshold=success_threshold,
+                               partitioner=partitioner, 
+                               pass_type=pass_type, 
+                               save_path=save_path,
+                               replace_filter=replace_filter,
+                               session=active_session,
+                               block_size=block_size,
+                               block_budget=block_budget,
+                               circuit_budget=circuit_budget)
+                
+                if results_log is not None:
+                    results_log.append(file, [infoDict])
+                yield file, infoDict
@@ -0,0 +1,73 @@
+from dataclasses import dataclass
+from bqskit.ir import Circuit
+
+
+@dataclass(frozen=True)
+class CircuitMetrics:
+    """
+    Gate statistics of a BQSKit circuit, computed by circuitMetrics in one pass over its operations.
+
+    Parameters:
+        num_gates (int): Total number of operations.
+
+        multi_qudit_gates (int): Number of operations on two or more qudits.
+
+        depth (int): Length of the critical path.
+
+        multi_qudit_depth (int): Length of the critical path excluding single-qudit gates.
+
+        gate_counts (dict): Number of operations of each gate, in order of first appearance.
+    """
+
+    num_gates: int
+    multi_qudit_gates: int
+    depth: int
+    multi_qudit_depth: int
+    gate_counts: dict
+
+    @property
+    def gate_set(self) -> tuple:
+        """
+        Gates of the circuit in order of first appearance.
+        """
+        return tuple(self.gate_counts)
+
+    @property
+    def gate_set_string(self) -> str:
+        """
+        Comma separated names of gate_set, as reported in the 'Gate Set' result fields.
+        """
+        return ', '.join(str(gate) for gate in self.gate_counts)
+
+
+def circuitMetrics(circuit: Circuit) -> CircuitMetrics:
+    """
+    Returns the CircuitMetrics of circuit, computed in a single traversal of its operations.
+    """
+    gateCounts = {}
+    depths = [0] * circuit.num_qudits
+    multiDepths = [0] * circuit.num_qudits
+    numGates = 0
+    multiQuditGates = 0
+    for op in circuit:
+        gate = op.gate
+        location = op.location
+        gateCounts[gate] = gateCounts.get(gate, 0) + 1
+        numGates += 1
+
+        newDepth = max(depths[q] for q in location) + 1
+        for q in location:
+            depths[q] = newDepth
+
+        if len(location) == 1:
+            continue
+        multiQuditGates += 1
+        newDepth = max(multiDepths[q] for q in location) + 1
+        for q in location:
+            multiDepths[q] = newDepth
+
+    return CircuitMetrics(num_gates=numGates,
+                          multi_qudit_gates=multiQuditGates,
+                          depth=max(depths, default=0),
+                          multi_qudit_depth=max(multiDepths, default=0),
+                          gate_counts=gateCounts)
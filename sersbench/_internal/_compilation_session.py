@@ -0,0 +1,271 @@
+from bqskit.compiler import Compiler
+from bqskit.compiler.compiler import sigint_handler
+from bqskit.runtime import default_server_port
+from bqskit.runtime.message import RuntimeMessage
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+import functools
+from multiprocessing.connection import Client
+import multiprocessing
+import signal
+import subprocess
+import sys
+import time
+from ._block_cache import BlockCache
+from ._baseline_metrics import BaselineCache
+from ._memory_profile import MemoryProfiler
+from ._partition_cache import PartitionCache, processPartitionCache
+from ._unitary_store import UnitaryStore, processUnitaryStore
+
+
+class _PortedCompiler(Compiler):
+    """
+    Compiler whose attached runtime listens on the given port. BQSKit's Compiler connects to port but always starts its
+    runtime on the default one, so two runtimes started on one machine at the same time would collide.
+
+    Raises OSError if the runtime exits before accepting the connection, e.g. because another process took port or
+    worker_port in the meantime, instead of waiting for it forever as BQSKit does.
+    """
+
+    def __init__(self, port: int, **kwargs):
+        self._runtime_port = port
+        super().__init__(port=port, **kwargs)
+
+    def _start_server(self, num_workers: int, runtime_log_level: int, worker_port: int, num_blas_threads: int):
+        params = f'{num_workers}, port={self._runtime_port}, log_level={runtime_log_level}, '
+        params += f'worker_port={worker_port}, num_blas_threads={num_blas_threads}'
+        launch_str = f'from bqskit.runtime.attached import start_attached_server; start_attached_server({params})'
+        flags = subprocess.CREATE_NEW_PROCESS_GROUP if sys.platform == 'win32' else 0
+        self.p = subprocess.Popen([sys.executable, '-c', launch_str], creationflags=flags)
+
+    def _connect_to_server(self, ip: str, port: int, attached: bool):
+        family = 'AF_INET' if sys.platform == 'win32' else None
+        wait = 0.05
+        while True:
+            try:
+                self.conn = Client((ip, port), family)
+                break
+            except ConnectionRefusedError:
+                if self.p.poll() is not None:
+                    self.close()
+                    raise OSError(f'The runtime exited before listening on port {port}.')
+                time.sleep(wait)
+                wait = min(2 * wait, 1.0)
+
+        self.old_signal = signal.signal(signal.SIGINT, functools.partial(sigint_handler, compiler=self))
+        try:
+            msg, _ = self._send_recv(RuntimeMessage.CONNECT, sys.path)
+        except RuntimeError as e:
+            # The runtime accepted the connection but could not bind worker_port
+            raise OSError(f'The runtime on port {port} exited before its workers connected.') from e
+        if msg != RuntimeMessage.READY:
+            raise RuntimeError(f'Unexpected message type: {msg}.')
+
+
+class _ClusterCompiler(Compiler):
+    """
+    Compiler that starts a runtime server on port of this machine in front of BQSKit managers already running on other
+    machines (bqskit-manager). Closing the Compiler shuts the server down, which also shuts down the managers.
+    """
+
+    def __init__(self, managers: list, port: int):
+        self._managers = managers
+        self._runtime_port = port
+        super().__init__(port=port)
+
+    def _start_server(self, num_workers: int, runtime_log_level: int, worker_port: int, num_blas_threads: int):
+        launch_str = 'from sersbench._internal._runtime_server import startRuntimeServer; startRuntimeServer()'
+        flags = subprocess.CREATE_NEW_PROCESS_GROUP if sys.platform == 'win32' else 0
+        self.p = subprocess.Popen([sys.executable, '-c', launch_str, *self._managers, '-p', str(self._runtime_port)],
+                                  creationflags=flags)
+
+
+def parseRuntimeAddress(address: str) -> tuple:
+    """
+    Splits a runtime address 'host' or 'host:port' into (host, port), using BQSKit's default server port if none is
+    given.
+    """
+    host, separator, port = address.rpartition(':')
+    if not separator:
+        return address, default_server_port
+    if not port.isdigit():
+        raise ValueError(f'Invalid runtime address {address!r}. Expected "host" or "host:port".')
+    return host, int(port)
+
+
+class CompilationSession:
+    """
+    Owns one BQSKit Compiler (and its worker-process pool) that is reused by every block-synthesis call made with it.
+
+    Starting a Compiler spawns a fresh runtime, which is a large part of the wall time for small circuits. Passing the
+    same session to optimizeBQSkit, predeterminedCompilation or the internal compile helpers keeps that runtime warm
+    between partitions, passes and files. The runtime is started lazily on first use and shut down by close() or when
+    leaving a with block. The same holds for the worker process that runs the Qiskit baseline of predeterminedCompilation
+    next to the BQSKit passes.
+
+    Instead of a runtime on this machine, the session can use a BQSKit runtime spread over several machines, given by
+    runtime_address. Block synthesis tasks are then distributed over all of its workers. Every machine of such a runtime
+    needs sersbench installed, since the synthesis passes are imported by the workers.
+
+    Parameters:
+        num_workers (int): Number of worker processes for the runtime. Negative values use every CPU. With
+        runtime_address, the number of workers of the external runtime, only used to size the window of blocks in
+        flight under a block budget; negative values leave it unlimited. (Default: -1)
+
+        block_cache (BlockCache|str): Cache of synthesized blocks consulted before a block is submitted. A string is used
+        as the directory of an on-disk BlockCache. If None, every block is synthesized. (Default: None)
+
+        baseline_cache (BaselineCache|str): Cache of the before-optimization metrics of input files. A string is used as
+        the directory of an on-disk BaselineCache. If None, the in-memory cache shared by the process is used.
+        (Default: None)
+
+        partition_cache (PartitionCache|str): Cache of the circuits partitioned by the partition analytics of
+        sersbench.partitions. A string is used as the directory of an on-disk PartitionCache. If None, the in-memory cache
+        shared by the process is used. (Default: None)
+
+        unitary_store (UnitaryStore|str): Store of the partition unitaries computed by the distance and fidelity analytics
+        of sersbench.partitions. A string is used as the spill directory of a UnitaryStore. If None, the in-memory store
+        shared by the process is used. (Default: None)
+
+        port (int): Port the runtime server listens on. Runtimes started at the same time need different ports. If None,
+        BQSKit's default is used. (Default: None)
+
+        worker_port (int): Port the runtime's workers connect to. If None, BQSKit's default is used. (Default: None)
+
+        runtime_address (str|list): External runtime to use instead of starting one. A string 'host' or 'host:port' is
+        the address of a running runtime server started with sersbench.bqskit.runtime_server. A list of 'host:port'
+        strings is a cluster config: the addresses of bqskit-manager processes, for which the session starts a server on
+        this machine listening on port and shuts it (and the managers) down on close. If None, a runtime is started on
+        this machine. (Default: None)
+
+        memory_profile (bool): Record how far the Python heap grows (tracemalloc) and the sampled peak RSS of the runtime's
+        worker processes of every compilation stage in the results. Tracing slows down the compilation. (Default: False)
+
+    Example:
+        >>> with CompilationSession() as session:
+        ...     optimizeBQSkit('circuits', save_path='compiled', session=session)
+
+        >>> with CompilationSession(runtime_address=['node1:7473', 'node2:7473']) as session:
+        ...     optimizeBQSkit('circuits', save_path='compiled', session=session)
+    """
+
+    def __init__(self, num_workers: int = -1, block_cache: BlockCache | str = None, port: int = None,
+                 worker_port: int = None, baseline_cache: BaselineCache | str = None,
+                 runtime_address: str | list = None, memory_profile: bool = False,
+                 partition_cache: PartitionCache | str = None, unitary_store: UnitaryStore | str = None):
+        self.num_workers = num_workers
+        self.port = port
+        self.worker_port = worker_port
+        if isinstance(runtime_address, str):
+            parseRuntimeAddress(runtime_address)
+        elif runtime_address is not None:
+            runtime_address = list(runtime_address)
+            if not runtime_address:
+                raise ValueError('runtime_address must list at least one manager address.')
+        self.runtime_address = runtime_address
+        self.memory_profile = memory_profile
+        self._memory_profiler = None
+        if isinstance(block_cache, str):
+            block_cache = BlockCache(path=block_cache)
+        self.block_cache = block_cache
+        if isinstance(baseline_cache, str):
+            baseline_cache = BaselineCache(path=baseline_cache)
+        self.baseline_cache = baseline_cache
+        if isinstance(partition_cache, str):
+            partition_cache = PartitionCache(path=partition_cache)
+        self.partition_cache = processPartitionCache if partition_cache is None else partition_cache
+        if isinstance(unitary_store, str):
+            unitary_store = UnitaryStore(path=unitary_store)
+        self.unitary_store = processUnitaryStore if unitary_store is None else unitary_store
+        self._compiler = None
+        self._baseline_worker = None
+
+    @property
+    def compiler(self) -> Compiler:
+        """The session's Compiler. Started on first access."""
+        if self._compiler is None:
+            if isinstance(self.runtime_address, str):
+                host, port = parseRuntimeAddress(self.runtime_address)
+                self._compiler = Compiler(ip=host, port=port)
+            elif self.runtime_address is not None:
+                port = default_server_port if self.port is None else self.port
+                self._compiler = _ClusterCompiler(self.runtime_address, port)
+            elif self.port is None and self.worker_port is None:
+                self._compiler = Compiler(num_workers=self.num_workers)
+            else:
+                ports = {} if self.worker_port is None else {'worker_port': self.worker_port}
+                port = default_server_port if self.port is None else self.port
+                self._compiler = _PortedCompiler(port, num_workers=self.num_workers, **ports)
+        return self._compiler
+
+    @property
+    def baseline_worker(self) -> ProcessPoolExecutor:
+        """Single-process pool that runs Qiskit baseline transpilations. Started on first access."""
+        if self._baseline_worker is None:
+            # Spawned so that the worker does not inherit the runtime connection or signal handlers of this process
+            self._baseline_worker = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn'))
+        return self._baseline_worker
+
+    @property
+    def memory_profiler(self) -> MemoryProfiler | None:
+        """The session's MemoryProfiler if memory_profile is set, otherwise None. Started on first access."""
+        if self.memory_profile and self._memory_profiler is None:
+            self._memory_profiler = MemoryProfiler()
+        return self._memory_profiler if self.memory_profile else None
+
+    @property
+    def is_external(self) -> bool:
+        """True if block synthesis runs on an external runtime given by runtime_address."""
+        return self.runtime_address is not None
+
+    @property
+    def runtime_endpoint(self) -> str | None:
+        """
+        Address 'host:port' other processes of this machine can connect to in order to share the session's external
+        runtime, or None without one. For a cluster config, this starts the session's server.
+        """
+        if isinstance(self.runtime_address, str):
+            return self.runtime_address
+        if self.runtime_address is not None:
+            self.compiler
+            return f'localhost:{default_server_port if self.port is None else self.port}'
+        return None
+
+    @property
+    def is_running(self) -> bool:
+        """True if the runtime has been started and not yet closed."""
+        return self._compiler is not None
+
+    def close(self):
+        """
+        Shuts down the runtime, the baseline worker and the memory profiler. The session can be reused afterwards; the
+        next call starts new ones. An external runtime is only disconnected from (for a cluster config, the session's
+        server is shut down).
+        """
+        if self._compiler is not None:
+            self._compiler.close()
+            self._compiler = None
+        if self._baseline_worker is not None:
+            self._baseline_worker.shutdown(cancel_futures=True)
+            self._baseline_worker = None
+        if self._memory_profiler is not None:
+            self._memory_profiler.close()
+            self._memory_profiler = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+@contextmanager
+def _session_scope(session: CompilationSession = None, runtime_address: str | list = None):
+    """
+    Yields session if one was given. Otherwise yields a temporary session on runtime_address that is closed on exit.
+    """
+    if session is not None:
+        yield session
+    else:
+        with CompilationSession(runtime_address=runtime_address) as temporary_session:
+            yield temporary_session
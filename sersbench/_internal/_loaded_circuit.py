@@ -0,0 +1,108 @@
+from bqskit.ir import Circuit
+from bqskit.ext import qiskit_to_bqskit, bqskit_to_qiskit
+from qiskit import QuantumCircuit
+from qiskit.compiler import transpile
+import time
+from ._memory_profile import MemoryProfiler, StageMemory
+from ._results_log import fileContentHash
+
+
+class LoadedCircuit:
+    """
+    A circuit that is parsed and prepared once and then shared by every compilation pass and analysis of one run.
+
+    For a QASM path the file is read once per framework: BQSKit's parse is kept as the "before optimization" circuit and
+    Qiskit's parse is used for the Qiskit baseline. Files with 'qiskit' in their name are compiled from the Qiskit parse
+    (transpiled with optimization level 0 and converted to BQSKit), as optimizations() has always done. For a generated
+    circuit the object itself is used, converted to BQSKit if it is a QuantumCircuit.
+
+    The compile input (circuit) is unfolded and has its measurements removed when the LoadedCircuit is created. The
+    partition blocks of each partitioner and block size are stored in partitions by presetPartitions the first time they
+    are needed, so QSearch and LEAP share one partitioning. The perf_counter durations of these shared stages are kept in
+    parse_time, unfold_time and partition_times (keyed by (partitioner, block size)) and reported on every pass that uses
+    them. The before-optimization metrics of each kind of baseline are kept in baselines by baselineMetrics. With a
+    memory profiler, the memory peaks of parsing and unfolding are kept in memory_peaks and those of each partitioning
+    in partition_memory, in the format of StageMemory.peaks.
+
+    Parameters:
+        qc (str|Circuit|QuantumCircuit): Path to a QASM file, or a generated circuit.
+
+        circuit_name (str): Name of a generated circuit, including the .qasm extension. Ignored for paths. (Default: None)
+
+        memory (MemoryProfiler): Profiler measuring the memory of parsing and unfolding, usually the session's
+        memory_profiler. If None, memory is not measured. (Default: None)
+    """
+
+    def __init__(self, qc: str|Circuit|QuantumCircuit, circuit_name: str = None, memory: MemoryProfiler = None):
+        self.path = qc if isinstance(qc, str) else None
+        self._bqskit_source = None
+        self._qiskit_source = None
+        self._content_hash = None
+        stageMemory = StageMemory(memory)
+
+        stageMemory.start('Parse')
+        parseStart = time.perf_counter()
+        if self.path is not None:
+            index = qc.rfind('/')
+            self.name = qc[index+1:len(qc)-5]
+            if 'qiskit' in qc:
+                circuit = qiskit_to_bqskit(transpile(self.qiskit_source, optimization_level=0))
+            else:
+                circuit = self.bqskit_source.copy()
+        else:
+            self.name = circuit_name
+            if isinstance(qc, QuantumCircuit):
+                qc = qiskit_to_bqskit(qc)
+            self._bqskit_source = qc
+            circuit = qc
+
+        self.parse_time = time.perf_counter() - parseStart
+        stageMemory.stop()
+
+        # Unfolds all gates
+        stageMemory.start('Unfold')
+        unfoldStart = time.perf_counter()
+        circuit.unfold_all()
+        circuit.remove_all_measurements()
+        self.circuit = circuit
+        self.unfold_time = time.perf_counter() - unfoldStart
+        stageMemory.stop()
+        self.memory_peaks = stageMemory.peaks
+
+        # Partition blocks and the time taken to compute them, keyed by (partitioner, block size), filled in by
+        # presetPartitions
+        self.partitions = {}
+        self.partition_times = {}
+        self.partition_memory = {}
+
+        # BaselineMetrics keyed by kind of baseline, filled in by baselineMetrics
+        self.baselines = {}
+
+    @property
+    def is_file(self) -> bool:
+        """True if the circuit was loaded from a QASM file."""
+        return self.path is not None
+
+    @property
+    def content_hash(self) -> str:
+        """SHA-256 hash of the QASM file's contents. None for generated circuits."""
+        if self._content_hash is None and self.is_file:
+            self._content_hash = fileContentHash(self.path)
+        return self._content_hash
+
+    @property
+    def bqskit_source(self) -> Circuit:
+        """The circuit as parsed by BQSKit, before any preparation. For generated circuits this is the compile input."""
+        if self._bqskit_source is None:
+            self._bqskit_source = Circuit.from_file(self.path)
+        return self._bqskit_source
+
+    @property
+    def qiskit_source(self) -> QuantumCircuit:
+        """The circuit as parsed by Qiskit. For generated circuits this is the compile input converted to Qiskit."""
+        if self._qiskit_source is None:
+            if self.is_file:
+                self._qiskit_source = QuantumCircuit.from_qasm_file(self.path)
+            else:
+                self._qiskit_source = bqskit_to_qiskit(self.circuit)
+        return self._qiskit_source
@@ -0,0 +1,224 @@
+import os
+import threading
+import tracemalloc
+
+try:
+    import psutil
+except ImportError:  # Optional; without it worker RSS is read from /proc, which only exists on Linux
+    psutil = None
+
+# Stages of a BQSKit compilation whose memory peaks are recorded, in the order they run
+memoryStages = ['Parse', 'Unfold', 'Partition', 'Block Synthesis', 'Reassembly', 'Basis Translation', 'Save']
+
+# infoDict fields of a profiled compilation, in the order memoryFieldsOf returns them
+memoryFields = [field for stage in memoryStages
+                for field in (f'{stage} Peak Python Memory (MB)', f'{stage} Peak Worker RSS (MB)')]
+memoryFields += ['Peak Python Memory (MB)', 'Peak Python Memory Stage', 'Peak Worker RSS (MB)', 'Peak Worker RSS Stage']
+
+_megabyte = 2 ** 20
+
+
+def _descendantRss(pid: int) -> int | None:
+    """
+    Total resident set size in bytes of every descendant process of pid (BQSKit runtimes and their workers, baseline
+    workers), or None if the platform does not report it.
+    """
+    if psutil is not None:
+        try:
+            children = psutil.Process(pid).children(recursive=True)
+        except psutil.Error:
+            return None
+        total = 0
+        for child in children:
+            try:
+                total += child.memory_info().rss
+            except psutil.Error:
+                continue
+        return total
+
+    if not os.path.isdir('/proc'):
+        return None
+    childrenByParent = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                # The command name in parentheses may contain spaces, the parent pid is the second field after it
+                parent = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        childrenByParent.setdefault(parent, []).append(int(entry))
+
+    total = 0
+    pageSize = os.sysconf('SC_PAGE_SIZE')
+    stack = list(childrenByParent.get(pid, []))
+    while stack:
+        child = stack.pop()
+        stack.extend(childrenByParent.get(child, []))
+        try:
+            with open(f'/proc/{child}/statm') as f:
+                total += int(f.read().split()[1]) * pageSize
+        except (OSError, IndexError, ValueError):
+            continue
+    return total
+
+
+class MemoryProfiler:
+    """
+    Records the memory peaks of the stages of a compilation: how far the Python heap of this process, traced with
+    tracemalloc (which includes NumPy arrays), grows above its size at the start of the stage, and the peak total RSS of
+    its descendant processes (the BQSKit runtime and its workers), sampled by a background thread.
+
+    Tracing starts with the first stage and adds overhead to every Python allocation, so profiling is opt-in. Workers of
+    an external runtime run on other processes or machines and are not included.
+
+    Parameters:
+        interval (float): Seconds between two RSS samples. (Default: 0.1)
+    """
+
+    def __init__(self, interval: float = 0.1):
+        self.interval = interval
+        self._started_tracing = False
+        self._stage_rss = None
+        self._stage_base = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = None
+
+    def _sample(self):
+        rss = _descendantRss(os.getpid())
+        with self._lock:
+            if rss is not None and self._stage_rss is not None:
+                self._stage_rss = max(self._stage_rss, rss)
+
+    def _run_sampler(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        """
+        Starts measuring a stage, resetting both peaks.
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        if self._sampler is None:
+            self._stop.clear()
+            self._sampler = threading.Thread(target=self._run_sampler, daemon=True)
+            self._sampler.start()
+
+        tracemalloc.reset_peak()
+        self._stage_base = tracemalloc.get_traced_memory()[0]
+        with self._lock:
+            self._stage_rss = 0
+        self._sample()
+
+    def stop(self) -> tuple:
+        """
+        Stops measuring the stage begun by start() and returns its (Python heap growth peak, worker RSS peak) in bytes. The RSS
+        peak is None if the platform does not report it.
+        """
+        self._sample()
+        with self._lock:
+            rss = self._stage_rss
+            self._stage_rss = None
+        if psutil is None and not os.path.isdir('/proc'):
+            rss = None
+        return tracemalloc.get_traced_memory()[1] - self._stage_base, rss
+
+    def close(self):
+        """Stops the sampler thread and tracemalloc, if this profiler started it."""
+        if self._sampler is not None:
+            self._stop.set()
+            self._sampler.join()
+            self._sampler = None
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+
+class StageMemory:
+    """
+    Memory peaks of the stages of one compilation, measured with profiler. Every method does nothing if profiler is
+    None, so compilations call them unconditionally next to their perf_counter timings.
+
+    Parameters:
+        profiler (MemoryProfiler): Profiler of the session, or None if memory is not profiled.
+    """
+
+    def __init__(self, profiler: MemoryProfiler | None):
+        self.profiler = profiler
+        self.peaks = {}
+        self._stage = None
+
+    def start(self, stage: str):
+        """Starts measuring stage, one of memoryStages."""
+        if self.profiler is not None:
+            self._stage = stage
+            self.profiler.start()
+
+    def stop(self):
+        """Stops measuring the current stage and records its peaks."""
+        if self.profiler is not None:
+            self.peaks[self._stage] = self.profiler.stop()
+
+    def fields(self) -> dict:
+        """The memoryFields of the recorded peaks, or an empty dictionary if memory is not profiled."""
+        return {} if self.profiler is None else memoryFieldsOf(self.peaks)
+
+
+def memoryFieldsOf(peaks: dict) -> dict:
+    """
+    Converts the peaks recorded by StageMemory into infoDict fields in megabytes. Stages without a
+    measurement are None. The overall peaks name the stage they occurred in.
+    """
+    fields = {}
+    for stage in memoryStages:
+        python, rss = peaks.get(stage, (None, None))
+        fields[f'{stage} Peak Python Memory (MB)'] = None if python is None else python / _megabyte
+        fields[f'{stage} Peak Worker RSS (MB)'] = None if rss is None else rss / _megabyte
+
+    # Ties go to the earliest stage
+    for kind, position in [('Python Memory', 0), ('Worker RSS', 1)]:
+        measured = [(peaks[stage][position], stage) for stage in memoryStages
+                    if stage in peaks and peaks[stage][position] is not None]
+        peak, stage = max(measured, key=lambda item: item[0]) if measured else (None, None)
+        fields[f'Peak {kind} (MB)'] = None if peak is None else peak / _megabyte
+        fields[f'Peak {kind} Stage'] = stage
+    return fields
+
+def memorySummary(infoDicts) -> dict:
+    """
+    Summarizes the memory fields of the result dictionaries of a directory run: for each stage, the largest Python peak
+    and worker RSS peak over all circuits, and the overall peaks with the circuit and stage they occurred in. Rows
+    without memory fields (e.g. Qiskit rows) are ignored. infoDicts is read once, so it may be a generator.
+    """
+    kinds = ('Python Memory', 'Worker RSS')
+    summary = {'Profiled Compilation Count': 0}
+    for stage in memoryStages:
+        for kind in kinds:
+            summary[f'{stage} Peak {kind} (MB)'] = None
+    for kind in kinds:
+        summary[f'Peak {kind} (MB)'] = None
+        summary[f'Peak {kind} Circuit'] = None
+        summary[f'Peak {kind} Stage'] = None
+
+    for row in infoDicts:
+        if row.get('Peak Python Memory (MB)') is None and row.get('Peak Worker RSS (MB)') is None:
+            continue
+        summary['Profiled Compilation Count'] += 1
+        for stage in memoryStages:
+            for kind in kinds:
+                value, field = row.get(f'{stage} Peak {kind} (MB)'), f'{stage} Peak {kind} (MB)'
+                if value is not None and (summary[field] is None or value > summary[field]):
+                    summary[field] = value
+
+        # Ties go to the earliest circuit
+        for kind in kinds:
+            peak = row.get(f'Peak {kind} (MB)')
+            if peak is not None and (summary[f'Peak {kind} (MB)'] is None or peak > summary[f'Peak {kind} (MB)']):
+                summary[f'Peak {kind} (MB)'] = peak
+                summary[f'Peak {kind} Circuit'] = row.get('Circuit QASM File Name After Optimization')
+                summary[f'Peak {kind} Stage'] = row[f'Peak {kind} Stage']
+    return summary
@@ -0,0 +1,46 @@
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class OptimizationConfig:
+    """
+    Settings of one optimizations() run, passed explicitly to the compile and analysis helpers.
+
+    The object is immutable and the helpers keep no module-level state, so several runs with different settings can
+    execute at the same time in threads of one process. Each concurrent run needs its own CompilationSession.
+
+    Parameters:
+        replace_filter (str): Predicate that decides whether a synthesized block replaces the original one. Supports
+        'always', 'less-than' and 'less-than-multi'. (Default: 'always')
+
+        success_threshold (float): The distance threshold that determines successful termination. (Default: 1e-8)
+
+        partitioner (int): 0 for ScanPartitioner, 1 for QuickPartitioner. (Default: 0)
+
+        block_size (int|str): Largest number of qubits per partition, or 'adaptive' to choose 2, 3 or 4 per circuit
+        region. (Default: 3)
+
+        block_budget (float): Wall-clock seconds a partition block may spend in synthesis before it is cancelled and its
+        original sub-circuit kept. If None, blocks have no limit. (Default: None)
+
+        circuit_budget (float): Wall-clock seconds the block synthesis of one circuit and pass may take in total. If
+        None, there is no limit. (Default: None)
+
+        save_path (str): Directory the compiled circuits are saved to. If None, nothing is saved. (Default: None)
+
+        optimization_level (int): Optimization level of the Qiskit baseline transpilation. (Default: 3)
+
+        overlap_qiskit (bool): Run the Qiskit baseline in a worker process of the session while the BQSKit passes run. If
+        False, it runs in this process before the BQSKit passes. Its time is the CPU time of the transpile with overlap,
+        which contention with synthesis does not inflate, and its wall time without. (Default: True)
+    """
+
+    replace_filter: str = 'always'
+    success_threshold: float = 1e-8
+    partitioner: int = 0
+    block_size: int|str = 3
+    block_budget: float = None
+    circuit_budget: float = None
+    save_path: str = None
+    optimization_level: int = 3
+    overlap_qiskit: bool = True
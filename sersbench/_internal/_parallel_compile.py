@@ -0,0 +1,231 @@
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import multiprocessing
+import os
+import socket
+import time
+from ._compilation_session import CompilationSession
+
+try:
+    import resource
+except ImportError:  # Not available on Windows; CPU time then only covers the task process itself
+    resource = None
+
+# Memory assumed to be needed by one circuit and its BQSKit workers when choosing the concurrency automatically
+memoryPerCircuit = 2 * 2 ** 30
+
+# Smallest number of BQSKit workers given to each concurrently compiled circuit in automatic mode
+minWorkersPerCircuit = 2
+
+
+def _availableMemory() -> int | None:
+    """
+    Returns the available physical memory in bytes, or None if the platform does not report it.
+    """
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (ValueError, OSError, AttributeError):
+        return None
+
+def chooseConcurrency(num_files: int, max_concurrent: int = None, max_workers: int = None) -> tuple:
+    """
+    Decides how many circuits are compiled at once and how many BQSKit workers each of them gets.
+
+    Parameters:
+        num_files (int): Number of circuits to compile.
+
+        max_concurrent (int): Number of circuits compiled at once. If None, chosen from the CPU count and the available
+        memory. (Default: None)
+
+        max_workers (int): Cap on the total number of BQSKit worker processes across all concurrent compilers. If None,
+        the CPU count is used. (Default: None)
+
+    Returns:
+        Number of circuits compiled at once and number of BQSKit workers per circuit.
+    """
+    cpus = os.cpu_count() or 1
+    if max_workers is None or max_workers < 1:
+        max_workers = cpus
+
+    if max_concurrent is None:
+        max_concurrent = max(1, max_workers // minWorkersPerCircuit)
+        memory = _availableMemory()
+        if memory is not None:
+            max_concurrent = min(max_concurrent, max(1, memory // memoryPerCircuit))
+
+    concurrency = max(1, min(max_concurrent, num_files, max_workers))
+    return concurrency, max(1, max_workers // concurrency)
+
+def _childCpuTime() -> float:
+    """
+    CPU time of terminated child processes (BQSKit runtimes and their workers) of this process.
+    """
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+# Number of times a pool process starts its runtime on new ports after another process took the reserved ones
+portAttempts = 5
+
+
+def _freePorts(count: int) -> list:
+    """
+    Returns count distinct TCP ports on localhost that are currently free. All sockets are held until the last one is
+    bound, so no two of the ports are the same.
+    """
+    sockets = [socket.socket(socket.AF_INET, socket.SOCK_STREAM) for _ in range(count)]
+    try:
+        for s in sockets:
+            s.bind(('localhost', 0))
+        return [s.getsockname()[1] for s in sockets]
+    finally:
+        for s in sockets:
+            s.close()
+
+def _startPortedSession(ports: tuple, **kwargs) -> CompilationSession:
+    """
+    Returns a CompilationSession whose runtime is started on ports (port and worker_port). The ports are only free when
+    they were reserved, so if another process took one of them since, the runtime is started again on new ones.
+    """
+    for attempt in range(portAttempts):
+        port, worker_port = ports if attempt == 0 else _freePorts(2)
+        session = CompilationSession(port=port, worker_port=worker_port, **kwargs)
+        try:
+            session.compiler
+            return session
+        except OSError:
+            session.close()
+            if attempt == portAttempts - 1:
+                raise
+
+def _compileFileTask(function, file: str, kwargs: dict, num_workers: int, block_cache_settings: dict = None,
+                     baseline_cache_path: str = None, runtime_address: str = None, memory_profile: bool = False,
+                     ports: tuple = None):
+    """
+    Runs function(file, session=..., **kwargs) in its own session and returns its result with the wall and CPU time of
+    the circuit. Executed in a pool process. Without runtime_address, the session's runtime is started on ports.
+    """
+    startWall = time.perf_counter()
+    startCpu = time.process_time() + _childCpuTime()
+
+    block_cache = None
+    if block_cache_settings is not None:
+        from ._block_cache import BlockCache
+        block_cache = BlockCache(**block_cache_settings)
+
+    if runtime_address is not None:
+        # Every pool process connects to the same external runtime. Its CPU time is spent on other processes and machines
+        # and is not counted
+        session = CompilationSession(block_cache=block_cache, baseline_cache=baseline_cache_path,
+                                     runtime_address=runtime_address, memory_profile=memory_profile)
+    else:
+        # Every pool process starts its own runtime, so each needs its own ports instead of BQSKit's defaults. The
+        # session is closed before measuring so that the runtime's CPU time is counted
+        session = _startPortedSession(ports, num_workers=num_workers, block_cache=block_cache,
+                                      baseline_cache=baseline_cache_path, memory_profile=memory_profile)
+    with session:
+        result = function(file, session=session, **kwargs)
+
+    wallTime = time.perf_counter() - startWall
+    cpuTime = time.process_time() + _childCpuTime() - startCpu
+    return result, wallTime, cpuTime
+
+def iterFilesInParallel(function, files: list, kwargs: dict, max_concurrent: int = None, max_workers: int = None,
+                        session: CompilationSession = None):
+    """
+    Compiles files concurrently in a process pool and yields (file, result, wall time, CPU time) as each file finishes,
+    in completion order.
+
+    Each pool process starts its own CompilationSession with its share of the worker cap. If session has an on-disk
+    block cache or baseline cache, the pool processes share those directories; its Compiler is not used. If session has
+    an external runtime, the pool processes connect to it instead of starting their own. If session profiles memory, so
+    does every pool process, each measuring its own runtime's workers.
+
+    Parameters:
+        function (callable): Picklable function called as function(file, session=session, **kwargs).
+
+        files (list): Paths of the QASM files to compile.
+
+        kwargs (dict): Keyword arguments passed to function.
+
+        max_concurrent (int): Number of circuits compiled at once. If None, chosen automatically. (Default: None)
+
+        max_workers (int): Cap on the total number of BQSKit worker processes. If None, the CPU count. (Default: None)
+
+        session (CompilationSession): Session whose block cache settings, external runtime and memory profiling are
+        reused. (Default: None)
+    """
+    if not files:
+        return
+
+    concurrency, workersPerCircuit = chooseConcurrency(len(files), max_concurrent, max_workers)
+
+    block_cache_settings = None
+    if session is not None and session.block_cache is not None and session.block_cache.path is not None:
+        block_cache_settings = {'path': session.block_cache.path, 'max_bytes': session.block_cache.max_bytes,
+                                'decimals': session.block_cache.decimals}
+    baseline_cache_path = None
+    if session is not None and session.baseline_cache is not None:
+        baseline_cache_path = session.baseline_cache.path
+    runtime_address = None if session is None else session.runtime_endpoint
+    memory_profile = session is not None and session.memory_profile
+
+    # Spawned processes do not inherit the parent's runtime connections or signal handlers
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=concurrency, mp_context=context) as executor:
+        queue = list(reversed(files))
+        # future -> (file, ports)
+        running = {}
+        while queue or running:
+            # Files are submitted as pool processes free up, so each one's ports are reserved just before its runtime
+            # starts, and never equal to the ports of the runtimes still running
+            while queue and len(running) < concurrency:
+                file = queue.pop()
+                ports = None
+                if runtime_address is None:
+                    inUse = {port for _, runningPorts in running.values() for port in runningPorts}
+                    ports = tuple(_freePorts(2))
+                    while inUse.intersection(ports):
+                        ports = tuple(_freePorts(2))
+                future = executor.submit(_compileFileTask, function, file, kwargs, workersPerCircuit,
+                                         block_cache_settings, baseline_cache_path, runtime_address, memory_profile,
+                                         ports)
+                running[future] = (file, ports)
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                yield (running.pop(future)[0], *future.result())
+
+def compileFilesInParallel(function, files: list, kwargs: dict, max_concurrent: int = None, max_workers: int = None,
+                           session: CompilationSession = None, on_result = None) -> list:
+    """
+    Compiles files concurrently in a process pool and returns the results in the order of files. See
+    iterFilesInParallel for how the pool is set up.
+
+    Parameters:
+        function (callable): Picklable function called as function(file, session=session, **kwargs).
+
+        files (list): Paths of the QASM files to compile.
+
+        kwargs (dict): Keyword arguments passed to function.
+
+        max_concurrent (int): Number of circuits compiled at once. If None, chosen automatically. (Default: None)
+
+        max_workers (int): Cap on the total number of BQSKit worker processes. If None, the CPU count. (Default: None)
+
+        session (CompilationSession): Session whose block cache settings, external runtime and memory profiling are
+        reused. (Default: None)
+
+        on_result (callable): If given, called as on_result(file, result, wall time, CPU time) as soon as each file
+        finishes, in completion order. Results are then not kept in memory. (Default: None)
+
+    Returns:
+        List of (result, wall time in seconds, CPU time in seconds), one per file. Empty if on_result is given.
+    """
+    resultByFile = {}
+    for file, result, wallTime, cpuTime in iterFilesInParallel(function, files, kwargs, max_concurrent, max_workers,
+                                                               session):
+        if on_result is not None:
+            on_result(file, result, wallTime, cpuTime)
+        else:
+            resultByFile[file] = (result, wallTime, cpuTime)
+    return [resultByFile[file] for file in files] if on_result is None else []
@@ -0,0 +1,101 @@
+import itertools
+import time
+from ._block_cache import BlockCache
+from ._bqskit_comp_bqskitTests import bqskitInfoDict
+from ._bqskit_comp_partitoner import presetPartitions, preparePartitions
+from ._baseline_metrics import baselineMetrics
+from ._compilation_session import CompilationSession
+from ._loaded_circuit import LoadedCircuit
+
+# Settings a sweep can vary, in the order grid rows list them
+sweepSettings = ['partitioner', 'block_size', 'pass_type', 'success_threshold', 'multistart', 'replace_filter']
+
+# Replace filters in the order they are run for the same synthesis settings. The first one synthesizes the blocks and
+# the others take them from the block cache
+_filterOrder = {'always': 0, 'less-than': 1, 'less-than-multi': 2}
+
+
+def expandGrid(grid: dict) -> list:
+    """
+    Returns every combination of the values in grid as a list of setting dictionaries. A value that is not a list or
+    tuple is used for every combination.
+    """
+    values = [grid[name] if isinstance(grid[name], (list, tuple)) else [grid[name]] for name in sweepSettings]
+    return [dict(zip(sweepSettings, combination)) for combination in itertools.product(*values)]
+
+def _runOrder(setting: dict) -> tuple:
+    """
+    Sort key grouping settings that share a partitioning, then settings that share block synthesis results.
+    """
+    multistart = setting['multistart']
+    return (setting['partitioner'], str(setting['block_size']), setting['pass_type'], setting['success_threshold'],
+            (multistart is None, multistart or 0), _filterOrder.get(setting['replace_filter'], len(_filterOrder)))
+
+def sweepCircuit(qc: str, settings: list, session: CompilationSession, block_budget: float = None,
+                 circuit_budget: float = None) -> list:
+    """
+    Compiles one QASM file with every setting of settings and returns one dictionary per setting, in the order of
+    settings.
+
+    The file is parsed and unfolded once for all settings and partitioned once per partitioner and block size (a
+    LoadedCircuit). Settings are run grouped by their synthesis settings, so settings that only differ in the replace
+    filter take their synthesized blocks from session's block cache instead of synthesizing them again. session must
+    have a block cache. block_budget and circuit_budget are passed to presetPartitions for every setting.
+
+    'Compilation Time (seconds)' of every row is the measured time of its setting. The shared parse, unfold and
+    partitioning are done before any setting is timed and are reported in the stage fields of every row that shares them.
+    """
+    loaded = LoadedCircuit(qc, memory=session.memory_profiler)
+    baseline = baselineMetrics(loaded, 'basis', session.baseline_cache)
+
+    rows = [None] * len(settings)
+    for index in sorted(range(len(settings)), key=lambda i: _runOrder(settings[i])):
+        setting = settings[index]
+        # Also starts the runtime on the first setting, before it is timed
+        preparePartitions(loaded, setting['partitioner'], setting['block_size'], session)
+        startTime = time.perf_counter()
+        data = presetPartitions(qc=loaded,
+                                pass_type=setting['pass_type'],
+                                partitioner=setting['partitioner'],
+                                success_threshold=setting['success_threshold'],
+                                save_path=None,
+                                replace_filter=setting['replace_filter'],
+                                circuit_name=loaded.name,
+                                session=session,
+                                multistart=setting['multistart'],
+                                block_size=setting['block_size'],
+                                block_budget=block_budget,
+                                circuit_budget=circuit_budget)
+        endTime = time.perf_counter()
+
+        infoDict = bqskitInfoDict(baseline=baseline, data=data, circuit_name=loaded.name,
+                                  compilation_time=endTime - startTime - data[6],
+                                  replace_filter=setting['replace_filter'],
+                                  success_threshold=setting['success_threshold'],
+                                  partitioner=setting['partitioner'], pass_type=setting['pass_type'],
+                                  multistart=setting['multistart'], block_size=setting['block_size'])
+        infoDict.update(data[7])
+        rows[index] = infoDict
+    return rows
+
+def sweepFiles(files: list, settings: list, session: CompilationSession = None, block_budget: float = None,
+               circuit_budget: float = None):
+    """
+    Yields (file, list of dictionaries) for each QASM file in files, compiled with every setting of settings by
+    sweepCircuit. One session is used for all files; if it is None or has no block cache, a memory-only BlockCache is
+    used for the duration of the sweep so that block synthesis results are shared between settings and files.
+    """
+    owns_session = session is None
+    if owns_session:
+        session = CompilationSession()
+    added_cache = session.block_cache is None
+    if added_cache:
+        session.block_cache = BlockCache()
+    try:
+        for file in files:
+            yield file, sweepCircuit(file, settings, session, block_budget, circuit_budget)
+    finally:
+        if added_cache:
+            session.block_cache = None
+        if owns_session:
+            session.close()
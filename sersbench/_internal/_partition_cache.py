@@ -0,0 +1,108 @@
+from bqskit.ir import Circuit
+from bqskit.ir.lang.language import LangException
+from collections import OrderedDict
+import hashlib
+import os
+import pickle
+import tempfile
+from ._results_log import fileContentHash
+
+# Block size of the QuickPartitioner used by the partition analytics of sersbench.partitions
+analyticsBlockSize = 3
+
+
+class PartitionCache:
+    """
+    Cache of partitioned circuits keyed by the content hash of the input circuit and the partitioner settings, so that
+    the partition analytics partition every circuit once, however many pairs it takes part in.
+
+    Entries are kept in a bounded in-memory tier. If a path is given they are also pickled to disk, each written to a
+    temporary name and atomically renamed into place, so several processes and later runs can share the directory.
+    Cached circuits are shared between callers and must not be modified.
+
+    Parameters:
+        path (str): Directory for the on-disk tier. Created if it does not exist. If None, only memory is used. (Default: None)
+
+        max_memory_entries (int): Number of partitioned circuits kept in the in-memory tier. (Default: 256)
+    """
+
+    def __init__(self, path: str = None, max_memory_entries: int = 256):
+        self.path = path
+        self.max_memory_entries = max_memory_entries
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+
+    def key(self, content_hash: str, block_size: int = analyticsBlockSize) -> str:
+        """
+        Returns the cache key of a circuit with content_hash partitioned by QuickPartitioner with block_size.
+        """
+        return hashlib.sha256(f'QuickPartitioner:{block_size}:{content_hash}'.encode()).hexdigest()
+
+    def get(self, key: str) -> Circuit | None:
+        """
+        Returns the partitioned circuit stored under key, or None on a miss.
+        """
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return self._memory[key]
+
+        if self.path is not None:
+            try:
+                with open(self._file_path(key), 'rb') as f:
+                    circuit = pickle.load(f)
+            except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+                circuit = None
+            if circuit is not None:
+                self._remember(key, circuit)
+                self.hits += 1
+                return circuit
+
+        self.misses += 1
+        return None
+
+    def put(self, key: str, circuit: Circuit):
+        """
+        Stores a partitioned circuit under key.
+        """
+        self._remember(key, circuit)
+
+        if self.path is not None:
+            fd, temp_path = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    pickle.dump(circuit, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(temp_path, self._file_path(key))
+            except BaseException:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+
+    def _remember(self, key: str, circuit: Circuit):
+        self._memory[key] = circuit
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _file_path(self, key: str) -> str:
+        return os.path.join(self.path, f'{key}.pkl')
+
+
+# Cache used when no other one is given, shared by every analysis in this process
+processPartitionCache = PartitionCache()
+
+
+def circuitContentHash(qc: str|Circuit) -> str | None:
+    """
+    Returns the SHA-256 hash of a QASM file's contents, or of the QASM encoding of a Circuit. Returns None for a Circuit
+    with a gate that has no QASM encoding (e.g. a ConstantUnitaryGate), which then cannot be cached.
+    """
+    if isinstance(qc, str):
+        return fileContentHash(qc)
+    try:
+        return hashlib.sha256(qc.to('qasm').encode()).hexdigest()
+    except (AttributeError, LangException):
+        return None
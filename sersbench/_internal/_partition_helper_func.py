@@ -1,70 +1,84 @@
 from bqskit.ir import Circuit, Operation
 from bqskit.passes import QuickPartitioner
-from bqskit.compiler import Compiler
 import numpy as np
 from scipy.stats import entropy
+from ._circuit_metrics import circuitMetrics
+from ._compilation_session import CompilationSession, _session_scope
+from ._partition_cache import analyticsBlockSize, circuitContentHash
 
 def _count_large_gates(circuit_like: Operation | list[Operation]):
 
     if isinstance(circuit_like, Operation):
-        operation = circuit_like
-        num_large_gates = 0
-        for gate in operation.gate._circuit.gate_set:
-            if gate.num_qudits == 1:
-                continue
-            num_large_gates += operation.gate._circuit.count(gate)
+        num_large_gates = circuitMetrics(circuit_like.gate._circuit).multi_qudit_gates
     elif isinstance(circuit_like, Circuit):
-        circuit = circuit_like
-        num_large_gates = 0
-        for gate in circuit.gate_set:
-            if gate.num_qudits == 1:
-                continue
-            num_large_gates += circuit.count(gate)
+        num_large_gates = circuitMetrics(circuit_like).multi_qudit_gates
     else:
-        operations = circuit_like
-        num_large_gates = 0
-        for operation in operations:
-            for gate in operation.gate._circuit.gate_set:
-                if gate.num_qudits == 1:
-                    continue
-                num_large_gates += operation.gate._circuit.count(gate)
+        num_large_gates = sum(circuitMetrics(operation.gate._circuit).multi_qudit_gates for operation in circuit_like)
 
     return num_large_gates
+
+def _partitioned(qc: str | Circuit, session: CompilationSession, content_hash: str = None) -> Circuit:
+    """
+    Returns qc (a QASM path or a circuit) partitioned by QuickPartitioner, taken from session's partition cache if it
+    was partitioned before. The session's runtime is only used on a miss. The result must not be modified.
+    """
+    cache = session.partition_cache
+    if content_hash is None:
+        content_hash = circuitContentHash(qc)
+    if content_hash is None:
+        # Without a QASM encoding there is no content hash to key the cache on
+        return _quickPartition(qc, session)
+    key = cache.key(content_hash, analyticsBlockSize)
+    parted_circuit = cache.get(key)
+    if parted_circuit is None:
+        parted_circuit = _quickPartition(qc, session)
+        cache.put(key, parted_circuit)
+    return parted_circuit
+
+def _quickPartition(qc: str | Circuit, session: CompilationSession) -> Circuit:
+    """
+    Partitions qc (a QASM path or a circuit) by QuickPartitioner on the session's runtime, bypassing the cache.
+    """
+    circuit = Circuit.from_file(qc) if isinstance(qc, str) else qc
+    return session.compiler.compile(circuit, [QuickPartitioner(analyticsBlockSize)])
+
+def _partition_unitaries(qc: str | Circuit, session: CompilationSession) -> list:
+    """
+    Returns the unitaries of the partitions of qc as arrays, in partition order, taken from session's unitary store.
+    Only the unitaries missing from the store are computed. The arrays must not be modified. The content hash of qc is
+    computed once for all of its partitions, which are keyed by their index.
+    """
+    store = session.unitary_store
+    content_hash = circuitContentHash(qc)
+    if content_hash is None:
+        # Neither cache can be keyed without a QASM encoding
+        return [partition.get_unitary() for partition in _quickPartition(qc, session)]
+    parted_circuit = _partitioned(qc, session, content_hash)
+    return [store.unitary(store.key(content_hash, index, analyticsBlockSize), lambda: partition.get_unitary())
+            for index, partition in enumerate(parted_circuit)]
   
-def _padded_prob_dist(loc1, loc2):
-  list_of_arrays = []
-  circ_locs = [loc1, loc2]
-  for circ_loc in circ_locs:
-      circ_name = circ_loc.split(".")[0].split("/")[-1]
-      circ = Circuit.from_file(circ_loc)
-      workflow = [QuickPartitioner()]
-      with Compiler() as compiler: 
-          parted_circuit = compiler.compile(circ, workflow)
-      freq_dict = {}
-      cxcount_list = []
-      prob_dist_array = []
-      for i, partition in enumerate(parted_circuit): 
-          subcirc = partition.gate._circuit 
-          num_gates = _count_large_gates(subcirc)
-          cxcount_list.append(num_gates)
-      for num in cxcount_list: #list of frequency of number of cnots
-              if num in freq_dict:
-                  freq_dict[num] += 1
-              else:
-                  freq_dict[num] = 1 
-      for key, value in freq_dict.items(): #normalizes in freq_dict
-          freq_dict[key] = value / sum(freq_dict.values()) 
-      for i in range(max(freq_dict) + 1): #makes probability distribution array
-          if i in freq_dict:
-              prob_dist_array.append(freq_dict[i])
-          else:
-              prob_dist_array.append(0)
-      list_of_arrays.append(prob_dist_array)
-  max_length = max(len(array) for array in list_of_arrays)
-  for i in range(len(list_of_arrays)): #pads arrays to same length
-          while len(list_of_arrays[i]) < max_length:
-              list_of_arrays[i].append(0)
-  return list_of_arrays[0],list_of_arrays[-1]
+def _cnot_distribution(parted_circuit: Circuit) -> np.ndarray:
+    """
+    Probability distribution of the number of large (CNOT) gates per partition of a partitioned circuit, indexed by
+    gate count.
+    """
+    counts = [_count_large_gates(partition.gate._circuit) for partition in parted_circuit]
+    return np.bincount(counts) / len(counts)
+
+def _padded_distributions(distributions: list) -> np.ndarray:
+    """
+    Stacks distributions of different lengths into one matrix, one row each, padded with zeros.
+    """
+    matrix = np.zeros((len(distributions), max(len(distribution) for distribution in distributions)))
+    for row, distribution in zip(matrix, distributions):
+        row[:len(distribution)] = distribution
+    return matrix
+
+def _padded_prob_dist(loc1, loc2, runtime_address: str | list = None, session: CompilationSession = None):
+  with _session_scope(session, runtime_address) as session:
+      distributions = [_cnot_distribution(_partitioned(circ_loc, session)) for circ_loc in (loc1, loc2)]
+  padded = _padded_distributions(distributions)
+  return padded[0].tolist(), padded[1].tolist()
 
 
 def _kl_divergence(p, q):
@@ -89,6 +103,56 @@ def _chi2_distance(a, b):
   print("Chi2 divergence is", chi)
   return chi
 
+def _kl_matrix(distributions: np.ndarray) -> np.ndarray:
+    """
+    KL divergence of every row of distributions from every other row, smoothed as in _kl_divergence. Entry [i, j] is
+    the divergence of row i from row j.
+    """
+    epsilon = 1e-10
+    smooth = distributions + epsilon
+    smooth = smooth / smooth.sum(axis=1, keepdims=True)
+    logs = np.log(smooth)
+    # KL(p, q) = sum p log p - sum p log q, for all pairs at once
+    kl = np.sum(smooth * logs, axis=1)[:, None] - smooth @ logs.T
+    np.fill_diagonal(kl, 0.0)
+    return np.maximum(kl, 0.0)
+
+def _chi2_matrix(distributions: np.ndarray) -> np.ndarray:
+    """
+    Chi-squared distance, as in _chi2_distance, between every pair of rows of distributions. The distance is
+    symmetric, so each unordered pair is computed once.
+    """
+    n = len(distributions)
+    rows, cols = np.triu_indices(n, k=1)
+    first, second = distributions[rows], distributions[cols]
+    total = first + second
+    terms = np.divide((first - second) ** 2, total, out=np.zeros_like(total), where=total != 0)
+
+    chi = np.zeros((n, n))
+    chi[rows, cols] = 0.5 * terms.sum(axis=1)
+    chi[cols, rows] = chi[rows, cols]
+    return chi
+
+def _hs_distance_matrix(unitaries1: list, unitaries2: list) -> np.ndarray:
+    """
+    Distance of every unitary of unitaries1 from every unitary of unitaries2, as UnitaryMatrix.get_distance_from
+    computes it: sqrt(1 - (|Tr(U^dagger V)| / N)^2), which ignores global phase. Pairs of different dimensions are 1.0.
+
+    Unitaries are grouped by dimension and stacked. Tr(U^dagger V) is the sum of conj(U) * V over all entries, so all
+    traces of a group come from one product of the flattened stacks instead of one matrix product per pair.
+    """
+    distances = np.ones((len(unitaries1), len(unitaries2)))
+    dims1 = np.array([len(unitary) for unitary in unitaries1])
+    dims2 = np.array([len(unitary) for unitary in unitaries2])
+    for dim in np.intersect1d(dims1, dims2):
+        rows = np.flatnonzero(dims1 == dim)
+        cols = np.flatnonzero(dims2 == dim)
+        first = np.stack([unitaries1[row] for row in rows]).reshape(len(rows), -1)
+        second = np.stack([unitaries2[col] for col in cols]).reshape(len(cols), -1)
+        frac = np.minimum(np.abs(first.conj() @ second.T) / dim, 1.0)
+        distances[np.ix_(rows, cols)] = np.sqrt(np.maximum(1.0 - frac ** 2, 0.0))
+    return distances
+
 def _analyzeDistances(data):
     min_list = []
     max_list= []
@@ -0,0 +1,116 @@
+from concurrent.futures import Future
+from qiskit import QuantumCircuit
+from qiskit.compiler import transpile
+import statistics
+import time
+
+# Basis of the Qiskit baseline, the same gates the BQSKit results are translated to
+qiskitBasisGates = ['cx', 'rz', 'x', 'sx']
+
+
+def _transpileBaseline(circuit: QuantumCircuit, optimization_level: int) -> tuple:
+    """
+    Transpiles circuit to qiskitBasisGates and returns (transpiled circuit, seconds). Executed in the baseline worker
+    while the BQSKit passes keep every core busy, so the seconds are the worker's CPU time (process_time) rather than its
+    wall time, which would count the time the transpile waited for a core. The worker runs nothing else, so its CPU time
+    is what the transpile takes on an idle core.
+    """
+    startTime = time.process_time()
+    compiled = transpile(circuit, optimization_level=optimization_level, basis_gates=qiskitBasisGates)
+    return compiled, time.process_time() - startTime
+
+def startQiskitBaseline(circuit: QuantumCircuit, optimization_level: int, session = None) -> Future:
+    """
+    Starts the Qiskit baseline transpilation of circuit and returns a Future of (transpiled circuit, seconds).
+
+    If session is given, the transpile runs in the session's baseline worker process, so it overlaps with the BQSKit
+    passes that follow, and the seconds are the worker's CPU time (see _transpileBaseline). Without a session it runs
+    right away in this process, alone, and the seconds are its wall time.
+    """
+    if session is not None:
+        return session.baseline_worker.submit(_transpileBaseline, circuit, optimization_level)
+
+    future = Future()
+    startTime = time.perf_counter()
+    compiled = transpile(circuit, optimization_level=optimization_level, basis_gates=qiskitBasisGates)
+    future.set_result((compiled, time.perf_counter() - startTime))
+    return future
+
+def _transpiledMetrics(circuit: QuantumCircuit) -> tuple:
+    """
+    (two-qubit gate count, two-qubit gate depth, gate count) of a transpiled circuit, counted like the Qiskit rows of
+    predeterminedCompilation.
+    """
+    circuit.remove_final_measurements()
+    isMultiQubit = lambda instruction: len(instruction.qubits) > 1
+    twoQubitGates = sum(1 for instruction in circuit.data if isMultiQubit(instruction))
+    return twoQubitGates, circuit.depth(filter_function=isMultiQubit), sum(circuit.count_ops().values())
+
+def transpileGrid(circuits: list, optimization_levels: list, seeds: list, num_processes: int = None) -> tuple:
+    """
+    Transpiles every circuit with every optimization level and seed_transpiler value.
+
+    Each (level, seed) pair is one call of Qiskit's transpile on the whole list of circuits, which spreads the circuits
+    over num_processes processes.
+
+    Returns:
+        (metrics, times): metrics[level][seed] is the list of _transpiledMetrics tuples in the order of circuits, and
+        times[level] the wall time in seconds of all batches of that level.
+    """
+    metrics = {}
+    times = {}
+    for level in optimization_levels:
+        metrics[level] = {}
+        startTime = time.perf_counter()
+        for seed in seeds:
+            compiled = transpile(circuits, optimization_level=level, seed_transpiler=seed,
+                                 basis_gates=qiskitBasisGates, num_processes=num_processes)
+            metrics[level][seed] = [_transpiledMetrics(circuit) for circuit in compiled]
+        times[level] = time.perf_counter() - startTime
+    return metrics, times
+
+def _summarize(results: list) -> dict:
+    """
+    Best, median and spread (max - min) of each metric over a list of ((level, seed), metrics tuple) pairs. The best
+    configuration has the fewest two-qubit gates, then the lowest two-qubit depth, then the fewest gates.
+    """
+    summary = {}
+    for position, name in enumerate(['Two-Qubit Gate Count', 'Two-Qubit Gate Depth', 'Gate Count']):
+        values = [metrics[position] for _, metrics in results]
+        summary[f'{name} Best'] = min(values)
+        summary[f'{name} Median'] = statistics.median(values)
+        summary[f'{name} Spread'] = max(values) - min(values)
+    (bestLevel, bestSeed), _ = min(results, key=lambda result: result[1])
+    summary['Best Optimization Level'] = bestLevel
+    summary['Best Seed'] = bestSeed
+    return summary
+
+def baselineSweepRows(names: list, circuits: list, optimization_levels: list, seeds: list,
+                      num_processes: int = None) -> list:
+    """
+    Transpiles circuits over the grid of optimization levels and seeds with transpileGrid and returns one dictionary per
+    circuit and level, followed by one per circuit over all levels ('Optimization Level' is 'all').
+    """
+    metrics, times = transpileGrid(circuits, optimization_levels, seeds, num_processes)
+    rows = []
+    for index, (name, circuit) in enumerate(zip(names, circuits)):
+        everyLevel = []
+        for level in list(optimization_levels) + ['all']:
+            if level == 'all':
+                results = everyLevel
+                batchTime = sum(times.values())
+            else:
+                results = [((level, seed), metrics[level][seed][index]) for seed in seeds]
+                everyLevel.extend(results)
+                batchTime = times[level]
+            row = {
+                'Circuit QASM File Name': name,
+                'Circuit Qubit Count': circuit.num_qubits,
+                'Optimization Level': level,
+                'Seed Count': len(seeds),
+            }
+            row.update(_summarize(results))
+            row['Batch Transpile Time (seconds)'] = batchTime
+            row['Framework'] = 'Qiskit'
+            rows.append(row)
+    return rows
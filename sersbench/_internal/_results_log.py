@@ -0,0 +1,166 @@
+import hashlib
+import json
+import os
+
+
+def fileContentHash(path: str) -> str:
+    """
+    Returns the SHA-256 hash of the contents of the file at path.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def configHash(config: dict) -> str:
+    """
+    Returns a hash of a JSON-serializable configuration dictionary that does not depend on key order.
+    """
+    return hashlib.sha256(json.dumps(config, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class ResultsLog:
+    """
+    Append-only JSON-Lines file holding the results of each compiled circuit, used to checkpoint and resume long runs.
+
+    Every line records one circuit: its path, the hash of its contents, the hash of the compilation settings and the
+    list of infoDicts produced for it. A circuit counts as completed when a record with the same file name, contents and
+    settings exists; the file name is part of the key because it appears in the infoDicts. Lines are flushed to disk as soon as a circuit finishes, so a crash loses at most
+    the circuit being compiled. When the log is opened again, circuits whose contents and settings are already recorded
+    can be skipped. A partially written last line (from a crash during the write) is ignored.
+
+    Parameters:
+        path (str): Path of the .jsonl file. Created on the first append if it does not exist.
+
+        config (dict): Compilation settings. Only records made with the same settings count as completed.
+    """
+
+    def __init__(self, path: str, config: dict):
+        self.path = path
+        self.config = config
+        self.config_hash = configHash(config)
+        # (file name, content hash) -> byte offset of the latest record made with this configuration
+        self._completed = {}
+        for offset, record in self._records():
+            if record.get('config_hash') == self.config_hash:
+                self._completed[(os.path.basename(record['file']), record['input_hash'])] = offset
+
+    def completed(self, file: str) -> bool:
+        """
+        True if file, with its current contents, was already compiled with this configuration.
+        """
+        return self._key(file) in self._completed
+
+    def append(self, file: str, results: list):
+        """
+        Records the results of one circuit and flushes them to disk.
+        """
+        record = {
+            'file': file,
+            'input_hash': fileContentHash(file),
+            'config_hash': self.config_hash,
+            'config': self.config,
+            'results': results,
+        }
+        with open(self.path, 'a+b') as f:
+            offset = f.seek(0, os.SEEK_END)
+            # Terminates a line left incomplete by a crash so that it stays a separate (ignored) line
+            if offset > 0:
+                f.seek(offset - 1)
+                if f.read(1) != b'\n':
+                    f.write(b'\n')
+                    offset += 1
+            f.write((json.dumps(record) + '\n').encode())
+            f.flush()
+            os.fsync(f.fileno())
+        self._completed[(os.path.basename(file), record['input_hash'])] = offset
+
+    def results(self, files: list) -> list:
+        """
+        Returns the recorded results of files, in the order of files. Files without a record are skipped.
+        """
+        return list(self.iterResults(files))
+
+    def iterResults(self, files: list):
+        """
+        Yields the recorded results of files one at a time, in the order of files, without loading the whole log.
+        """
+        if not self._completed:
+            return
+        with open(self.path, 'rb') as f:
+            for file in files:
+                offset = self._completed.get(self._key(file))
+                if offset is None:
+                    continue
+                f.seek(offset)
+                yield json.loads(f.readline())['results']
+
+    def view(self, files: list, flat: bool = False) -> 'LoggedResults':
+        """
+        Returns a LoggedResults over the recorded results of files, which reads them from the log each time it is
+        iterated instead of holding them in memory.
+        """
+        return LoggedResults(self, files, flat)
+
+    def _key(self, file: str) -> tuple:
+        return (os.path.basename(file), fileContentHash(file))
+
+    def _records(self):
+        """
+        Yields (byte offset, record) for every complete record of the log file.
+        """
+        if not os.path.isfile(self.path):
+            return
+        with open(self.path, 'rb') as f:
+            offset = 0
+            for line in f:
+                try:
+                    yield offset, json.loads(line)
+                except json.JSONDecodeError:
+                    pass
+                offset += len(line)
+
+
+class LoggedResults:
+    """
+    Lazy view of the recorded results of some files of a ResultsLog, returned by directory runs that write a log so
+    that large directories are never loaded into memory at once. Every iteration reads the records back from the log
+    one at a time, in the order of the files; call list() on it to load them all.
+
+    Parameters:
+        log (ResultsLog): Log holding the results.
+
+        files (list): Files whose results are read, in order. Files without a record are skipped.
+
+        flat (bool): Yield the infoDicts of all circuits one by one instead of one list per circuit. (Default: False).
+    """
+
+    def __init__(self, log: ResultsLog, files: list, flat: bool = False):
+        self.log = log
+        self.files = files
+        self.flat = flat
+
+    def __iter__(self):
+        for results in self.log.iterResults(self.files):
+            if self.flat:
+                yield from results
+            else:
+                yield results
+
+    def rows(self):
+        """
+        Yields the infoDicts of all circuits one by one.
+        """
+        for results in self.log.iterResults(self.files):
+            yield from results
+
+    def dump(self, json_file):
+        """
+        Writes the infoDicts of all circuits to json_file as one JSON list, one record at a time.
+        """
+        json_file.write('[')
+        for i, row in enumerate(self.rows()):
+            json_file.write(', ' if i else '')
+            json.dump(row, json_file)
+        json_file.write(']')
@@ -0,0 +1,43 @@
+from bqskit.runtime import default_server_port
+from bqskit.runtime.base import ServerBase, parse_ipports
+from bqskit.runtime.detached import DetachedServer
+from multiprocessing.connection import Connection
+import argparse
+
+
+class _SharedDetachedServer(DetachedServer):
+    """
+    Detached BQSKit runtime server that keeps serving after a client disconnects.
+
+    BQSKit's DetachedServer looks up the finished tasks of a disconnecting client with a stale loop variable, so it fails
+    and shuts the runtime down as soon as a client that received a result disconnects. Several sersbench processes, or
+    several sessions one after another, can only share a runtime through this server.
+    """
+
+    def handle_disconnect(self, conn: Connection):
+        ServerBase.handle_disconnect(self, conn)
+        for task_id in self.clients.pop(conn, set()):
+            self.handle_cancel_comp_task(task_id)
+
+        # Finished tasks are kept until their client leaves, in case log messages of them arrive late
+        finished = [(task_id, mailbox_id) for task_id, (mailbox_id, client_conn) in self.tasks.items()
+                    if client_conn == conn]
+        for task_id, mailbox_id in finished:
+            self.tasks.pop(task_id)
+            self.mailbox_to_task_dict.pop(mailbox_id, None)
+
+
+def startRuntimeServer(argv: list = None):
+    """
+    Entry point of a runtime server in front of bqskit-manager processes, taking the same arguments as bqskit-server:
+    the 'host:port' addresses of the managers and -p for the port clients connect to.
+    """
+    parser = argparse.ArgumentParser(prog='sersbench.bqskit.runtime_server',
+                                     description='Launch a BQSKit runtime server shared by sersbench processes.')
+    parser.add_argument('managers', nargs='+', help='The host:port addresses of the bqskit-manager processes.')
+    parser.add_argument('-p', '--port', type=int, default=default_server_port,
+                        help='The port this server listens for clients on.')
+    args = parser.parse_args(argv)
+
+    server = _SharedDetachedServer(parse_ipports(args.managers), args.port)
+    server.run()
@@ -0,0 +1,134 @@
+from collections import OrderedDict
+import hashlib
+import numpy as np
+import os
+import tempfile
+import weakref
+from ._partition_cache import analyticsBlockSize
+
+
+class UnitaryStore:
+    """
+    Store of the unitaries of partition blocks keyed by the content hash of their circuit and the index of the
+    partition, so that the distance and fidelity analytics build each block's unitary once, however many pairs the
+    block takes part in.
+
+    Unitaries are kept in memory up to max_memory_bytes, evicting the least recently used first. If a path is given,
+    evicted unitaries are spilled to disk as .npy files, each written to a temporary name and atomically renamed into
+    place, and read back on their next use. Spilled files are kept, so later runs and other processes sharing the
+    directory find them too. Stored arrays are shared between callers and must not be modified. Unitaries of whole
+    circuit objects (circuit_unitary) are kept in memory only.
+
+    Parameters:
+        path (str): Directory unitaries are spilled to. Created if it does not exist. If None, evicted unitaries are
+        dropped and rebuilt when needed again. (Default: None)
+
+        max_memory_bytes (int): Total size of the unitaries kept in memory, in bytes. (Default: 256 MiB)
+    """
+
+    def __init__(self, path: str = None, max_memory_bytes: int = 2 ** 28):
+        self.path = path
+        self.max_memory_bytes = max_memory_bytes
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._objects = {}
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+
+    def key(self, content_hash: str, partition: int = None, block_size: int = analyticsBlockSize) -> str:
+        """
+        Returns the key of the unitary of partition (its index among the QuickPartitioner blocks with block_size) of
+        the circuit with content_hash. If partition is None, the key of the unitary of the whole circuit.
+        """
+        if partition is None:
+            return hashlib.sha256(f'circuit:{content_hash}'.encode()).hexdigest()
+        return hashlib.sha256(f'QuickPartitioner:{block_size}:{content_hash}:{partition}'.encode()).hexdigest()
+
+    def get(self, key: str) -> np.ndarray | None:
+        """
+        Returns the unitary stored under key, or None on a miss.
+        """
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return self._memory[key]
+
+        if self.path is not None and key not in self._objects:
+            try:
+                unitary = np.load(self._file_path(key))
+            except (FileNotFoundError, ValueError, EOFError):
+                unitary = None
+            if unitary is not None:
+                self._remember(key, unitary)
+                self.hits += 1
+                return unitary
+
+        self.misses += 1
+        return None
+
+    def put(self, key: str, unitary: np.ndarray):
+        """
+        Stores unitary under key.
+        """
+        self._remember(key, np.asarray(unitary, dtype=np.complex128))
+
+    def unitary(self, key: str, build) -> np.ndarray:
+        """
+        Returns the unitary stored under key, calling build() and storing its result on a miss.
+        """
+        unitary = self.get(key)
+        if unitary is None:
+            unitary = np.asarray(build(), dtype=np.complex128)
+            self.put(key, unitary)
+        return unitary
+
+    def circuit_unitary(self, circuit) -> np.ndarray:
+        """
+        Returns the unitary of circuit, computed once per circuit object. Keyed by the object's identity instead of its
+        contents, so nothing is serialized, and dropped when the circuit is garbage collected. The circuit must not be
+        modified while its unitary is in use.
+        """
+        key = f'object:{id(circuit)}'
+        if key not in self._objects:
+            # Forgotten with the circuit, so a later object reusing its id does not find its unitary
+            self._objects[key] = weakref.finalize(circuit, self._forget, key)
+        return self.unitary(key, circuit.get_unitary)
+
+    def _forget(self, key: str):
+        self._objects.pop(key, None)
+        if key in self._memory:
+            self._memory_bytes -= self._memory.pop(key).nbytes
+
+    def _remember(self, key: str, unitary: np.ndarray):
+        if key in self._memory:
+            self._memory_bytes -= self._memory[key].nbytes
+        self._memory[key] = unitary
+        self._memory.move_to_end(key)
+        self._memory_bytes += unitary.nbytes
+        # Keeps the most recent unitary even if it alone is larger than the bound
+        while self._memory_bytes > self.max_memory_bytes and len(self._memory) > 1:
+            evicted_key, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted.nbytes
+            self._spill(evicted_key, evicted)
+
+    def _spill(self, key: str, unitary: np.ndarray):
+        if self.path is None or key in self._objects or os.path.exists(self._file_path(key)):
+            return
+        fd, temp_path = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.save(f, unitary)
+            os.replace(temp_path, self._file_path(key))
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def _file_path(self, key: str) -> str:
+        return os.path.join(self.path, f'{key}.npy')
+
+
+# Store used when no other one is given, shared by every analysis in this process
+processUnitaryStore = UnitaryStore()
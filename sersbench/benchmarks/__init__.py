@@ -0,0 +1,11 @@
+from .suite import runBenchmarks, compareBenchmarks
+from .workloads import BenchmarkWorkload, benchmarkWorkloads, benchmarkStages, defaultSizes
+
+__all__ = [
+  'runBenchmarks',
+  'compareBenchmarks',
+  'BenchmarkWorkload',
+  'benchmarkWorkloads',
+  'benchmarkStages',
+  'defaultSizes',
+]
@@ -0,0 +1,176 @@
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+from importlib import metadata
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import tempfile
+import time
+import numpy as np
+from .workloads import benchmarkSeed, benchmarkWorkloads
+
+# Version of the report layout, stored in every report and checked when comparing against a baseline
+reportVersion = 1
+
+# Packages whose versions are recorded in a report, since upgrading them is what the suite is meant to check
+_trackedPackages = ('sersbench', 'bqskit', 'bqskitrs', 'qiskit', 'numpy', 'scipy', 'pandas')
+
+
+def _environment() -> dict:
+    """
+    Description of the machine and package versions a report was produced with.
+    """
+    versions = {}
+    for package in _trackedPackages:
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            versions[package] = None
+    return {'python': platform.python_version(), 'platform': platform.platform(), 'cpu_count': os.cpu_count(),
+            'packages': versions}
+
+def _workdirName(name: str) -> str:
+    return name.replace('/', '_')
+
+def runBenchmarks(stages: list = None, sizes: dict = None, repeats: int = 3, json_path: str = None,
+                  baseline_path: str = None, threshold: float = 0.25, min_seconds: float = 0.05,
+                  workdir: str = None, verbose: bool = True) -> dict:
+    """
+    Run the benchmark suite and return its report.
+
+    Every workload prepares its seeded inputs once, then is timed repeats times; Python's and NumPy's global random
+    state is reset to the suite's seed before each repetition. Output printed by the measured functions is suppressed.
+
+    Parameters:
+        stages (list): Stages to run, see benchmarkStages. If None, every stage. (Default: None)
+
+        sizes (dict): Qubit counts per stage, overriding defaultSizes for the stages it lists. (Default: None)
+
+        repeats (int): Timed repetitions of every workload. (Default: 3)
+
+        json_path (str): Path of a JSON file to write the report to. (Default: None)
+
+        baseline_path (str): Path of an earlier report to compare against with compareBenchmarks. The regressions found
+        are stored in the report under 'regressions'. (Default: None)
+
+        threshold (float): Relative slowdown of a workload's median time over the baseline flagged as a regression.
+        (Default: 0.25)
+
+        min_seconds (float): Slowdowns smaller than this many seconds are not flagged, since they are within timer and
+        scheduling noise. (Default: 0.05)
+
+        workdir (str): Directory for the generated inputs and outputs. If None, a temporary directory that is removed
+        afterwards. (Default: None)
+
+        verbose (bool): Print each workload's median time as it finishes. (Default: True)
+
+    Returns:
+        A dictionary with the report version, the creation time, the environment, the settings and, under 'results',
+        the stage, qubit count, times in seconds, median and minimum of every workload by name.
+    """
+    workloads = benchmarkWorkloads(stages, sizes)
+
+    temporary = None
+    if workdir is None:
+        temporary = tempfile.TemporaryDirectory(prefix='sersbench_benchmarks_')
+        workdir = temporary.name
+
+    results = {}
+    try:
+        for workload in workloads:
+            workloadDir = os.path.join(workdir, _workdirName(workload.name))
+            os.makedirs(workloadDir, exist_ok=True)
+            with redirect_stdout(io.StringIO()):
+                argument = workload.setup(workloadDir)
+
+            times = []
+            for _ in range(repeats):
+                random.seed(benchmarkSeed)
+                np.random.seed(benchmarkSeed % 2 ** 32)
+                with redirect_stdout(io.StringIO()):
+                    startTime = time.perf_counter()
+                    workload.run(argument)
+                    times.append(time.perf_counter() - startTime)
+
+            results[workload.name] = {'stage': workload.stage, 'num_qubits': workload.num_qubits, 'times': times,
+                                      'median': statistics.median(times), 'min': min(times)}
+            if verbose:
+                print(f'{workload.name}: {results[workload.name]["median"]:.4f} s')
+    finally:
+        if temporary is not None:
+            temporary.cleanup()
+
+    report = {'version': reportVersion, 'created': datetime.now(timezone.utc).isoformat(), 'environment': _environment(),
+              'settings': {'repeats': repeats, 'seed': benchmarkSeed}, 'results': results}
+
+    if baseline_path is not None:
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        report['regressions'] = compareBenchmarks(report, baseline, threshold, min_seconds)
+        if verbose:
+            for regression in report['regressions']:
+                print(f'Regression: {regression["name"]} {regression["baseline"]:.4f} s -> '
+                      f'{regression["current"]:.4f} s ({regression["ratio"]:.2f}x)')
+
+    if json_path is not None:
+        with open(json_path, 'w') as f:
+            json.dump(report, f, indent=2)
+    return report
+
+def compareBenchmarks(report: dict, baseline: dict, threshold: float = 0.25, min_seconds: float = 0.05) -> list:
+    """
+    Compare the median times of a report against a baseline report.
+
+    Parameters:
+        report (dict): Report returned by runBenchmarks.
+
+        baseline (dict): Earlier report, e.g. loaded from the JSON file of a run on the previous release.
+
+        threshold (float): Relative slowdown flagged as a regression. (Default: 0.25)
+
+        min_seconds (float): Slowdowns smaller than this many seconds are not flagged. (Default: 0.05)
+
+    Returns:
+        One dictionary per regressed workload, slowest ratio first, with its name, stage, baseline and current median
+        in seconds and their ratio. Workloads missing from either report are skipped.
+    """
+    if baseline.get('version') != reportVersion:
+        raise ValueError(f'Baseline report version {baseline.get("version")} does not match {reportVersion}.')
+
+    regressions = []
+    for name, result in report['results'].items():
+        if name not in baseline['results']:
+            continue
+        before = baseline['results'][name]['median']
+        after = result['median']
+        if after > before * (1 + threshold) and after - before > min_seconds:
+            regressions.append({'name': name, 'stage': result['stage'], 'baseline': before, 'current': after,
+                                'ratio': after / before if before > 0 else float('inf')})
+    return sorted(regressions, key=lambda regression: regression['ratio'], reverse=True)
+
+def main(argv: list = None) -> int:
+    """
+    Command line entry point. Runs the suite, writes its report and returns 1 if a regression against the baseline
+    was found, otherwise 0.
+    """
+    import argparse
+    from .workloads import benchmarkStages
+
+    parser = argparse.ArgumentParser(prog='python -m sersbench.benchmarks',
+                                     description='Run the SERSBench benchmark suite.')
+    parser.add_argument('-o', '--output', help='JSON file to write the report to.')
+    parser.add_argument('-b', '--baseline', help='Earlier report to compare against.')
+    parser.add_argument('-s', '--stages', nargs='+', choices=benchmarkStages, help='Stages to run (default: all).')
+    parser.add_argument('-r', '--repeats', type=int, default=3, help='Timed repetitions of every workload.')
+    parser.add_argument('-t', '--threshold', type=float, default=0.25,
+                        help='Relative slowdown flagged as a regression.')
+    parser.add_argument('--min-seconds', type=float, default=0.05,
+                        help='Slowdowns smaller than this many seconds are not flagged.')
+    args = parser.parse_args(argv)
+
+    report = runBenchmarks(stages=args.stages, repeats=args.repeats, json_path=args.output,
+                           baseline_path=args.baseline, threshold=args.threshold, min_seconds=args.min_seconds)
+    return 1 if report.get('regressions') else 0
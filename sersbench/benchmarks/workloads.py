@@ -0,0 +1,162 @@
+from dataclasses import dataclass
+from pathlib import Path
+import json
+import os
+import random
+from bqskit.ir import Circuit
+from sersbench._internal import _load_calibration_data
+from sersbench.bqskit import optimizeBQSkit
+from sersbench.create_circuits import (construct_bqskit_bv_all_ones, construct_bqskit_clifford, construct_bqskit_QV,
+                                       construct_qiskit_dtc_unitary)
+from sersbench.partitions import generate_comparison_stats, get_unitary_distances, partition_data
+
+# Seed of every generated circuit and calibration snapshot, so each run of the suite measures the same inputs
+benchmarkSeed = 20250101
+
+# Stages of the pipeline covered by the suite, in the order they run
+benchmarkStages = ('generation', 'partitioning', 'synthesis', 'analytics', 'calibration')
+
+# Qubit counts of each stage. Synthesis and the pairwise analytics grow far faster with the circuit than the other
+# stages, so they stop at smaller sizes
+defaultSizes = {
+    'generation': (5, 10, 20, 50),
+    'partitioning': (5, 10, 20, 50),
+    'synthesis': (5, 8),
+    'analytics': (5, 10),
+    'calibration': (5, 20, 50),
+}
+
+# construct_bqskit_QV compiles every circuit it generates with BQSKit, so QV generation stops at this width
+maxQVQubits = 10
+
+# Number of calibration snapshots written for each calibration workload
+calibrationSnapshots = 30
+
+
+@dataclass(frozen=True)
+class BenchmarkWorkload:
+    """
+    One timed step of the benchmark suite.
+
+    Parameters:
+        name (str): Unique name of the workload, used as its key in reports and baselines.
+
+        stage (str): Pipeline stage the workload covers, one of benchmarkStages.
+
+        num_qubits (int): Width of the circuits or device the workload runs on.
+
+        setup (callable): Called as setup(workdir) before the timed runs, with an empty directory of its own. Prepares
+        the inputs in it and returns the argument passed to run.
+
+        run (callable): Called as run(argument) on every timed repetition.
+    """
+
+    name: str
+    stage: str
+    num_qubits: int
+    setup: callable
+    run: callable
+
+
+def _generatedCircuits(workdir: str, num_qubits: int, count: int = 1) -> str:
+    """
+    Writes count seeded Clifford circuits of num_qubits to workdir and returns its path.
+    """
+    for index in range(count):
+        construct_bqskit_clifford(num_qubits=num_qubits, save_path=workdir, seed=benchmarkSeed + index)
+    return workdir
+
+def _writeCalibrations(workdir: str, num_qubits: int) -> str:
+    """
+    Writes calibrationSnapshots seeded snapshots of a device with num_qubits qubits on a line, in the format saved by
+    get_current_backend, to workdir and returns its path.
+    """
+    rng = random.Random(benchmarkSeed + num_qubits)
+    for snapshot in range(calibrationSnapshots):
+        gates = []
+        for qubit in range(num_qubits):
+            for gate in ('sx', 'x', 'rz'):
+                gates.append({'gate': gate, 'qubits': [qubit], 'name': f'{gate}{qubit}',
+                              'parameters': [{'name': 'gate_error', 'unit': '', 'value': rng.uniform(1e-4, 1e-3)}]})
+        for qubit in range(num_qubits - 1):
+            pair = [qubit, qubit + 1]
+            gates.append({'gate': 'ecr', 'qubits': pair, 'name': f'ecr{qubit}_{qubit + 1}',
+                          'parameters': [{'name': 'gate_error', 'unit': '', 'value': rng.uniform(1e-3, 1e-2)}]})
+        data = {'device_properties': {'last_update_date': f'2025-01-{snapshot + 1:02d}T00:00:00', 'gates': gates}}
+        with open(os.path.join(workdir, f'calibration_d{snapshot:03d}.json'), 'w') as f:
+            json.dump(data, f)
+    return workdir
+
+def _synthesisInputs(workdir: str, num_qubits: int) -> str:
+    """
+    Writes one seeded Clifford circuit of num_qubits to workdir/circuits, so compiled circuits saved next to it are not
+    compiled again on the next repetition, and returns that directory.
+    """
+    directory = os.path.join(workdir, 'circuits')
+    os.makedirs(directory)
+    return _generatedCircuits(directory, num_qubits)
+
+def _runSynthesis(directory: str):
+    outputs = os.path.join(os.path.dirname(directory), 'compiled')
+    os.makedirs(outputs, exist_ok=True)
+    optimizeBQSkit(qc=directory, save_path=outputs)
+
+def _runUnitaryDistances(directory: str):
+    first, second = sorted(str(file) for file in Path(directory).glob('*.qasm'))[:2]
+    get_unitary_distances(Circuit.from_file(first), Circuit.from_file(second))
+
+def benchmarkWorkloads(stages: list = None, sizes: dict = None) -> list:
+    """
+    Returns the BenchmarkWorkloads of the suite.
+
+    Parameters:
+        stages (list): Stages to include, see benchmarkStages. If None, every stage. (Default: None)
+
+        sizes (dict): Qubit counts per stage, overriding defaultSizes for the stages it lists. (Default: None)
+    """
+    stages = benchmarkStages if stages is None else stages
+    unknown = set(stages) - set(benchmarkStages)
+    if unknown:
+        raise ValueError(f'Unknown benchmark stages {sorted(unknown)}. Supported stages are {", ".join(benchmarkStages)}.')
+    sizes = {**defaultSizes, **(sizes or {})}
+
+    workloads = []
+    for stage in benchmarkStages:
+        if stage not in stages:
+            continue
+        for n in sizes[stage]:
+            if stage == 'generation':
+                if n <= maxQVQubits:
+                    workloads.append(BenchmarkWorkload(f'generation/bqskit_qv/{n}', stage, n, lambda workdir: None,
+                                                       lambda _, n=n: construct_bqskit_QV(num_qubits=n,
+                                                                                          seed=benchmarkSeed)))
+                workloads.extend([
+                    BenchmarkWorkload(f'generation/bqskit_clifford/{n}', stage, n, lambda workdir: None,
+                                      lambda _, n=n: construct_bqskit_clifford(num_qubits=n, seed=benchmarkSeed)),
+                    BenchmarkWorkload(f'generation/bqskit_bv_all_ones/{n}', stage, n, lambda workdir: None,
+                                      lambda _, n=n: construct_bqskit_bv_all_ones(num_qubits=n)),
+                    BenchmarkWorkload(f'generation/qiskit_dtc/{n}', stage, n, lambda workdir: None,
+                                      lambda _, n=n: construct_qiskit_dtc_unitary(num_qubits=n, seed=benchmarkSeed)),
+                ])
+            elif stage == 'partitioning':
+                workloads.append(BenchmarkWorkload(f'partitioning/partition_data/{n}', stage, n,
+                                                   lambda workdir, n=n: _generatedCircuits(workdir, n),
+                                                   partition_data))
+            elif stage == 'synthesis':
+                workloads.append(BenchmarkWorkload(f'synthesis/optimizeBQSkit/{n}', stage, n,
+                                                   lambda workdir, n=n: _synthesisInputs(workdir, n),
+                                                   _runSynthesis))
+            elif stage == 'analytics':
+                workloads.extend([
+                    BenchmarkWorkload(f'analytics/generate_comparison_stats/{n}', stage, n,
+                                      lambda workdir, n=n: _generatedCircuits(workdir, n, count=3),
+                                      generate_comparison_stats),
+                    BenchmarkWorkload(f'analytics/get_unitary_distances/{n}', stage, n,
+                                      lambda workdir, n=n: _generatedCircuits(workdir, n, count=2),
+                                      _runUnitaryDistances),
+                ])
+            elif stage == 'calibration':
+                workloads.append(BenchmarkWorkload(f'calibration/_load_calibration_data/{n}', stage, n,
+                                                   lambda workdir, n=n: _writeCalibrations(workdir, n),
+                                                   _load_calibration_data))
+    return workloads
@@ -1,5 +1,13 @@
-from .compile import optimizeBQSkit
+from .compile import optimizeBQSkit, iter_optimize, sweep
+from sersbench._internal import BaselineCache, BlockCache, CompilationSession, iter_block_results, memorySummary
 
 __all__ = [
   "optimizeBQSkit",
+  "iter_optimize",
+  "sweep",
+  "iter_block_results",
+  "CompilationSession",
+  "BlockCache",
+  "BaselineCache",
+  "memorySummary",
 ]
\ No newline at end of file
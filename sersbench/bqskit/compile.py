@@ -1,11 +1,16 @@
-from sersbench._internal import optimizeBQSkitFromDirectory, optimizeBQSkitFromFile
+from sersbench._internal import (optimizeBQSkitFromDirectory, optimizeBQSkitFromFile, iterOptimizeBQSkitFromDirectory,
+                                 CompilationSession, _session_scope, expandGrid, sweepFiles, memorySummary, LoggedResults)
+from pathlib import Path
 import json
 import os 
+import pandas as pd
 import platform
 
 
 def optimizeBQSkit(qc: str,  save_path: str = None, replace_filter: str = 'always', json_path: str = None, success_threshold: float = 1e-8, 
-    partitioner: int = 0, pass_type: int = 0):
+    partitioner: int = 0, pass_type: int = 0, session: CompilationSession = None, max_concurrent: int = 1, max_workers: int = None,
+    jsonl_path: str = None, block_size: int|str = 3, block_budget: float = None, circuit_budget: float = None,
+    runtime_address: str|list = None, memory_profile: bool = False):
     """
     Optimize circuit(s) using BQSkit. Can optimize individual files as well as directories of QASM files.
 
@@ -25,12 +30,56 @@ def optimizeBQSkit(qc: str,  save_path: str = None, replace_filter: str = 'alway
         ScanPartitioner and 1 for QuickPartitioner. (Default: 0).
 
         pass_type (int): Optimization algorithm to use. Supports QSearch and LEAP. 0 for QSearch, 1 for LEAP. (Default: 0).
-    
+
+        session (CompilationSession): Session whose warm Compiler is reused for the compilation. Pass the same session to
+        several calls to avoid starting a new worker pool each time. If None, one is started per call. (Default: None).
+
+        max_concurrent (int): For directories, the number of QASM files compiled at once in separate processes. 1 compiles
+        them one after another; None chooses the number from the CPU count and available memory. (Default: 1).
+
+        max_workers (int): For directories compiled in parallel, the cap on the total number of BQSKit worker processes.
+        If None, the CPU count is used. (Default: None).
+
+        jsonl_path (str): Path of a JSON-Lines results log used as a checkpoint. Each circuit's result is appended as soon
+        as it finishes; on a later call with the same log, files whose contents and settings are already recorded are
+        not compiled again. For directories, the results are then returned as a LoggedResults that reads them from the
+        log when iterated (call list() on it to load them), and are streamed to the JSON file. (Default: None).
+
+        block_size (int|str): Largest number of qubits per partition (2 to 4 are practical), or 'adaptive' to choose 2, 3
+        or 4 per circuit region from expected synthesis time against expected gate reduction. (Default: 3).
+
+        block_budget (float): Wall-clock seconds a partition block may spend in synthesis before it is cancelled and its
+        original sub-circuit kept. If None, blocks have no limit. (Default: None).
+
+        circuit_budget (float): Wall-clock seconds the block synthesis of one circuit may take in total; unfinished
+        blocks are then cancelled and keep their original sub-circuit. If None, there is no limit. (Default: None).
+
+        runtime_address (str|list): External BQSKit runtime that synthesizes the blocks if no session is given: 'host' or
+        'host:port' of a running runtime server, or a list of 'host:port' of bqskit-manager processes (see
+        CompilationSession). If None, a runtime is started on this machine. (Default: None).
+
+        memory_profile (bool): Record the peak Python memory (tracemalloc) and the sampled peak RSS of the BQSKit worker
+        processes of every compilation stage in each dictionary. Set it on the session instead if one is given.
+        (Default: False).
+        
         
     If there is a valid directory entered to save the JSON file to, saves JSON of optimization data to json_path. 
+    With memory_profile, a directory run also saves the memorySummary of its circuits there.
     If no directory is entered, returns a list containing the dictionaries that contain information about the optimized circuits.
     Saves circuit(s) to save_path.
     """
+    if memory_profile and session is not None and not session.memory_profile:
+        raise ValueError('memory_profile is set by the session when one is given. Use CompilationSession(memory_profile=True).')
+
+    # Connects one session to the external runtime (or one profiling memory) for the whole call
+    if session is None and (runtime_address is not None or memory_profile):
+        with CompilationSession(runtime_address=runtime_address, memory_profile=memory_profile) as session:
+            return optimizeBQSkit(qc=qc, save_path=save_path, replace_filter=replace_filter, json_path=json_path,
+                                  success_threshold=success_threshold, partitioner=partitioner, pass_type=pass_type,
+                                  session=session, max_concurrent=max_concurrent, max_workers=max_workers,
+                                  jsonl_path=jsonl_path, block_size=block_size, block_budget=block_budget,
+                                  circuit_budget=circuit_budget)
+
     if platform.system() == 'Windows' and save_path is not None:
         save_path = save_path.replace('\\', '/')
     # Function to check if json is not None
@@ -52,7 +101,12 @@ def optimizeBQSkit(qc: str,  save_path: str = None, replace_filter: str = 'alway
                                 success_threshold=success_threshold, 
                                 partitioner=partitioner, 
                                 pass_type=pass_type,
-                                replace_filter=replace_filter)
+                                replace_filter=replace_filter,
+                                session=session,
+                                jsonl_path=jsonl_path,
+                                block_size=block_size,
+                                block_budget=block_budget,
+                                circuit_budget=circuit_budget)
             
             # Checks if the json save path is a valid directory 
             if not json_path == None and os.path.isdir(json_path):
@@ -82,18 +136,33 @@ def optimizeBQSkit(qc: str,  save_path: str = None, replace_filter: str = 'alway
                                         success_threshold=success_threshold, 
                                         partitioner=partitioner, 
                                         pass_type=pass_type,
-                                        replace_filter=replace_filter)
+                                        replace_filter=replace_filter,
+                                        session=session,
+                                        max_concurrent=max_concurrent,
+                                        max_workers=max_workers,
+                                        jsonl_path=jsonl_path,
+                                        block_size=block_size,
+                                        block_budget=block_budget,
+                                        circuit_budget=circuit_budget)
             # Checks if the json save path is a valid directory 
-            if os.path.isdir(s=json_path):
+            if json_path is not None and os.path.isdir(s=json_path):
 
                 # Gets the name of the directory inputted wihtout the path
                 index = qc.rfind('/')
                 qc_name = qc[index+1:]
 
-                # Saves file as a json 
+                # Saves file as a json. Results of a logged run are streamed from the log one record at a time
                 file_name = f'{json_path}/{qc_name}_optimized.json'
                 with open(file_name, 'w') as json_file:
-                    json.dump(infoDict, json_file)
+                    if isinstance(infoDict, LoggedResults):
+                        infoDict.dump(json_file)
+                    else:
+                        json.dump(infoDict, json_file)
+
+                # Saves the peak memory of the directory's compilations next to them
+                if session is not None and session.memory_profile:
+                    with open(f'{json_path}/{qc_name}_memory_summary.json', 'w') as json_file:
+                        json.dump(memorySummary(infoDict), json_file)
             # If json_path equals None, returns the dictionary instead
             else:
                 return infoDict
@@ -107,4 +176,179 @@ def optimizeBQSkit(qc: str,  save_path: str = None, replace_filter: str = 'alway
     # Checks if save path is a string and if the directory is invalid
     elif isinstance(save_path,str) and not os.path.isdir(s=save_path):
         raise FileNotFoundError(f'The path {save_path} is invalid.')
-    
\ No newline at end of file
+
+
+def iter_optimize(qc: str, save_path: str = None, replace_filter: str = 'always', success_threshold: float = 1e-8,
+    partitioner: int = 0, pass_type: int = 0, session: CompilationSession = None, max_concurrent: int = 1,
+    max_workers: int = None, jsonl_path: str = None, block_size: int|str = 3, block_budget: float = None,
+    circuit_budget: float = None, runtime_address: str|list = None, memory_profile: bool = False):
+    """
+    Optimize circuit(s) using BQSkit and yield the dictionary of each circuit as soon as it is compiled, e.g. to feed a
+    live dashboard. Takes the same parameters as optimizeBQSkit, apart from json_path.
+
+    Parameters:
+        qc (str): Quantum circuit to be optimized. Path to either a QASM file or folder.
+
+        save_path (str): Path to save the optimized quantum circuit in.
+
+        replace_filter (str): A predicate that determines if the resulting circuit, after calling loop_body on a block, 
+        should replace the original operation. (Default: always). Currently support for 'less-than', 'always', and 'less-than-multi'.
+
+        success_threshold (float): The distance threshold that determines successful termintation. (Default: 1e-8).
+
+        partitioner (int): Partitions circuit into blocks of 3 qubits. Supports ScanPartitioner and QuickPartitioner. 0 for
+        ScanPartitioner and 1 for QuickPartitioner. (Default: 0).
+
+        pass_type (int): Optimization algorithm to use. Supports QSearch and LEAP. 0 for QSearch, 1 for LEAP. (Default: 0).
+
+        session (CompilationSession): Session whose warm Compiler is reused for the compilation. If None, one is started
+        for the whole call. (Default: None).
+
+        max_concurrent (int): For directories, the number of QASM files compiled at once in separate processes; circuits
+        are then yielded in the order they finish. (Default: 1).
+
+        max_workers (int): For directories compiled in parallel, the cap on the total number of BQSKit worker processes.
+        If None, the CPU count is used. (Default: None).
+
+        jsonl_path (str): Path of a JSON-Lines results log. Results already recorded in it are yielded first without
+        compiling, and each new result is appended as soon as it finishes. (Default: None).
+
+        block_size (int|str): Largest number of qubits per partition (2 to 4 are practical), or 'adaptive' to choose 2, 3
+        or 4 per circuit region from expected synthesis time against expected gate reduction. (Default: 3).
+
+        block_budget (float): Wall-clock seconds a partition block may spend in synthesis before it is cancelled and its
+        original sub-circuit kept. If None, blocks have no limit. (Default: None).
+
+        circuit_budget (float): Wall-clock seconds the block synthesis of one circuit may take in total; unfinished
+        blocks are then cancelled and keep their original sub-circuit. If None, there is no limit. (Default: None).
+
+        runtime_address (str|list): External BQSKit runtime that synthesizes the blocks if no session is given: 'host' or
+        'host:port' of a running runtime server, or a list of 'host:port' of bqskit-manager processes (see
+        CompilationSession). If None, a runtime is started on this machine. (Default: None).
+
+        memory_profile (bool): Record the peak Python memory (tracemalloc) and the sampled peak RSS of the BQSKit worker
+        processes of every compilation stage in each dictionary. Set it on the session instead if one is given.
+        (Default: False).
+
+    Yields one dictionary per circuit containing information about the circuit before/after optimization.
+    """
+    if memory_profile and session is not None and not session.memory_profile:
+        raise ValueError('memory_profile is set by the session when one is given. Use CompilationSession(memory_profile=True).')
+
+    # Connects one session to the external runtime (or one profiling memory) for the whole call
+    if session is None and (runtime_address is not None or memory_profile):
+        with CompilationSession(runtime_address=runtime_address, memory_profile=memory_profile) as session:
+            yield from iter_optimize(qc=qc, save_path=save_path, replace_filter=replace_filter,
+                                     success_threshold=success_threshold, partitioner=partitioner, pass_type=pass_type,
+                                     session=session, max_concurrent=max_concurrent, max_workers=max_workers,
+                                     jsonl_path=jsonl_path, block_size=block_size, block_budget=block_budget,
+                                     circuit_budget=circuit_budget)
+        return
+
+    if platform.system() == 'Windows' and save_path is not None:
+        save_path = save_path.replace('\\', '/')
+
+    # Checks the paths before compiling anything
+    if not os.path.exists(path=qc):
+        raise FileNotFoundError(f'The path {qc} does not exist.')
+    if isinstance(save_path,str) and not os.path.isdir(s=save_path):
+        raise FileNotFoundError(f'The path {save_path} is invalid.')
+
+    if os.path.isfile(path=qc) and qc.endswith('.qasm'):
+        yield from optimizeBQSkitFromFile(qc=qc,
+                                          save_path=save_path,
+                                          success_threshold=success_threshold,
+                                          partitioner=partitioner,
+                                          pass_type=pass_type,
+                                          replace_filter=replace_filter,
+                                          session=session,
+                                          jsonl_path=jsonl_path,
+                                          block_size=block_size,
+                                          block_budget=block_budget,
+                                          circuit_budget=circuit_budget)
+    elif os.path.isdir(s=qc):
+        for file, infoDict in iterOptimizeBQSkitFromDirectory(qc=qc,
+                                                              save_path=save_path,
+                                                              success_threshold=success_threshold,
+                                                              partitioner=partitioner,
+                                                              pass_type=pass_type,
+                                                              replace_filter=replace_filter,
+                                                              session=session,
+                                                              max_concurrent=max_concurrent,
+                                                              max_workers=max_workers,
+                                                              jsonl_path=jsonl_path,
+                                                              block_size=block_size,
+                                                              block_budget=block_budget,
+                                                              circuit_budget=circuit_budget):
+            yield infoDict
+
+
+def sweep(qc: str, success_threshold: float|list = 1e-8, partitioner: int|list = 0, pass_type: int|list = 0,
+    replace_filter: str|list = 'always', multistart: int|list = 2 ** 3, block_size: int|str|list = 3,
+    block_budget: float = None, circuit_budget: float = None, session: CompilationSession = None,
+    csv_path: str = None, runtime_address: str|list = None) -> pd.DataFrame:
+    """
+    Compile circuit(s) with every combination of a grid of BQSKit settings and collect the results in one table.
+
+    Each setting takes a single value or a list of values; the sweep runs their full product. Work is shared between
+    runs instead of repeating an optimizeBQSkit call per combination: every circuit is parsed and unfolded once and
+    partitioned once per partitioner and block size, and runs that only differ in the replace filter reuse the synthesized blocks
+    through the session's block cache (a memory-only cache is added for the sweep if the session has none). Compiled
+    circuits are not saved.
+
+    Parameters:
+        qc (str): Quantum circuit(s) to be optimized. Path to either a QASM file or folder.
+
+        success_threshold (float|list): The distance threshold(s) that determine successful termination. (Default: 1e-8).
+
+        partitioner (int|list): 0 for ScanPartitioner, 1 for QuickPartitioner. (Default: 0).
+
+        pass_type (int|list): 0 for QSearch, 1 for LEAP. (Default: 0).
+
+        replace_filter (str|list): Replace filter(s). Supports 'less-than', 'always', and 'less-than-multi'. (Default: always).
+
+        multistart (int|list): Number of starting points of each instantiation; None uses the instantiater default.
+        (Default: 8).
+
+        block_size (int|str|list): Largest number(s) of qubits per partition, or 'adaptive'. (Default: 3).
+
+        block_budget (float): Wall-clock seconds a partition block may spend in synthesis before it is cancelled and its
+        original sub-circuit kept. Applies to every combination. If None, blocks have no limit. (Default: None).
+
+        circuit_budget (float): Wall-clock seconds the block synthesis of one circuit may take in total; unfinished
+        blocks are then cancelled and keep their original sub-circuit. If None, there is no limit. (Default: None).
+
+        session (CompilationSession): Session whose warm Compiler is used for the whole sweep. If None, one is started
+        for the call. (Default: None).
+
+        csv_path (str): Path of a CSV file to also write the table to. (Default: None).
+
+        runtime_address (str|list): External BQSKit runtime that synthesizes the blocks if no session is given: 'host' or
+        'host:port' of a running runtime server, or a list of 'host:port' of bqskit-manager processes (see
+        CompilationSession). If None, a runtime is started on this machine. (Default: None).
+
+    Returns:
+        A DataFrame with one row per circuit and setting combination, in file order and then grid order, holding the same
+        columns as optimizeBQSkit.
+    """
+    if not os.path.exists(path=qc):
+        raise FileNotFoundError(f'The path {qc} does not exist.')
+    if os.path.isdir(s=qc):
+        files = sorted(str(file) for file in Path(qc).iterdir() if file.is_file() and file.name.endswith('qasm'))
+    elif qc.endswith('.qasm'):
+        files = [qc]
+    else:
+        raise FileNotFoundError(f'{qc} is not a valid path.')
+
+    settings = expandGrid({'success_threshold': success_threshold, 'partitioner': partitioner, 'pass_type': pass_type,
+                           'replace_filter': replace_filter, 'multistart': multistart, 'block_size': block_size})
+    rows = []
+    with _session_scope(session, runtime_address) as session:
+        for file, infoDicts in sweepFiles(files, settings, session, block_budget=block_budget,
+                                          circuit_budget=circuit_budget):
+            rows.extend(infoDicts)
+
+    table = pd.DataFrame(rows)
+    if csv_path is not None:
+        table.to_csv(csv_path, index=False)
+    return table
@@ -0,0 +1,13 @@
+"""
+Runtime server for a BQSKit runtime spread over several machines and shared by sersbench processes. Start bqskit-manager
+on every machine, then this server on one of them, and pass its address as runtime_address:
+
+    python -m sersbench.bqskit.runtime_server node1:7473 node2:7473 -p 7472
+
+BQSKit's own bqskit-server shuts down when the first client that received a result disconnects, so it can only serve a
+single session.
+"""
+from sersbench._internal import startRuntimeServer
+
+if __name__ == '__main__':
+    startRuntimeServer()
@@ -1,8 +1,9 @@
 from .analyze_partitions import partition_data
-from .compare_partitions import generate_comparison_stats, csv_string_comparison_stats
+from .compare_partitions import generate_comparison_stats, csv_string_comparison_stats, comparison_matrix
 from .distance_piecharts import create_distance_piecharts, create_distance_piecharts_and_csv_strings
 from .gate_fidelity import get_gate_fidelity
 from .partition_dist import get_unitary_distances, get_partition_distance_data
+from sersbench._internal import PartitionCache, UnitaryStore
 
 __all__ = [
   'partition_data',
@@ -12,5 +13,8 @@ __all__ = [
   'get_unitary_distances',
   'get_partition_distance_data',
   "csv_string_comparison_stats",
+  'comparison_matrix',
   'create_distance_piecharts_and_csv_strings',
+  'PartitionCache',
+  'UnitaryStore',
 ]
@@ -1,13 +1,11 @@
 import pandas as pd
 import glob
-from bqskit.ir import Circuit
-from bqskit.compiler import Compiler
-from bqskit.passes import QuickPartitioner
-from sersbench._internal import _count_large_gates
+from sersbench._internal import CompilationSession, circuitMetrics, _partitioned, _session_scope
 import os
 import platform
 
-def partition_data(circuit: str, csv_save_path: str = None, png_save_path: str = None):
+def partition_data(circuit: str, csv_save_path: str = None, png_save_path: str = None, runtime_address: str|list = None,
+                   session: CompilationSession = None):
     """
     Partition quantum circuits and extract partition statistics.
 
@@ -21,6 +19,11 @@ def partition_data(circuit: str, csv_save_path: str = None, png_save_path: str =
         circuit (str): Path to a single .qasm file or a directory containing .qasm files.
         csv_save_path (str, optional): Directory path to save CSV files.
         png_save_path (str, optional): Directory path to save bar plot PNG images.
+        runtime_address (str|list, optional): External BQSKit runtime used for partitioning, 'host:port' of a
+            runtime server or a list of 'host:port' of bqskit-manager processes. Defaults to a runtime on this machine.
+        session (CompilationSession, optional): Session whose partition cache and runtime are used, so circuits
+            partitioned by earlier calls with it are not partitioned again. Defaults to a temporary session on
+            runtime_address that uses the process-wide partition cache.
 
     Returns:
         list of pd.DataFrame: List of DataFrames with partition info per circuit.
@@ -35,17 +38,17 @@ def partition_data(circuit: str, csv_save_path: str = None, png_save_path: str =
         circuit = circuit.replace("\\", "/")
     circ_locs = glob.glob(f"{circuit}/*.qasm") if os.path.isdir(circuit) else [circuit]
     df_list = []
-    for circ_loc in circ_locs:
+    # Partitions every circuit on one runtime, or takes it from the partition cache
+    with _session_scope(session, runtime_address) as session:
+        parted_circuits = [_partitioned(circ_loc, session) for circ_loc in circ_locs]
+    for circ_loc, parted_circuit in zip(circ_locs, parted_circuits):
         circ_name = circ_loc.split(".")[0].split("/")[-1]
-        circ = Circuit.from_file(circ_loc)
-        workflow= [QuickPartitioner()]
-        with Compiler() as compiler: 
-            parted_circuit = compiler.compile(circ, workflow)
         data = []
         for i, partition in enumerate(parted_circuit):
             subcirc = partition.gate._circuit 
-            num_gates = _count_large_gates(subcirc)
-            depth = subcirc.depth
+            metrics = circuitMetrics(subcirc)
+            num_gates = metrics.multi_qudit_gates
+            depth = metrics.depth
             data_dict = {"circ_path": circ_loc, "partition_num": i, "cnot": num_gates, "depth": depth}  
             data.append(data_dict)
         df = pd.DataFrame(data)
@@ -1,84 +1,170 @@
 import pandas as pd
+import numpy as np
 import glob
+import os
 import platform
-from bqskit.ir.circuit import Circuit 
+from pathlib import Path
+from bqskit.ir.circuit import Circuit
 from sersbench._internal import (
-    _count_large_gates,
-    _chi2_distance,
-    _kl_divergence,
-    _padded_prob_dist,
+    CompilationSession,
+    _chi2_matrix,
+    _cnot_distribution,
+    _kl_matrix,
+    _padded_distributions,
+    _partitioned,
+    _session_scope,
+    circuitMetrics,
 )
 from io import StringIO
-from bqskit.ir.lang import get_language
 
+# Columns of the long-form table returned by generate_comparison_stats
+comparisonColumns = ["circuit", "compared_circuit's_name", "cnot_count", "depth", "chi_squared", "kl_divergence"]
 
-def generate_comparison_stats(path : str, save_path: str = None):
+
+def _cnot_distributions(circ_locs: list, session: CompilationSession) -> np.ndarray:
+    """
+    Zero-padded matrix of the CNOT-count distributions of circ_locs, one row per circuit.
+    """
+    return _padded_distributions([_cnot_distribution(_partitioned(circ_loc, session)) for circ_loc in circ_locs])
+
+def _comparison_table(circ_locs: list, names: list, session: CompilationSession) -> pd.DataFrame:
+    """
+    Long-form table with one row per ordered pair of different circuits, in the order of circ_locs. The CNOT count and
+    depth of every circuit are computed once, and the distances of all pairs are taken from _kl_matrix and _chi2_matrix.
+    """
+    if len(circ_locs) < 2:
+        return pd.DataFrame(columns=comparisonColumns)
+
+    metrics = [circuitMetrics(Circuit.from_file(circ_loc)) for circ_loc in circ_locs]
+    distributions = _cnot_distributions(circ_locs, session)
+    kl = _kl_matrix(distributions)
+    chi = _chi2_matrix(distributions)
+
+    # Every (circuit, compared circuit) pair except a circuit with itself, circuit by circuit
+    rows, cols = np.nonzero(~np.eye(len(circ_locs), dtype=bool))
+    names = np.asarray(names, dtype=object)
+    return pd.DataFrame({
+        "circuit": names[rows],
+        "compared_circuit's_name": names[cols],
+        "cnot_count": np.array([metric.multi_qudit_gates for metric in metrics])[cols],
+        "depth": np.array([metric.depth for metric in metrics])[cols],
+        "chi_squared": chi[rows, cols],
+        "kl_divergence": kl[rows, cols],
+    })
+
+def _circuit_view(table: pd.DataFrame, name: str) -> pd.DataFrame:
+    """
+    The rows of a comparison table that compare circuit name against the others, without the circuit column.
+    """
+    return table[table["circuit"] == name].drop(columns="circuit").reset_index(drop=True)
+
+def generate_comparison_stats(path : str, save_path: str = None, runtime_address: str|list = None,
+                              session: CompilationSession = None, table_path: str = None):
     """
     Generate statistical comparisons between quantum circuits.
 
-    Given a single QASM file or a directory of QASM files, this function compares 
-    each circuit against all others (excluding itself) by computing metrics such as 
-    CNOT count, circuit depth, Chi-squared distance, and KL divergence based on 
+    Given a single QASM file or a directory of QASM files, this function compares
+    each circuit against all others (excluding itself) by computing metrics such as
+    CNOT count, circuit depth, Chi-squared distance, and KL divergence based on
     their probability distributions.
 
-    Optionally saves comparison results as CSV files per circuit.
+    The CNOT count and depth of each circuit and its CNOT-count distribution are computed once. The distances of all
+    pairs come from comparison_matrix, which computes Chi-squared once per unordered pair. Optionally saves the
+    comparisons of each circuit as its own CSV file. These files are views of the returned table.
 
     Args:
         path (str): Path to a single .qasm file or a directory containing .qasm files.
-        save_path (str, optional): Directory path to save CSV files.
+        save_path (str, optional): Directory path to save one CSV file per circuit.
+        runtime_address (str|list, optional): External BQSKit runtime used for partitioning, 'host:port' of a
+            runtime server or a list of 'host:port' of bqskit-manager processes. Defaults to a runtime on this machine.
+        session (CompilationSession, optional): Session whose partition cache and runtime are used, so circuits
+            partitioned by earlier calls with it are not partitioned again. Defaults to a temporary session on
+            runtime_address that uses the process-wide partition cache.
+        table_path (str, optional): File to save the whole table to, as Parquet if it ends with .parquet (requires
+            pyarrow or fastparquet) and as CSV otherwise.
 
     Returns:
-        list of pd.DataFrame: List of DataFrames containing comparison statistics.
+        pd.DataFrame: Long-form table with one row per ordered pair of different circuits and the columns circuit,
+            compared_circuit's_name, and the cnot_count and depth of the compared circuit, chi_squared and kl_divergence.
     """
-    
-    df_list = []
-    
     if platform.system() == "Windows":
         path = path.replace("\\", "/")
         if save_path is not None:
             save_path = save_path.replace("\\", "/")
-    
+
     circ_locs = ""
     if path.__contains__(".qasm"):
         circ_locs = [path]
     else:
         circ_locs = glob.glob(path + "/*.qasm")
-    data = []
-    for i, circ_loc in enumerate(circ_locs):
-        circ_name = circ_loc.split(".")[0].split("/")[-1]
-        for j, othercirc_loc in enumerate(circ_locs): 
-            if i == j:
-               continue 
-            else:
-                othercirc_name = othercirc_loc.split(".")[0].split("/")[-1]
-                othercirc = Circuit.from_file(othercirc_loc)
-                depth = othercirc.depth
-                cnot_count = _count_large_gates(othercirc)
-                array1, array2 = _padded_prob_dist(circ_loc, othercirc_loc)
-                kl = _kl_divergence(array1, array2)
-                chi = _chi2_distance(array1, array2) 
-                data_dict = {
-                    "compared_circuit's_name": othercirc_name,
-                    "cnot_count": cnot_count,
-                    "depth": depth,
-                    "chi_squared": chi, 
-                    "kl_divergence": kl 
-                    }
-                data.append(data_dict)
-        df = pd.DataFrame(data)
-        if save_path is not None:
-            df.to_csv(save_path + "/" + circ_name + ".csv")
-            
-    return df_list
+    names = [Path(circ_loc).stem for circ_loc in circ_locs]
+
+    with _session_scope(session, runtime_address) as session:
+        table = _comparison_table(circ_locs, names, session)
 
-def csv_string_comparison_stats(circ_files: list, names: list):
+    if table_path is not None:
+        if table_path.endswith(".parquet"):
+            table.to_parquet(table_path, index=False)
+        else:
+            table.to_csv(table_path, index=False)
+
+    if save_path is not None:
+        for name in names:
+            _circuit_view(table, name).to_csv(os.path.join(save_path, name + ".csv"))
+
+    return table
+
+def comparison_matrix(path: str, runtime_address: str|list = None, session: CompilationSession = None):
+    """
+    Compute the KL divergence and Chi-squared distance between every pair of circuits at once.
+
+    Each circuit is partitioned once and its distribution of CNOT counts per partition is built once. The
+    distributions are stacked into one zero-padded matrix, and both N x N matrices are computed from it with NumPy
+    broadcasting. Chi-squared is symmetric, so each unordered pair is computed once. KL divergence is not symmetric,
+    so it is computed for every ordered pair. Its smoothing pads every distribution to the longest one, so it can
+    differ from a single pair's _kl_divergence by about 1e-9.
+
+    Args:
+        path (str): Path to a single .qasm file or a directory containing .qasm files.
+        runtime_address (str|list, optional): External BQSKit runtime used for partitioning, 'host:port' of a
+            runtime server or a list of 'host:port' of bqskit-manager processes. Defaults to a runtime on this machine.
+        session (CompilationSession, optional): Session whose partition cache and runtime are used, so circuits
+            partitioned by earlier calls with it are not partitioned again. Defaults to a temporary session on
+            runtime_address that uses the process-wide partition cache.
+
+    Returns:
+        tuple of pd.DataFrame: The KL divergence and Chi-squared matrices, indexed and labelled by circuit name.
+        Entry [a, b] compares circuit a against circuit b.
+    """
+    if platform.system() == "Windows":
+        path = path.replace("\\", "/")
+
+    circ_locs = [path] if path.__contains__(".qasm") else glob.glob(path + "/*.qasm")
+    names = [Path(circ_loc).stem for circ_loc in circ_locs]
+    if not circ_locs:
+        empty = pd.DataFrame(dtype=float)
+        return empty, empty.copy()
+
+    with _session_scope(session, runtime_address) as session:
+        distributions = _cnot_distributions(circ_locs, session)
+
+    kl = pd.DataFrame(_kl_matrix(distributions), index=names, columns=names)
+    chi = pd.DataFrame(_chi2_matrix(distributions), index=names, columns=names)
+    return kl, chi
+
+def csv_string_comparison_stats(circ_files: list, names: list, runtime_address: str|list = None,
+                                session: CompilationSession = None):
     """
     Generate comparison statistics between circuits and return as multiple CSV strings.
-    
+
+    The strings are views of the table generate_comparison_stats computes, so every circuit and pair is processed once.
+
     Args:
         circ_files: List of circuit file paths
         names: List of circuit names corresponding to circ_files
-    
+        runtime_address: External BQSKit runtime used for partitioning, as in generate_comparison_stats
+        session: Session whose partition cache and runtime are used, as in generate_comparison_stats
+
     Returns:
         dict: Dictionary where keys are circuit names and values are CSV strings
               Each CSV contains comparisons of that circuit against all others
@@ -86,43 +172,18 @@ def csv_string_comparison_stats(circ_files: list, names: list):
     # Handle Windows path separators
     if platform.system() == "Windows":
         circ_files = [path.replace("\\", "/") for path in circ_files]
-    
+
+    with _session_scope(session, runtime_address) as session:
+        table = _comparison_table(circ_files, names, session)
+
     csv_results = {}
-    
-    for i, circ_loc in enumerate(circ_files):
-        data = []
-        circ_name = names[i]
-        
-        for j, othercirc_loc in enumerate(circ_files): 
-            if i == j:
-                continue 
-            else:
-                othercirc_name = names[j]
-                lang = get_language("qasm")
-                with open(othercirc_loc, "r") as f:
-                    qasm_str = f.read()
-                othercirc = lang.decode(qasm_str)
-                depth = othercirc.depth
-                cnot_count = _count_large_gates(othercirc)
-                array1, array2 = _padded_prob_dist(circ_loc, othercirc_loc)
-                kl = _kl_divergence(array1, array2)
-                chi = _chi2_distance(array1, array2) 
-                data_dict = {
-                    "circ_name": othercirc_name,
-                    "cnot_count": cnot_count,
-                    "depth": depth,
-                    "chi_squared": chi, 
-                    "kl_divergence": kl 
-                }
-                data.append(data_dict)
-        
+    for circ_name in names:
         # Create DataFrame and convert to CSV string
-        df = pd.DataFrame(data)
+        df = _circuit_view(table, circ_name).rename(columns={"compared_circuit's_name": "circ_name"})
         csv_buffer = StringIO()
         df.to_csv(csv_buffer, index=False)
-        csv_string = csv_buffer.getvalue()
-        
+
         # Store the CSV string with circuit name as key
-        csv_results[circ_name] = csv_string
-    
-    return csv_results
\ No newline at end of file
+        csv_results[circ_name] = csv_buffer.getvalue()
+
+    return csv_results
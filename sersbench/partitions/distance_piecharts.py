@@ -1,7 +1,6 @@
 from .partition_dist import get_unitary_distances
-from sersbench._internal import _analyzeDistances
+from sersbench._internal import _analyzeDistances, CompilationSession, _session_scope
 import glob
-from bqskit.ir import Circuit
 import pandas as pd
 import matplotlib.pyplot as plt
 from pathlib import Path
@@ -11,7 +10,8 @@ import base64
 from io import BytesIO
 
 
-def create_distance_piecharts(path: str, save_path: str = None):
+def create_distance_piecharts(path: str, save_path: str = None, runtime_address: str|list = None,
+                              session: CompilationSession = None):
     """
     Analyze partition distances between all pairs of quantum circuits and generate pie charts.
 
@@ -25,6 +25,11 @@ def create_distance_piecharts(path: str, save_path: str = None):
     Args:
         path (str): Directory path containing .qasm circuit files.
         save_path (str, optional): Directory to save CSV and PNG files. Defaults to current directory.
+        runtime_address (str|list, optional): External BQSKit runtime used for partitioning, 'host:port' of a
+            runtime server or a list of 'host:port' of bqskit-manager processes. Defaults to a runtime on this machine.
+        session (CompilationSession, optional): Session whose partition cache, unitary store and runtime are used, so
+            circuits partitioned and partition unitaries computed by earlier calls with it are not computed again.
+            Defaults to a temporary session on runtime_address that uses the process-wide cache and store.
 
     Returns:
         None
@@ -37,27 +42,27 @@ def create_distance_piecharts(path: str, save_path: str = None):
     circ_locs = glob.glob(f'{path}/*.qasm')
     data_total = []
     
-    for circ_loc01 in circ_locs:
-        for circ_loc02 in circ_locs:
-            circ_1 = Circuit.from_file(circ_loc01)
-            circ_2 = Circuit.from_file(circ_loc02)
-            data = get_unitary_distances(circ_1, circ_2)
+    # Every circuit is partitioned and its partition unitaries computed once, however many pairs it is part of
+    with _session_scope(session, runtime_address) as session:
+        for circ_loc01 in circ_locs:
+            for circ_loc02 in circ_locs:
+                data = get_unitary_distances(circ_loc01, circ_loc02, session=session)
             
-            min_vals, max_vals, avg_vals = _analyzeDistances(data)
+                min_vals, max_vals, avg_vals = _analyzeDistances(data)
             
-            circ01_name = Path(circ_loc01).stem
-            circ02_name = Path(circ_loc02).stem
+                circ01_name = Path(circ_loc01).stem
+                circ02_name = Path(circ_loc02).stem
             
-            for x in range(len(min_vals)):
-                circ1_str = f"{circ01_name}_{x}"
-                temp_dict = {
-                    "circ1_name_partition": circ1_str,
-                    "circ2_name": circ02_name,
-                    "max": max_vals[x],
-                    "min": min_vals[x],
-                    "avg": avg_vals[x]
-                }
-                data_total.append(temp_dict)
+                for x in range(len(min_vals)):
+                    circ1_str = f"{circ01_name}_{x}"
+                    temp_dict = {
+                        "circ1_name_partition": circ1_str,
+                        "circ2_name": circ02_name,
+                        "max": max_vals[x],
+                        "min": min_vals[x],
+                        "avg": avg_vals[x]
+                    }
+                    data_total.append(temp_dict)
     
     df = pd.DataFrame(data_total)
     print(df)
@@ -117,7 +122,8 @@ def create_distance_piecharts(path: str, save_path: str = None):
                 plt.close()
 
 
-def create_distance_piecharts_and_csv_strings(path: str, save_path: str = None):
+def create_distance_piecharts_and_csv_strings(path: str, save_path: str = None, runtime_address: str|list = None,
+                                              session: CompilationSession = None):
     """
     Analyze partition distances between all pairs of quantum circuits and generate pie charts.
 
@@ -128,6 +134,11 @@ def create_distance_piecharts_and_csv_strings(path: str, save_path: str = None):
     Args:
         path (str): Directory path containing .qasm circuit files.
         save_path (str, optional): Not used anymore, kept for compatibility.
+        runtime_address (str|list, optional): External BQSKit runtime used for partitioning, 'host:port' of a
+            runtime server or a list of 'host:port' of bqskit-manager processes. Defaults to a runtime on this machine.
+        session (CompilationSession, optional): Session whose partition cache, unitary store and runtime are used, so
+            circuits partitioned and partition unitaries computed by earlier calls with it are not computed again.
+            Defaults to a temporary session on runtime_address that uses the process-wide cache and store.
 
     Returns:
         dict: Dictionary containing:
@@ -137,31 +148,31 @@ def create_distance_piecharts_and_csv_strings(path: str, save_path: str = None):
     circ_locs = glob.glob(f'{path}/*.qasm')
     data_total = []
     
-    for circ_loc01 in circ_locs:
-        for circ_loc02 in circ_locs:
-            # Skip comparing a circuit against itself
-            if circ_loc01 == circ_loc02:
-                continue
+    # Every circuit is partitioned and its partition unitaries computed once, however many pairs it is part of
+    with _session_scope(session, runtime_address) as session:
+        for circ_loc01 in circ_locs:
+            for circ_loc02 in circ_locs:
+                # Skip comparing a circuit against itself
+                if circ_loc01 == circ_loc02:
+                    continue
                 
-            circ_1 = Circuit.from_file(circ_loc01)
-            circ_2 = Circuit.from_file(circ_loc02)
-            data = get_unitary_distances(circ_1, circ_2)
+                data = get_unitary_distances(circ_loc01, circ_loc02, session=session)
             
-            min_vals, max_vals, avg_vals = _analyzeDistances(data)
+                min_vals, max_vals, avg_vals = _analyzeDistances(data)
             
-            circ01_name = Path(circ_loc01).stem
-            circ02_name = Path(circ_loc02).stem
+                circ01_name = Path(circ_loc01).stem
+                circ02_name = Path(circ_loc02).stem
             
-            for x in range(len(min_vals)):
-                circ1_str = f"{circ01_name}_{x}"
-                temp_dict = {
-                    "circ1_name_partition": circ1_str,
-                    "circ2_name": circ02_name,
-                    "max": max_vals[x],
-                    "min": min_vals[x],
-                    "avg": avg_vals[x]
-                }
-                data_total.append(temp_dict)
+                for x in range(len(min_vals)):
+                    circ1_str = f"{circ01_name}_{x}"
+                    temp_dict = {
+                        "circ1_name_partition": circ1_str,
+                        "circ2_name": circ02_name,
+                        "max": max_vals[x],
+                        "min": min_vals[x],
+                        "avg": avg_vals[x]
+                    }
+                    data_total.append(temp_dict)
     
     df = pd.DataFrame(data_total)
     
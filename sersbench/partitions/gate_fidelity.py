@@ -1,16 +1,21 @@
 import numpy as np
-from bqskit.ir.circuit import Circuit 
+from bqskit.ir.circuit import Circuit
+from sersbench._internal import CompilationSession, processUnitaryStore
 
-def get_gate_fidelity(subcirc1: Circuit, subcirc2: Circuit):
+def get_gate_fidelity(subcirc1: Circuit, subcirc2: Circuit, session: CompilationSession = None):
     """
     Compute the gate fidelity between two quantum circuit subcircuits.
 
     Calculates fidelity based on their unitary matrices. Raises an error if
-    unitary dimensions differ.
+    unitary dimensions differ. The unitaries are taken from the session's unitary
+    store by circuit object, so a subcircuit compared several times has its unitary
+    computed once. A subcircuit must not be modified between comparisons.
 
     Args:
         subcirc1 (Circuit): First quantum circuit subcircuit.
         subcirc2 (Circuit): Second quantum circuit subcircuit.
+        session (CompilationSession, optional): Session whose unitary store the unitaries are taken from and added
+            to. No runtime is started. Defaults to the process-wide unitary store.
 
     Returns:
         float: The computed gate fidelity between the two circuits.
@@ -18,13 +23,15 @@ def get_gate_fidelity(subcirc1: Circuit, subcirc2: Circuit):
     Raises:
         ValueError: If the unitary matrices have different dimensions.
     """
-    unitary1 = subcirc1.get_unitary()
-    unitary2 = subcirc2.get_unitary()
-  
-    if unitary1.dim != unitary2.dim:
+    store = processUnitaryStore if session is None else session.unitary_store
+    unitary1 = store.circuit_unitary(subcirc1)
+    unitary2 = store.circuit_unitary(subcirc2)
+
+    if unitary1.shape != unitary2.shape:
         raise ValueError('Unitary matrices have different dimensions')
     else:
-        op1 = np.trace(unitary1.getH(), unitary1) + abs(np.trace(unitary2.getH(), unitary1))**2
-        n = unitary1.dim
+        # (Tr(U1^dagger U1) + |Tr(U2^dagger U1)|^2) / (n (n + 1)); both traces are sums of elementwise products
+        op1 = np.vdot(unitary1, unitary1).real + abs(np.vdot(unitary2, unitary1))**2
+        n = len(unitary1)
         fidelity = op1 / (n * (n + 1))
-    return fidelity
+    return float(fidelity)
@@ -1,46 +1,42 @@
 from bqskit.ir import Circuit                 
 import glob
 from sersbench._internal import _analyzeDistances
-from bqskit.passes import QuickPartitioner
-from bqskit.compiler import Compiler
+from sersbench._internal import CompilationSession, _hs_distance_matrix, _partition_unitaries, _session_scope
 
-def get_unitary_distances(circ1: Circuit, circ2: Circuit):
+def get_unitary_distances(circ1: Circuit|str, circ2: Circuit|str, runtime_address: str|list = None,
+                          session: CompilationSession = None):
     """
     Compute pairwise unitary distances between partitions of two quantum circuits.
 
     Partitions each circuit using QuickPartitioner, then calculates the distance 
     between every partition pair. If partitions differ in dimension, distance=1.0.
+    Each partition's unitary is computed once per unitary store and reused by later
+    calls, and the distances of all pairs are computed together by a batched
+    Hilbert-Schmidt kernel.
 
     Args:
-        circ1 (Circuit): First quantum circuit.
-        circ2 (Circuit): Second quantum circuit.
+        circ1 (Circuit|str): First quantum circuit, or the path to its QASM file.
+        circ2 (Circuit|str): Second quantum circuit, or the path to its QASM file.
+        runtime_address (str|list, optional): External BQSKit runtime used for partitioning, 'host:port' of a
+            runtime server or a list of 'host:port' of bqskit-manager processes. Defaults to a runtime on this machine.
+        session (CompilationSession, optional): Session whose partition cache, unitary store and runtime are used, so
+            circuits partitioned and partition unitaries computed by earlier calls with it are not computed again.
+            Defaults to a temporary session on runtime_address that uses the process-wide cache and store.
 
     Returns:
         list of list of float: Nested list where each inner list contains distances 
         from one partition of circ1 to all partitions of circ2.
     """
-    workflow = [QuickPartitioner()]
-    with Compiler() as compiler:
-        parted_circuit1 = compiler.compile(circ1, workflow)
-        parted_circuit2 = compiler.compile(circ2, workflow)
-    
-    data = []
+    with _session_scope(session, runtime_address) as session:
+        unitaries1 = _partition_unitaries(circ1, session)
+        unitaries2 = _partition_unitaries(circ2, session)
 
-    for part1 in parted_circuit1:
-        distances = []
-        for part2 in parted_circuit2:
-            if part1.dim != part2.dim:
-                distances.append(1.0)
-                continue
-            distance = part1.get_unitary().get_distance_from(part2.get_unitary())
-            distances.append(distance)
-        
-        data.append(distances)
+    data = _hs_distance_matrix(unitaries1, unitaries2).tolist()
 
     return data
 
 
-def get_partition_distance_data(path: str):
+def get_partition_distance_data(path: str, runtime_address: str|list = None, session: CompilationSession = None):
     """
     Compute partition distance statistics for all unique circuit pairs in a directory.
 
@@ -50,6 +46,11 @@ def get_partition_distance_data(path: str):
 
     Args:
         path (str): Directory containing .qasm circuit files.
+        runtime_address (str|list, optional): External BQSKit runtime used for partitioning, 'host:port' of a
+            runtime server or a list of 'host:port' of bqskit-manager processes. Defaults to a runtime on this machine.
+        session (CompilationSession, optional): Session whose partition cache, unitary store and runtime are used, so
+            circuits partitioned and partition unitaries computed by earlier calls with it are not computed again.
+            Defaults to a temporary session on runtime_address that uses the process-wide cache and store.
 
     Returns:
         list of dict: Each dict represents a circuit pair comparison with:
@@ -61,32 +62,32 @@ def get_partition_distance_data(path: str):
     circ_locs = glob.glob(f'{path}/*.qasm')
     results = []
     print(circ_locs)
-    for i in range(len(circ_locs)):
-        for j in range(i+1, len(circ_locs)):
-            circ_loc1 = circ_locs[i]
-            circ_loc2 = circ_locs[j]
+    # Every circuit is partitioned and its partition unitaries computed once, however many pairs it is part of
+    with _session_scope(session, runtime_address) as session:
+        for i in range(len(circ_locs)):
+            for j in range(i+1, len(circ_locs)):
+                circ_loc1 = circ_locs[i]
+                circ_loc2 = circ_locs[j]
             
-            circ_1 = Circuit.from_file(circ_loc1)
-            circ_2 = Circuit.from_file(circ_loc2)
-            data = get_unitary_distances(circ_1, circ_2)
+                data = get_unitary_distances(circ_loc1, circ_loc2, session=session)
 
-            min_vals, max_vals, avg_vals = _analyzeDistances(data)
-        
-            comparison_result = {
-                'circuit1': circ_loc1,
-                'circuit2': circ_loc2,
-                'partitions': []
-            }
+                min_vals, max_vals, avg_vals = _analyzeDistances(data)
         
-            for k in range(len(min_vals)):
-                partition_data = {
-                    'partition_id': k,
-                    'min_distance': min_vals[k],
-                    'max_distance': max_vals[k],
-                    'avg_distance': avg_vals[k]
+                comparison_result = {
+                    'circuit1': circ_loc1,
+                    'circuit2': circ_loc2,
+                    'partitions': []
                 }
-                comparison_result['partitions'].append(partition_data)
+        
+                for k in range(len(min_vals)):
+                    partition_data = {
+                        'partition_id': k,
+                        'min_distance': min_vals[k],
+                        'max_distance': max_vals[k],
+                        'avg_distance': avg_vals[k]
+                    }
+                    comparison_result['partitions'].append(partition_data)
             
-            results.append(comparison_result)
+                results.append(comparison_result)
 
     return results
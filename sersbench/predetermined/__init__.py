@@ -1,5 +1,7 @@
 from .predetermined_workflows import predeterminedCompilation
+from .qiskit_baseline import qiskitBaseline
 
 __all__ = [
-  'predeterminedCompilation'
+  'predeterminedCompilation',
+  'qiskitBaseline'
 ]
\ No newline at end of file
@@ -1,6 +1,6 @@
 import json
 import os
-from sersbench._internal import optimizations
+from sersbench._internal import optimizations, OptimizationConfig, CompilationSession, _session_scope, compileFilesInParallel, ResultsLog, memorySummary
 from pathlib import Path
 from sersbench.create_circuits import (construct_bqskit_circSU2, 
                                                               construct_bqskit_dtc_unitary, 
@@ -16,7 +16,10 @@ import random
 import platform
 
 def predeterminedCompilation(qc: str = None, save_path: str = None, success_threshold: float = 1e-8, replace_filter: str = 'always', 
-    partitioner: int = 0, json_path: str = None, generate_circuit: bool = False, generate_circuit_num_qubits: int = 10, generated_circuit_save_path: str = None):
+    partitioner: int = 0, json_path: str = None, generate_circuit: bool = False, generate_circuit_num_qubits: int = 10, generated_circuit_save_path: str = None,
+    session: CompilationSession = None, max_concurrent: int = 1, max_workers: int = None, jsonl_path: str = None,
+    block_size: int|str = 3, block_budget: float = None, circuit_budget: float = None, overlap_qiskit: bool = True,
+    runtime_address: str|list = None, memory_profile: bool = False):
     
     """
     Optimizes a function using QSearch, Leap, and Qiskit transpilation with optimization level 3.
@@ -43,10 +46,79 @@ def predeterminedCompilation(qc: str = None, save_path: str = None, success_thre
         
         generated_circuit_save_path (str): Path to save the randomly generated circuit to. (Default: None)
 
+        session (CompilationSession): Session whose warm Compiler is reused for every pass and file. If None, one session
+         is started for the call (shared by all files of a directory) and closed afterwards. In parallel mode only its
+         on-disk block cache and external runtime are shared. (Default: None)
+
+        max_concurrent (int): For directories, the number of QASM files compiled at once in separate processes. 1 compiles
+         them one after another; None chooses the number from the CPU count and available memory. (Default: 1)
+
+        max_workers (int): For directories compiled in parallel, the cap on the total number of BQSKit worker processes,
+         split evenly between the concurrent compilations. If None, the CPU count is used. (Default: None)
+
+        jsonl_path (str): Path of a JSON-Lines results log used as a checkpoint for QASM inputs. Each circuit's results are
+         appended as soon as it finishes; on a later call with the same log, files whose contents and settings are
+         already recorded are not compiled again and their recorded results are returned. For directories they are
+         returned as a LoggedResults that reads each circuit's results from the log when iterated (call list() on it to
+         load them all), and are streamed to the JSON file. (Default: None)
+
+        block_size (int|str): Largest number of qubits per partition of the BQSKit passes, or 'adaptive' to choose 2, 3
+         or 4 per circuit region from expected synthesis time against expected gate reduction. (Default: 3)
+
+        block_budget (float): Wall-clock seconds a partition block may spend in synthesis before it is cancelled and its
+         original sub-circuit kept. If None, blocks have no limit. (Default: None)
+
+        circuit_budget (float): Wall-clock seconds the block synthesis of one circuit may take per BQSKit pass;
+         unfinished blocks are then cancelled and keep their original sub-circuit. If None, there is no limit. (Default: None)
+
+        overlap_qiskit (bool): Run the Qiskit baseline in a separate worker process while the BQSKit passes run. If False,
+         it runs in this process before them. Its compilation time is the worker's CPU time of the transpile with overlap,
+         so sharing the cores with synthesis does not inflate it, and the wall time of the transpile without. Always
+         False for directories compiled in parallel, whose processes transpile in place instead of starting one more
+         worker each. Part of the settings a jsonl_path log is keyed by. (Default: True)
+
+        runtime_address (str|list): External BQSKit runtime that synthesizes the blocks if no session is given: 'host' or
+         'host:port' of a running runtime server, or a list of 'host:port' of bqskit-manager processes (see
+         CompilationSession). In parallel mode every process connects to it. If None, a runtime is started on this
+         machine. (Default: None)
+
+        memory_profile (bool): Record the peak Python memory (tracemalloc) and the sampled peak RSS of the BQSKit worker
+         processes of every compilation stage in the BQSKit dictionaries. A directory saved to json_path also gets the
+         memorySummary of its circuits. Set it on the session instead if one is given. (Default: False)
+
     Returns:
         If one circuit is compiled, returns a list of dictionaries containing information about the optimization process. If multiple
-        circuits are compiled, returns a list of lists of dictionaries containing information about the optimiztaion process.
+        circuits are compiled, returns a list of lists of dictionaries containing information about the optimiztaion process,
+        or with jsonl_path a LoggedResults yielding those lists.
     """
+    if memory_profile and session is not None and not session.memory_profile:
+        raise ValueError('memory_profile is set by the session when one is given. Use CompilationSession(memory_profile=True).')
+
+    # Connects one session to the external runtime (or one profiling memory) for the whole call
+    if session is None and (runtime_address is not None or memory_profile):
+        with CompilationSession(runtime_address=runtime_address, memory_profile=memory_profile) as session:
+            return predeterminedCompilation(qc=qc, save_path=save_path, success_threshold=success_threshold,
+                                            replace_filter=replace_filter, partitioner=partitioner, json_path=json_path,
+                                            generate_circuit=generate_circuit,
+                                            generate_circuit_num_qubits=generate_circuit_num_qubits,
+                                            generated_circuit_save_path=generated_circuit_save_path, session=session,
+                                            max_concurrent=max_concurrent, max_workers=max_workers,
+                                            jsonl_path=jsonl_path, block_size=block_size, block_budget=block_budget,
+                                            circuit_budget=circuit_budget, overlap_qiskit=overlap_qiskit)
+
+    # Each process of a parallel run would start a baseline worker on top of its share of the BQSKit workers and count
+    # its CPU time as its own, so the baseline runs in the compiling process instead
+    if max_concurrent != 1 and isinstance(qc, str) and os.path.isdir(qc) and not generate_circuit:
+        overlap_qiskit = False
+
+    # Log used to checkpoint and resume compilations of QASM files
+    results_log = None
+    if jsonl_path is not None:
+        results_log = ResultsLog(jsonl_path, {'function': 'predeterminedCompilation', 'replace_filter': replace_filter,
+                                              'success_threshold': success_threshold, 'partitioner': partitioner,
+                                              'block_size': block_size, 'block_budget': block_budget,
+                                              'circuit_budget': circuit_budget, 'overlap_qiskit': overlap_qiskit})
+
     if platform.system() == 'Windows' and save_path is not None:
         save_path = save_path.replace('\\', '/')
     if isinstance(qc, str) and not os.path.isdir(qc) and not qc.endswith('.qasm'):
@@ -55,6 +127,11 @@ def predeterminedCompilation(qc: str = None, save_path: str = None, success_thre
         raise FileNotFoundError(f'{save_path} is not a valid path.')
     if isinstance(json_path,str) and not os.path.isdir(json_path):
         raise FileNotFoundError(f'{save_path} is not a valid path.')
+
+    # Settings shared by every circuit of this call
+    config = OptimizationConfig(replace_filter=replace_filter, success_threshold=success_threshold, partitioner=partitioner,
+                                save_path=save_path, block_size=block_size, block_budget=block_budget,
+                                circuit_budget=circuit_budget, overlap_qiskit=overlap_qiskit)
     # Runs if generate_circuit is true and there is no value in qc.
     # Ranomly generates a quantum circuit instead of taking an input from qc.
     if generate_circuit and qc == None:
@@ -83,12 +160,10 @@ def predeterminedCompilation(qc: str = None, save_path: str = None, success_thre
         
         # Starts the optimization process using the inputted parameters
         circuitData = optimizations(qc=circuit[0],
-                                    save_path=save_path,
-                                    success_threshold=success_threshold,
-                                    replace_filter=replace_filter,
-                                    partitioner=partitioner,
+                                    config=config,
                                     generate_circuit=generate_circuit,
-                                    circuit_name=circuit[1])
+                                    circuit_name=circuit[1],
+                                    session=session)
         
         # Saves data as a json if a valid json save path is entered
         if isinstance(json_path, str) and os.path.isdir(json_path):
@@ -102,13 +177,17 @@ def predeterminedCompilation(qc: str = None, save_path: str = None, success_thre
         
     # Runs if qc is a file and generate_circuit is false
     elif qc.endswith('.qasm') and not generate_circuit:
-        # Starts the optimization process with the inputted parameters
-        circuitData = optimizations(qc=qc,
-                                    save_path=save_path,
-                                    success_threshold=success_threshold,
-                                    replace_filter=replace_filter,
-                                    partitioner=partitioner
-                                    )
+        # Reuses the logged results if this file was already compiled with these settings
+        if results_log is not None and results_log.completed(qc):
+            circuitData = results_log.results([qc])[0]
+        else:
+            # Starts the optimization process with the inputted parameters
+            circuitData = optimizations(qc=qc,
+                                        config=config,
+                                        session=session
+                                        )
+            if results_log is not None:
+                results_log.append(qc, circuitData)
         
         # Saves data as a json if a valid json save path is entered
         if isinstance(json_path, str) and os.path.isdir(json_path):
@@ -131,31 +210,83 @@ def predeterminedCompilation(qc: str = None, save_path: str = None, success_thre
         # List to store the data returned by the circuits
         circuitsData = []
         i = 0
-        # Iterates over the files
-        for file in files:
-            # Starts optimization process if the file is a QASM file
-            print(f'{file} is compiling')
-            if file.endswith('qasm'):
-                circuitData = optimizations(qc=file,
-                                             save_path=save_path,
-                                             success_threshold=success_threshold,
-                                             replace_filter=replace_filter,
-                                             partitioner=partitioner)
-                # Adds the data of an optimized circuit to the list that stores the data
-            circuitsData.append(circuitData)
-            i += 1
-            print(f'{file} has finished compiling. {len(files)-i}/{len(files)} left.')
+
+        # Skips files whose results are already logged
+        qasm_files = [file for file in files if file.endswith('qasm')]
+        pending_files = qasm_files
+        if results_log is not None:
+            pending_files = [file for file in qasm_files if not results_log.completed(file)]
+
+        # Compiles several files at once, each in its own process and session. Results keep the order of the files and
+        # every row records the wall and CPU time spent on its circuit
+        if max_concurrent != 1:
+            kwargs = {'config': config}
+
+            def addTimes(circuitData, wallTime, cpuTime):
+                for infoDict in circuitData:
+                    infoDict['Wall Time (seconds)'] = wallTime
+                    infoDict['CPU Time (seconds)'] = cpuTime
+                return circuitData
+
+            if results_log is not None:
+                # Logs each circuit as soon as it finishes
+                def logResult(file, circuitData, wallTime, cpuTime):
+                    results_log.append(file, addTimes(circuitData, wallTime, cpuTime))
+
+                compileFilesInParallel(optimizations, pending_files, kwargs, max_concurrent=max_concurrent,
+                                       max_workers=max_workers, session=session, on_result=logResult)
+            else:
+                results = compileFilesInParallel(optimizations, pending_files, kwargs, max_concurrent=max_concurrent,
+                                                 max_workers=max_workers, session=session)
+                for circuitData, wallTime, cpuTime in results:
+                    circuitsData.append(addTimes(circuitData, wallTime, cpuTime))
+        # Iterates over the files, sharing one session (and its worker pool) between all of them
+        else:
+            with _session_scope(session) as active_session:
+                for file in files:
+                    # Skips files already in the log
+                    if results_log is not None and file in qasm_files and file not in pending_files:
+                        i += 1
+                        print(f'{file} was already compiled. {len(files)-i}/{len(files)} left.')
+                        continue
+                    # Starts optimization process if the file is a QASM file
+                    print(f'{file} is compiling')
+                    if file.endswith('qasm'):
+                        circuitData = optimizations(qc=file,
+                                                     config=config,
+                                                     session=active_session)
+                        # Adds the data of an optimized circuit to the log, or to the list that stores the data
+                        if results_log is not None:
+                            results_log.append(file, circuitData)
+                    if results_log is None:
+                        circuitsData.append(circuitData)
+                    i += 1
+                    print(f'{file} has finished compiling. {len(files)-i}/{len(files)} left.')
+
+        # The data of every circuit of the directory (including ones from earlier runs) is read back from the log
+        # when iterated, so the directory is never held in memory
+        if results_log is not None:
+            circuitsData = results_log.view(qasm_files)
+
         # If there is a valid path to save a JSON to, saves data as a JSON
         if isinstance(json_path,str) and os.path.isdir(json_path):
             index = qc.rfind('/')
             qc_name = qc[index+1:]
             
-            # I lowk dont know what this does but it works
-            flat_list = [item for sublist in circuitsData for item in sublist]
-            # Saves file as a json 
+            # Saves file as a json. Logged results are streamed from the log one record at a time
             file_name = f'{json_path}/{qc_name}_optimized.json'
             with open(file_name, 'w') as json_file:
-                json.dump(flat_list, json_file)
+                if results_log is not None:
+                    circuitsData.dump(json_file)
+                else:
+                    # I lowk dont know what this does but it works
+                    flat_list = [item for sublist in circuitsData for item in sublist]
+                    json.dump(flat_list, json_file)
+
+            # Saves the peak memory of the directory's compilations next to them
+            if session is not None and session.memory_profile:
+                with open(f'{json_path}/{qc_name}_memory_summary.json', 'w') as json_file:
+                    json.dump(memorySummary(item for sublist in circuitsData for item in sublist), json_file)
         # If the data is not saved as a JSON, returns data as a list of lists of dictionaries
         else:
             return circuitsData
\ No newline at end of file
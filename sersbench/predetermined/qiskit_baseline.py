@@ -0,0 +1,59 @@
+import os
+import pandas as pd
+from pathlib import Path
+from qiskit import QuantumCircuit
+from sersbench._internal import baselineMetrics, baselineSweepRows
+
+
+def qiskitBaseline(qc: str, optimization_levels: list = (0, 1, 2, 3), seeds: list = (0, 1, 2, 3, 4),
+    num_processes: int = None, csv_path: str = None) -> pd.DataFrame:
+    """
+    Transpile circuit(s) with Qiskit over several optimization levels and seed_transpiler values and summarize the spread
+    of the results, as a fairer baseline than a single level 3 transpile with the default seed.
+
+    All circuits are transpiled together: every (level, seed) pair is one call of Qiskit's transpile on the list of
+    circuits, which runs them in parallel processes, so the wall time grows with the number of configurations but not
+    with the number of files.
+
+    Parameters:
+        qc (str): Quantum circuit(s) to transpile. Path to either a QASM file or folder.
+
+        optimization_levels (list): Qiskit optimization levels to run. (Default: (0, 1, 2, 3)).
+
+        seeds (list): seed_transpiler values to run at every level. (Default: (0, 1, 2, 3, 4)).
+
+        num_processes (int): Number of processes transpile uses. If None, Qiskit's default (the CPU count). (Default: None).
+
+        csv_path (str): Path of a CSV file to also write the table to. (Default: None).
+
+    Returns:
+        A DataFrame with one row per circuit and level, plus one row per circuit over all levels ('Optimization Level' is
+        'all'). Each row holds the best, median and spread (max - min) over the seeds of the two-qubit gate count,
+        two-qubit gate depth and gate count, the level and seed of the best run, the counts before transpilation, and the
+        wall time of the level's transpile batches, which are shared by all circuits.
+    """
+    if not os.path.exists(path=qc):
+        raise FileNotFoundError(f'The path {qc} does not exist.')
+    if os.path.isdir(s=qc):
+        files = sorted(str(file) for file in Path(qc).iterdir() if file.is_file() and file.name.endswith('qasm'))
+    elif qc.endswith('.qasm'):
+        files = [qc]
+    else:
+        raise FileNotFoundError(f'{qc} is not a valid path.')
+
+    names = [os.path.basename(file)[:-5] for file in files]
+    circuits = [QuantumCircuit.from_qasm_file(file) for file in files]
+    rows = baselineSweepRows(names, circuits, optimization_levels, seeds, num_processes)
+
+    # Counts of each circuit before transpilation, as reported by predeterminedCompilation's Qiskit rows
+    before = {name: baselineMetrics(file, 'qiskit') for name, file in zip(names, files)}
+    for row in rows:
+        metrics = before[row['Circuit QASM File Name']]
+        row['Two-Qubit Gate Count Before Optimization'] = metrics.multi_qudit_gates
+        row['Two-Qubit Gate Depth Before Optimization'] = metrics.multi_qudit_depth
+        row['Gate Count Before Optimization'] = metrics.num_gates
+
+    table = pd.DataFrame(rows)
+    if csv_path is not None:
+        table.to_csv(csv_path, index=False)
+    return table